@@ -0,0 +1,36 @@
+"""add feeds search vector
+
+Revision ID: 001abe1d1b8f
+Revises: bffe2e5481c1
+Create Date: 2026-10-18 15:58:20.114093
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '001abe1d1b8f'
+down_revision: Union[str, None] = 'bffe2e5481c1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('feeds', sa.Column(name='search_vector', type_=postgresql.TSVECTOR, nullable=True))
+    op.execute(
+        """
+        UPDATE feeds SET search_vector =
+            setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(summary, '')), 'B') ||
+            setweight(to_tsvector('english', coalesce(author, '')), 'C')
+        """
+    )
+    op.create_index('ix_feeds_search_vector', 'feeds', ['search_vector'], postgresql_using='gin')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_feeds_search_vector', table_name='feeds')
+    op.drop_column('feeds', 'search_vector')
@@ -0,0 +1,27 @@
+"""rename timelines published at
+
+Revision ID: 0c5e7b2a9d48
+Revises: 6f2c9a8d4b17
+Create Date: 2026-10-18 22:06:41.530917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '0c5e7b2a9d48'
+down_revision: Union[str, None] = '6f2c9a8d4b17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # the column always held feeds.created_at, the key of the feed cursor
+    op.alter_column('timelines', 'published_at', new_column_name='created_at')
+    op.execute('ALTER INDEX ix_timelines_user_id_published_at_feed_id RENAME TO ix_timelines_user_id_created_at_feed_id')
+
+
+def downgrade() -> None:
+    op.execute('ALTER INDEX ix_timelines_user_id_created_at_feed_id RENAME TO ix_timelines_user_id_published_at_feed_id')
+    op.alter_column('timelines', 'created_at', new_column_name='published_at')
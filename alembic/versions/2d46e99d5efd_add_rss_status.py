@@ -0,0 +1,25 @@
+"""add rss status
+
+Revision ID: 2d46e99d5efd
+Revises: 001abe1d1b8f
+Create Date: 2026-10-18 16:41:37.520917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '2d46e99d5efd'
+down_revision: Union[str, None] = '001abe1d1b8f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('rsses', sa.Column(name='status', type_=sa.Text, nullable=False, server_default='active'))
+
+
+def downgrade() -> None:
+    op.drop_column('rsses', 'status')
@@ -0,0 +1,25 @@
+"""add rss hub requested at
+
+Revision ID: 3e8b5d1f7a62
+Revises: a4d27f6e9c15
+Create Date: 2026-10-18 21:14:37.218405
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '3e8b5d1f7a62'
+down_revision: Union[str, None] = 'a4d27f6e9c15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('rsses', sa.Column(name='hub_requested_at', type_=sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('rsses', 'hub_requested_at')
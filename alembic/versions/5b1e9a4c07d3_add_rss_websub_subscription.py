@@ -0,0 +1,31 @@
+"""add rss websub subscription
+
+Revision ID: 5b1e9a4c07d3
+Revises: 8c3f0b7e61a2
+Create Date: 2026-10-18 18:02:51.774310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '5b1e9a4c07d3'
+down_revision: Union[str, None] = '8c3f0b7e61a2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('rsses', sa.Column(name='hub_url', type_=sa.Text, nullable=True))
+    op.add_column('rsses', sa.Column(name='hub_topic', type_=sa.Text, nullable=True))
+    op.add_column('rsses', sa.Column(name='hub_secret', type_=sa.Text, nullable=True))
+    op.add_column('rsses', sa.Column(name='hub_lease_expires_at', type_=sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('rsses', 'hub_lease_expires_at')
+    op.drop_column('rsses', 'hub_secret')
+    op.drop_column('rsses', 'hub_topic')
+    op.drop_column('rsses', 'hub_url')
@@ -0,0 +1,27 @@
+"""add rss workers started at
+
+Revision ID: 6f2c9a8d4b17
+Revises: 3e8b5d1f7a62
+Create Date: 2026-10-18 21:32:05.847162
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '6f2c9a8d4b17'
+down_revision: Union[str, None] = '3e8b5d1f7a62'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('rss_workers', sa.Column(name='started_at', type_=sa.DateTime(timezone=True), nullable=True))
+    op.execute('UPDATE rss_workers SET started_at = heartbeat_at')
+    op.alter_column('rss_workers', 'started_at', nullable=False)
+
+
+def downgrade() -> None:
+    op.drop_column('rss_workers', 'started_at')
@@ -0,0 +1,50 @@
+"""add timelines
+
+Revision ID: 712976d4bcb9
+Revises: c847a87d3437
+Create Date: 2026-10-18 12:47:19.663018
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '712976d4bcb9'
+down_revision: Union[str, None] = 'c847a87d3437'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('rsses', sa.Column(name='fanout_disabled', type_=sa.Boolean, nullable=False, server_default=sa.false()))
+    op.create_table(
+        'timelines',
+        sa.Column(name='user_id', type_=sa.UUID(as_uuid=True), nullable=False),
+        sa.Column(name='feed_id', type_=sa.UUID(as_uuid=True), nullable=False),
+        sa.Column(name='published_at', type_=sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(['feed_id'], ['feeds.id'], name=op.f(
+            'fk_timelines_feed_id_feeds_id')),
+        sa.PrimaryKeyConstraint('user_id', 'feed_id', name=op.f('pk_timelines'))
+    )
+    op.create_index(
+        'ix_timelines_user_id_published_at_feed_id',
+        'timelines',
+        ['user_id', 'published_at', 'feed_id'],
+    )
+    op.execute(
+        """
+        INSERT INTO timelines (user_id, feed_id, published_at)
+        SELECT rss_user.user_id, feeds.id, feeds.created_at
+        FROM rss_user
+        JOIN feeds ON feeds.rss_id = rss_user.rss_id
+        ON CONFLICT DO NOTHING
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_timelines_user_id_published_at_feed_id', table_name='timelines')
+    op.drop_table('timelines')
+    op.drop_column('rsses', 'fanout_disabled')
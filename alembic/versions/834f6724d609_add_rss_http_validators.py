@@ -0,0 +1,27 @@
+"""add rss http validators
+
+Revision ID: 834f6724d609
+Revises: 72a1dc69f08a
+Create Date: 2026-10-18 09:12:40.118203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '834f6724d609'
+down_revision: Union[str, None] = '72a1dc69f08a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('rsses', sa.Column(name='etag', type_=sa.Text, nullable=True))
+    op.add_column('rsses', sa.Column(name='last_modified', type_=sa.Text, nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('rsses', 'last_modified')
+    op.drop_column('rsses', 'etag')
@@ -0,0 +1,25 @@
+"""add rss last error
+
+Revision ID: 8c3f0b7e61a2
+Revises: 2d46e99d5efd
+Create Date: 2026-10-18 17:24:09.318406
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '8c3f0b7e61a2'
+down_revision: Union[str, None] = '2d46e99d5efd'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('rsses', sa.Column(name='last_error', type_=sa.Text, nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('rsses', 'last_error')
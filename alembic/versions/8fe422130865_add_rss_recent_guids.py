@@ -0,0 +1,38 @@
+"""add rss recent guids
+
+Revision ID: 8fe422130865
+Revises: f93fa9d60508
+Create Date: 2026-10-18 10:41:57.302655
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '8fe422130865'
+down_revision: Union[str, None] = 'f93fa9d60508'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('rsses', sa.Column(name='recent_guids', type_=sa.JSON(), nullable=False, server_default='[]'))
+    op.execute(
+        """
+        UPDATE rsses SET recent_guids = COALESCE((
+            SELECT json_agg(recent.guid)
+            FROM (
+                SELECT guid FROM feeds
+                WHERE feeds.rss_id = rsses.id
+                ORDER BY created_at DESC
+                LIMIT 500
+            ) AS recent
+        ), '[]'::json)
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('rsses', 'recent_guids')
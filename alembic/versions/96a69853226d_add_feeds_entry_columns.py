@@ -0,0 +1,105 @@
+"""add feeds entry columns
+
+Revision ID: 96a69853226d
+Revises: e77114a8e205
+Create Date: 2026-10-18 15:02:44.871205
+
+"""
+import re
+import zlib
+from datetime import datetime
+from html import unescape
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '96a69853226d'
+down_revision: Union[str, None] = 'e77114a8e205'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+SUMMARY_LIMIT = 500
+TAG = re.compile(r'<[^>]+>')
+
+feeds = sa.table(
+    'feeds',
+    sa.column('id', sa.UUID(as_uuid=True)),
+    sa.column('data', sa.JSON),
+    sa.column('title', sa.Text),
+    sa.column('link', sa.Text),
+    sa.column('published_at', sa.DateTime(timezone=True)),
+    sa.column('author', sa.Text),
+    sa.column('summary', sa.Text),
+    sa.column('content', sa.LargeBinary),
+)
+
+
+def upgrade() -> None:
+    op.add_column('feeds', sa.Column(name='title', type_=sa.Text, nullable=True))
+    op.add_column('feeds', sa.Column(name='link', type_=sa.Text, nullable=True))
+    op.add_column('feeds', sa.Column(name='published_at', type_=sa.DateTime(timezone=True), nullable=True))
+    op.add_column('feeds', sa.Column(name='author', type_=sa.Text, nullable=True))
+    op.add_column('feeds', sa.Column(name='summary', type_=sa.Text, nullable=True))
+    op.add_column('feeds', sa.Column(name='content', type_=sa.LargeBinary, nullable=True))
+
+    connection = op.get_bind()
+    update = feeds.update().where(feeds.c.id == sa.bindparam('feed_id')).values(
+        data=sa.bindparam('data'),
+        title=sa.bindparam('title'),
+        link=sa.bindparam('link'),
+        published_at=sa.bindparam('published_at'),
+        author=sa.bindparam('author'),
+        summary=sa.bindparam('summary'),
+        content=sa.bindparam('content'),
+    )
+    last_id = None
+
+    while True:
+        query = sa.select(feeds.c.id, feeds.c.data).order_by(feeds.c.id).limit(BATCH_SIZE)
+        if last_id is not None:
+            query = query.where(feeds.c.id > last_id)
+
+        rows = connection.execute(query).all()
+        if not rows:
+            break
+
+        connection.execute(update, [split_entry(row.id, row.data or {}) for row in rows])
+        last_id = rows[-1].id
+
+
+def split_entry(feed_id, entry: dict) -> dict:
+    parsed = entry.get('published_parsed') or entry.get('updated_parsed')
+    summary = entry.get('summary')
+    content = '\n'.join(item.get('value', '') for item in entry.get('content') or [])
+
+    data = {key: entry[key] for key in ('title', 'link', 'published', 'updated', 'author', 'summary') if entry.get(key)}
+    if entry.get('tags'):
+        data['tags'] = [tag.get('term') for tag in entry['tags'] if tag.get('term')]
+    if entry.get('enclosures'):
+        data['enclosures'] = [
+            {key: enclosure[key] for key in ('href', 'type', 'length') if key in enclosure}
+            for enclosure in entry['enclosures']
+        ]
+
+    return {
+        'feed_id': feed_id,
+        'data': data,
+        'title': entry.get('title'),
+        'link': entry.get('link'),
+        'published_at': datetime(*parsed[:6]) if parsed else None,
+        'author': entry.get('author'),
+        'summary': ' '.join(unescape(TAG.sub(' ', summary)).split())[:SUMMARY_LIMIT] or None if summary else None,
+        'content': zlib.compress(content.encode()) if content and content != summary else None,
+    }
+
+
+def downgrade() -> None:
+    op.drop_column('feeds', 'content')
+    op.drop_column('feeds', 'summary')
+    op.drop_column('feeds', 'author')
+    op.drop_column('feeds', 'published_at')
+    op.drop_column('feeds', 'link')
+    op.drop_column('feeds', 'title')
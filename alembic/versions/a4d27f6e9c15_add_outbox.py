@@ -0,0 +1,43 @@
+"""add outbox
+
+Revision ID: a4d27f6e9c15
+Revises: 5b1e9a4c07d3
+Create Date: 2026-10-18 18:47:13.602985
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4d27f6e9c15'
+down_revision: Union[str, None] = '5b1e9a4c07d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'outbox',
+        sa.Column(name='id', type_=sa.UUID(as_uuid=True)),
+        sa.Column(name='event_type', type_=sa.Text, nullable=False),
+        sa.Column(name='payload', type_=sa.JSON, nullable=False),
+        sa.Column(name='published_at', type_=sa.DateTime(timezone=True), nullable=True),
+        sa.Column(name='created_at', type_=sa.DateTime(timezone=True)),
+        sa.Column(name='updated_at', type_=sa.DateTime(timezone=True)),
+        sa.PrimaryKeyConstraint('id', name=op.f('pk_outbox'))
+    )
+    op.create_index(
+        'ix_outbox_unpublished_created_at',
+        'outbox',
+        ['created_at'],
+        postgresql_where=sa.text('published_at IS NULL'),
+    )
+    op.create_index('ix_outbox_published_at', 'outbox', ['published_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_outbox_published_at', table_name='outbox')
+    op.drop_index('ix_outbox_unpublished_created_at', table_name='outbox')
+    op.drop_table('outbox')
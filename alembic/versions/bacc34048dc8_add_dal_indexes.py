@@ -0,0 +1,96 @@
+"""add dal indexes
+
+Revision ID: bacc34048dc8
+Revises: 712976d4bcb9
+Create Date: 2026-10-18 13:35:48.215930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'bacc34048dc8'
+down_revision: Union[str, None] = '712976d4bcb9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(
+        """
+        CREATE TEMPORARY TABLE rss_duplicates ON COMMIT DROP AS
+        SELECT id, first_value(id) OVER (PARTITION BY url ORDER BY created_at, id) AS keep_id
+        FROM rsses
+        """
+    )
+    op.execute("DELETE FROM rss_duplicates WHERE id = keep_id")
+    op.execute(
+        """
+        CREATE TEMPORARY TABLE feed_duplicates ON COMMIT DROP AS
+        SELECT feeds.id, first_value(feeds.id) OVER (
+            PARTITION BY COALESCE(rss_duplicates.keep_id, feeds.rss_id), feeds.guid
+            ORDER BY feeds.created_at, feeds.id
+        ) AS keep_id
+        FROM feeds
+        LEFT JOIN rss_duplicates ON rss_duplicates.id = feeds.rss_id
+        """
+    )
+    op.execute("DELETE FROM feed_duplicates WHERE id = keep_id")
+
+    for table in ('bookmarks', 'comments'):
+        op.execute(
+            """
+            UPDATE {0} SET feed_id = feed_duplicates.keep_id
+            FROM feed_duplicates
+            WHERE {0}.feed_id = feed_duplicates.id
+            """.format(table)
+        )
+
+    op.execute(
+        """
+        INSERT INTO timelines (user_id, feed_id, published_at)
+        SELECT timelines.user_id, feed_duplicates.keep_id, timelines.published_at
+        FROM timelines
+        JOIN feed_duplicates ON feed_duplicates.id = timelines.feed_id
+        ON CONFLICT DO NOTHING
+        """
+    )
+    op.execute("DELETE FROM timelines USING feed_duplicates WHERE timelines.feed_id = feed_duplicates.id")
+    op.execute("DELETE FROM feeds USING feed_duplicates WHERE feeds.id = feed_duplicates.id")
+
+    for table in ('feeds', 'rss_user'):
+        op.execute(
+            """
+            UPDATE {0} SET rss_id = rss_duplicates.keep_id
+            FROM rss_duplicates
+            WHERE {0}.rss_id = rss_duplicates.id
+            """.format(table)
+        )
+
+    op.execute("DELETE FROM rsses USING rss_duplicates WHERE rsses.id = rss_duplicates.id")
+    op.execute(
+        """
+        DELETE FROM rss_user
+        USING (
+            SELECT id, first_value(id) OVER (PARTITION BY user_id, rss_id ORDER BY created_at, id) AS keep_id
+            FROM rss_user
+        ) AS rss_user_duplicates
+        WHERE rss_user.id = rss_user_duplicates.id AND rss_user_duplicates.id <> rss_user_duplicates.keep_id
+        """
+    )
+
+    op.create_index('uq_rsses_url', 'rsses', ['url'], unique=True)
+    op.create_index('uq_rss_user_user_id_rss_id', 'rss_user', ['user_id', 'rss_id'], unique=True)
+    op.create_index('ix_rss_user_rss_id', 'rss_user', ['rss_id'])
+    op.create_index('ix_bookmarks_user_id_feed_id', 'bookmarks', ['user_id', 'feed_id'])
+    op.create_index('ix_comments_feed_id', 'comments', ['feed_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_comments_feed_id', table_name='comments')
+    op.drop_index('ix_bookmarks_user_id_feed_id', table_name='bookmarks')
+    op.drop_index('ix_rss_user_rss_id', table_name='rss_user')
+    op.drop_index('uq_rss_user_user_id_rss_id', table_name='rss_user')
+    op.drop_index('uq_rsses_url', table_name='rsses')
@@ -0,0 +1,42 @@
+"""convert feeds data to jsonb
+
+Revision ID: bffe2e5481c1
+Revises: 96a69853226d
+Create Date: 2026-10-18 15:31:12.604418
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'bffe2e5481c1'
+down_revision: Union[str, None] = '96a69853226d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.alter_column(
+        'feeds', 'data',
+        type_=postgresql.JSONB(),
+        existing_type=sa.JSON(),
+        postgresql_using='data::jsonb',
+    )
+    op.create_index(
+        'ix_feeds_data', 'feeds', ['data'],
+        postgresql_using='gin',
+        postgresql_ops={'data': 'jsonb_path_ops'},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_feeds_data', table_name='feeds')
+    op.alter_column(
+        'feeds', 'data',
+        type_=sa.JSON(),
+        existing_type=postgresql.JSONB(),
+        postgresql_using='data::json',
+    )
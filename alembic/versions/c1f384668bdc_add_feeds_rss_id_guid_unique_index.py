@@ -0,0 +1,48 @@
+"""add feeds rss_id guid unique index
+
+Revision ID: c1f384668bdc
+Revises: 8fe422130865
+Create Date: 2026-10-18 11:20:05.774190
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'c1f384668bdc'
+down_revision: Union[str, None] = '8fe422130865'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+DUPLICATES = """
+    WITH duplicates AS (
+        SELECT id, first_value(id) OVER (PARTITION BY rss_id, guid ORDER BY created_at, id) AS keep_id
+        FROM feeds
+    )
+"""
+
+
+def upgrade() -> None:
+    for table in ('bookmarks', 'comments'):
+        op.execute(
+            DUPLICATES + """
+            UPDATE {0} SET feed_id = duplicates.keep_id
+            FROM duplicates
+            WHERE {0}.feed_id = duplicates.id AND duplicates.id <> duplicates.keep_id
+            """.format(table)
+        )
+
+    op.execute(
+        DUPLICATES + """
+        DELETE FROM feeds
+        USING duplicates
+        WHERE feeds.id = duplicates.id AND duplicates.id <> duplicates.keep_id
+        """
+    )
+    op.create_index('uq_feeds_rss_id_guid', 'feeds', ['rss_id', 'guid'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('uq_feeds_rss_id_guid', table_name='feeds')
@@ -0,0 +1,25 @@
+"""add feeds keyset index
+
+Revision ID: c847a87d3437
+Revises: c1f384668bdc
+Create Date: 2026-10-18 11:58:31.906514
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'c847a87d3437'
+down_revision: Union[str, None] = 'c1f384668bdc'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_feeds_rss_id_created_at_id', 'feeds', ['rss_id', 'created_at', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_feeds_rss_id_created_at_id', table_name='feeds')
@@ -0,0 +1,37 @@
+"""add rss shards and workers
+
+Revision ID: e77114a8e205
+Revises: bacc34048dc8
+Create Date: 2026-10-18 14:21:07.318552
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'e77114a8e205'
+down_revision: Union[str, None] = 'bacc34048dc8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('rsses', sa.Column(name='shard', type_=sa.SmallInteger, nullable=True))
+    # rss_id.int % 1024, i.e. the low 10 bits of the uuid
+    op.execute("UPDATE rsses SET shard = ('x' || right(id::text, 3))::bit(12)::int % 1024")
+    op.alter_column('rsses', 'shard', nullable=False)
+    op.create_table(
+        'rss_workers',
+        sa.Column(name='id', type_=sa.Text),
+        sa.Column(name='heartbeat_at', type_=sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint('id', name=op.f('pk_rss_workers'))
+    )
+    op.create_index('ix_rss_workers_heartbeat_at', 'rss_workers', ['heartbeat_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_rss_workers_heartbeat_at', table_name='rss_workers')
+    op.drop_table('rss_workers')
+    op.drop_column('rsses', 'shard')
@@ -0,0 +1,36 @@
+"""add rss poll schedule
+
+Revision ID: f93fa9d60508
+Revises: 834f6724d609
+Create Date: 2026-10-18 10:03:12.540917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'f93fa9d60508'
+down_revision: Union[str, None] = '834f6724d609'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('rsses', sa.Column(name='poll_interval', type_=sa.Integer, nullable=True))
+    op.add_column('rsses', sa.Column(name='failure_count', type_=sa.Integer, nullable=False, server_default='0'))
+    op.add_column('rsses', sa.Column(
+        name='next_poll_at',
+        type_=sa.DateTime(timezone=True),
+        nullable=False,
+        server_default=sa.func.now(),
+    ))
+    op.create_index(op.f('ix_rsses_next_poll_at'), 'rsses', ['next_poll_at'])
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_rsses_next_poll_at'), table_name='rsses')
+    op.drop_column('rsses', 'next_poll_at')
+    op.drop_column('rsses', 'failure_count')
+    op.drop_column('rsses', 'poll_interval')
@@ -0,0 +1,151 @@
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from types import SimpleNamespace
+from xml.sax.saxutils import escape
+
+from apollo_shared.alembic import models as common_models
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.compiler import compiles
+
+from rss.models.bookmark import BookmarkEntity
+from rss.models.comment import CommentEntity
+from rss.models.feed import FeedEntity
+from rss.models.rss import RssEntity, RssUserEntity
+from rss.models.timeline import TimelineEntity
+from rss.models import outbox, worker  # noqa: F401
+
+TABLES = ('comments', 'bookmarks', 'timelines', 'feeds', 'rss_user', 'rsses', 'rss_workers', 'outbox')
+
+
+@compiles(postgresql.UUID, 'sqlite')
+def compile_sqlite_uuid(type_, compiler, **kw):
+    return 'STRING'
+
+
+def reset_schema(engine) -> None:
+    tables = [common_models.metadata.tables[name] for name in TABLES]
+
+    common_models.metadata.drop_all(engine, tables=tables)
+    common_models.metadata.create_all(engine, tables=tables)
+
+
+def entry_guid(feed_index: int, entry_index: int) -> str:
+    return 'urn:bench:{}:{}'.format(feed_index, entry_index)
+
+
+def entry_published_at(entry_index: int) -> datetime:
+    return datetime(2024, 1, 1, tzinfo=timezone.utc) + timedelta(minutes=10 * entry_index)
+
+
+def rss_document(feed_index: int, entry_indexes: range) -> bytes:
+    items = ''.join(
+        '<item><guid>{guid}</guid><title>{title}</title><link>{link}</link>'
+        '<pubDate>{published}</pubDate><description>{summary}</description></item>'.format(
+            guid=entry_guid(feed_index, entry_index),
+            title=escape('Entry {} of feed {}'.format(entry_index, feed_index)),
+            link='https://example.com/{}/{}'.format(feed_index, entry_index),
+            published=format_datetime(entry_published_at(entry_index), usegmt=True),
+            summary=escape('<p>{}</p>'.format('lorem ipsum ' * 40)),
+        )
+        for entry_index in reversed(entry_indexes)
+    )
+
+    return (
+        '<?xml version="1.0"?><rss version="2.0"><channel>'
+        '<title>Feed {0}</title><link>https://example.com/{0}</link>{1}'
+        '</channel></rss>'
+    ).format(feed_index, items).encode()
+
+
+def atom_document(feed_index: int, entry_indexes: range) -> bytes:
+    entries = ''.join(
+        '<entry><id>{guid}</id><title>{title}</title><link href="{link}"/>'
+        '<updated>{published}</updated><summary type="html">{summary}</summary></entry>'.format(
+            guid=entry_guid(feed_index, entry_index),
+            title=escape('Entry {} of feed {}'.format(entry_index, feed_index)),
+            link='https://example.com/{}/{}'.format(feed_index, entry_index),
+            published=entry_published_at(entry_index).strftime('%Y-%m-%dT%H:%M:%SZ'),
+            summary=escape('<p>{}</p>'.format('lorem ipsum ' * 40)),
+        )
+        for entry_index in reversed(entry_indexes)
+    )
+
+    return (
+        '<?xml version="1.0"?><feed xmlns="http://www.w3.org/2005/Atom">'
+        '<id>urn:bench:{0}</id><title>Feed {0}</title><updated>2024-01-01T00:00:00Z</updated>{1}'
+        '</feed>'
+    ).format(feed_index, entries).encode()
+
+
+def seed(session,
+         base_url: str,
+         feeds: int,
+         users: int,
+         entries: int,
+         subscriptions_per_user: int = 20,
+         seed_value: int = 0) -> SimpleNamespace:
+    rng = random.Random(seed_value)
+    created_at = datetime.utcnow() - timedelta(days=1)
+
+    rsses = [
+        RssEntity(
+            url='{}/{}/{}'.format(base_url, 'atom' if i % 2 else 'rss', i),
+            recent_guids=[entry_guid(i, j) for j in reversed(range(entries))],
+        )
+        for i in range(feeds)
+    ]
+    session.add_all(rsses)
+    session.flush()
+
+    user_ids = [uuid.uuid4() for _ in range(users)]
+    subscriptions = {
+        user_id: rng.sample(range(feeds), min(subscriptions_per_user, feeds))
+        for user_id in user_ids
+    }
+    session.add_all(
+        RssUserEntity(user_id=user_id, rss_id=rsses[i].id)
+        for user_id, feed_indexes in subscriptions.items()
+        for i in feed_indexes
+    )
+
+    feed_entities = [
+        FeedEntity(
+            rss_id=rss.id,
+            data={'title': 'Entry {} of feed {}'.format(j, i)},
+            guid=entry_guid(i, j),
+            created_at=created_at + timedelta(seconds=j),
+        )
+        for i, rss in enumerate(rsses)
+        for j in range(entries)
+    ]
+    session.add_all(feed_entities)
+    session.flush()
+
+    entries_by_feed = [feed_entities[i * entries:(i + 1) * entries] for i in range(feeds)]
+    session.add_all(
+        TimelineEntity(user_id=user_id, feed_id=feed.id, created_at=feed.created_at)
+        for user_id, feed_indexes in subscriptions.items()
+        for i in feed_indexes
+        for feed in entries_by_feed[i]
+    )
+
+    commented = rng.sample(feed_entities, max(len(feed_entities) // 10, 1)) if feed_entities else []
+    session.add_all(
+        CommentEntity(user_id=rng.choice(user_ids), feed_id=feed.id, message='comment {}'.format(n))
+        for feed in commented
+        for n in range(3)
+    )
+    session.add_all(
+        BookmarkEntity(user_id=rng.choice(user_ids), feed_id=feed.id)
+        for feed in commented
+    )
+    session.commit()
+
+    return SimpleNamespace(
+        rsses=rsses,
+        user_ids=user_ids,
+        subscriptions=subscriptions,
+        commented_feeds=commented,
+    )
@@ -0,0 +1,268 @@
+import eventlet
+
+eventlet.monkey_patch()
+
+import argparse
+import json
+import math
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+import fakeredis
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import sessionmaker
+
+from rss.breaker import HostCircuitBreaker
+from rss.cache import RssCache
+from rss.dal import RssDAL
+from rss.fetcher import FeedFetcher
+from rss.ingest import IngestBatcher
+from rss.metrics import RssMetrics
+from rss.outbox import OutboxRelay
+from rss.parser import ParserPool
+from rss.models.rss import RssEntity
+from rss.scheduler import PollScheduler
+from rss.service import RssService
+from rss.sharding import ShardCoordinator
+from rss.timeline import TimelineFanout
+from rss.websub import WebSubSubscriber
+
+from .generator import reset_schema, seed
+from .server import FeedServerProcess
+
+
+def percentile(samples: [float], q: float) -> float:
+    ordered = sorted(samples)
+
+    return ordered[max(math.ceil(q * len(ordered)) - 1, 0)]
+
+
+def summarize(samples: [float], items: int) -> dict:
+    total = sum(samples)
+
+    return {
+        'count': len(samples),
+        'mean_ms': total / len(samples) * 1000,
+        'p50_ms': percentile(samples, 0.50) * 1000,
+        'p95_ms': percentile(samples, 0.95) * 1000,
+        'p99_ms': percentile(samples, 0.99) * 1000,
+        'max_ms': max(samples) * 1000,
+        'ops_per_second': len(samples) / total if total else None,
+        'items_per_second': items / total if total else None,
+    }
+
+
+def measure(operation, iterations: int, before=None, items_per_call: int = None) -> dict:
+    samples = []
+    items = 0
+
+    for _ in range(iterations):
+        if before is not None:
+            before()
+
+        started = time.perf_counter()
+        result = operation()
+        samples.append(time.perf_counter() - started)
+        items += items_per_call if items_per_call is not None else len(result)
+
+    return summarize(samples, items)
+
+
+def measure_hub_lag(operation, before, interval: float = 0.01) -> dict:
+    lags = []
+    running = True
+
+    def tick():
+        while running:
+            started = time.perf_counter()
+            eventlet.sleep(interval)
+            lags.append(time.perf_counter() - started - interval)
+
+    before()
+    ticker = eventlet.spawn(tick)
+    operation()
+    running = False
+    ticker.wait()
+
+    return summarize(lags, len(lags))
+
+
+def build_service(session, feed_parser: ParserPool, args) -> RssService:
+    rss_dal = RssDAL(db_session=session)
+    redis = fakeredis.FakeRedis(server=fakeredis.FakeServer(), decode_responses=True)
+
+    return RssService(
+        context={},
+        rss_dal=rss_dal,
+        rss_cache=RssCache(redis, 0, 0),
+        feed_fetcher=FeedFetcher(
+            pool_size=args.fetch_pool_size,
+            per_host_limit=args.fetch_pool_size,
+            timeout=30,
+        ),
+        feed_parser=feed_parser,
+        ingest_batcher=IngestBatcher(args.ingest_batch_size, 8 * 1024 * 1024),
+        poll_scheduler=PollScheduler(
+            batch_size=args.feeds,
+            min_interval=60,
+            default_interval=60,
+            max_interval=60,
+            max_backoff=60,
+        ),
+        shard_coordinator=ShardCoordinator(rss_dal, 'benchmark', lease_ttl=60, claim_ttl=60),
+        timeline_fanout=TimelineFanout(rss_dal, enabled=args.fanout, max_subscribers=1000),
+        # every benchmark feed is served from one local host
+        host_breaker=HostCircuitBreaker(redis, threshold=args.feeds + 1, cooldown=60),
+        metrics=RssMetrics(),
+        websub=WebSubSubscriber(None, lease_seconds=0, fallback_interval=0, timeout=30),
+        outbox_relay=OutboxRelay(rss_dal, lambda event_type, payload: None, batch_size=1000, retention=0),
+        event_dispatcher=lambda event_type, payload: None,
+    )
+
+
+def run(args) -> dict:
+    engine = create_engine(args.db_url)
+    reset_schema(engine)
+    session = sessionmaker(bind=engine)()
+    rng = random.Random(args.seed)
+
+    feed_parser = ParserPool(args.parse_workers)
+    feed_parser.start()
+
+    with FeedServerProcess(args.feeds, args.entries) as server:
+        data = seed(
+            session,
+            server.base_url,
+            feeds=args.feeds,
+            users=args.users,
+            entries=args.entries,
+            subscriptions_per_user=args.subscriptions,
+            seed_value=args.seed,
+        )
+        service = build_service(session, feed_parser, args)
+        rss_dal = service.rss_dal
+
+        subscribers = {}
+        for user_id, feed_indexes in data.subscriptions.items():
+            for i in feed_indexes:
+                subscribers.setdefault(data.rsses[i].id, []).append(user_id)
+        comment_lookups = [
+            (feed.id, rng.choice(subscribers[feed.rss_id]))
+            for feed in data.commented_feeds
+            if feed.rss_id in subscribers
+        ]
+
+        def make_due():
+            session.execute(update(RssEntity).values(next_poll_at=datetime.utcnow() - timedelta(seconds=1)))
+            session.commit()
+
+        def publish():
+            server.publish(args.new_entries)
+            make_due()
+
+        operations = {
+            'get_feeds_by_user_id': measure(
+                lambda: rss_dal.get_feeds_by_user_id(rng.choice(data.user_ids)),
+                args.iterations,
+            ),
+            'get_timeline_by_user_id': measure(
+                lambda: rss_dal.get_timeline_by_user_id(rng.choice(data.user_ids)),
+                args.iterations,
+            ),
+            'fetch_comments_on_subscribed_feed_by_feed_id': measure(
+                lambda: rss_dal.fetch_comments_on_subscribed_feed_by_feed_id(*rng.choice(comment_lookups)),
+                args.iterations,
+            ),
+            'update_feeds': measure(service.update_feeds, args.sweeps, before=publish, items_per_call=args.feeds),
+            'update_feeds_not_modified': measure(service.update_feeds, args.sweeps, before=make_due, items_per_call=args.feeds),
+            'hub_lag_during_update_feeds': measure_hub_lag(service.update_feeds, before=publish),
+        }
+        server_stats = server.stats()
+
+    feed_parser.stop()
+
+    return {
+        'meta': {
+            'dialect': engine.dialect.name,
+            'created_at': datetime.utcnow().isoformat(),
+            'feeds': args.feeds,
+            'users': args.users,
+            'entries': args.entries,
+            'subscriptions': args.subscriptions,
+            'new_entries': args.new_entries,
+            'iterations': args.iterations,
+            'sweeps': args.sweeps,
+            'fanout': args.fanout,
+            'parse_workers': args.parse_workers,
+            'ingest_batch_size': args.ingest_batch_size,
+            'http_requests': server_stats['requests'],
+            'http_bytes': server_stats['bytes_sent'],
+        },
+        'operations': operations,
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> [str]:
+    regressions = []
+
+    for name, current in results['operations'].items():
+        previous = baseline['operations'].get(name)
+        if previous is None:
+            continue
+
+        for metric in ('p50_ms', 'p95_ms'):
+            if current[metric] > previous[metric] * (1 + tolerance):
+                regressions.append('{} {}: {:.2f} -> {:.2f}'.format(name, metric, previous[metric], current[metric]))
+
+    return regressions
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.run')
+    parser.add_argument('--db-url', default='sqlite://', help='database to benchmark against; its rss tables are recreated')
+    parser.add_argument('--feeds', type=int, default=100)
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--entries', type=int, default=50, help='entries per feed')
+    parser.add_argument('--subscriptions', type=int, default=20, help='subscriptions per user')
+    parser.add_argument('--new-entries', type=int, default=5, help='entries published per feed before each sweep')
+    parser.add_argument('--iterations', type=int, default=200, help='samples per read operation')
+    parser.add_argument('--sweeps', type=int, default=5, help='samples per update_feeds operation')
+    parser.add_argument('--fetch-pool-size', type=int, default=50)
+    parser.add_argument('--ingest-batch-size', type=int, default=500, help='new entries per ingest transaction')
+    parser.add_argument('--parse-workers', type=int, default=0, help='feed parser processes, 0 parses on the hub')
+    parser.add_argument('--fanout', action='store_true', help='benchmark with the fan-out timeline enabled')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write the JSON report here instead of stdout')
+    parser.add_argument('--baseline', help='JSON report to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed slowdown against the baseline')
+
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    results = run(args)
+    report = json.dumps(results, indent=2)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(report)
+    else:
+        print(report)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+
+        for regression in regressions:
+            print('regression: ' + regression, file=sys.stderr)
+
+        return 1 if regressions else 0
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,161 @@
+import argparse
+import json
+import subprocess
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from .generator import atom_document, rss_document
+
+
+class FeedServer:
+
+    def __init__(self, feeds: int, entries: int, host: str = '127.0.0.1', port: int = 0):
+        self.feeds = feeds
+        self.entries = entries
+        self.published = 0
+        self.requests = 0
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+
+        return 'http://{}:{}'.format(host, port)
+
+    def publish(self, new_entries: int) -> None:
+        with self._lock:
+            self.published += new_entries
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'published': self.published, 'requests': self.requests, 'bytes_sent': self.bytes_sent}
+
+    def document(self, kind: str, feed_index: int) -> tuple[bytes, str]:
+        with self._lock:
+            published = self.published
+
+        entry_indexes = range(published, published + self.entries)
+        build = atom_document if kind == 'atom' else rss_document
+
+        return build(feed_index, entry_indexes), '"{}-{}"'.format(feed_index, published)
+
+    def serve_forever(self) -> None:
+        self._server.serve_forever()
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                if self.path == '/stats':
+                    self.send_body(json.dumps(server.stats()).encode(), 'application/json')
+                    return
+
+                try:
+                    _, kind, feed_index = self.path.split('/')
+                    feed_index = int(feed_index)
+                except ValueError:
+                    self.send_error(404)
+                    return
+
+                if kind not in ('rss', 'atom') or not 0 <= feed_index < server.feeds:
+                    self.send_error(404)
+                    return
+
+                body, etag = server.document(kind, feed_index)
+
+                with server._lock:
+                    server.requests += 1
+
+                if self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.end_headers()
+                    return
+
+                self.send_body(body, 'application/{}+xml'.format(kind), etag)
+
+                with server._lock:
+                    server.bytes_sent += len(body)
+
+            def do_POST(self):
+                if self.path != '/publish':
+                    self.send_error(404)
+                    return
+
+                length = int(self.headers.get('Content-Length', 0))
+                server.publish(int(json.loads(self.rfile.read(length))['entries']))
+                self.send_body(json.dumps(server.stats()).encode(), 'application/json')
+
+            def send_body(self, body: bytes, content_type: str, etag: str = None):
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                if etag is not None:
+                    self.send_header('ETag', etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+class FeedServerProcess:
+
+    def __init__(self, feeds: int, entries: int):
+        self.feeds = feeds
+        self.entries = entries
+        self.base_url = None
+        self._process = None
+
+    def publish(self, new_entries: int) -> None:
+        requests.post(self.base_url + '/publish', json={'entries': new_entries}).raise_for_status()
+
+    def stats(self) -> dict:
+        response = requests.get(self.base_url + '/stats')
+        response.raise_for_status()
+
+        return response.json()
+
+    def __enter__(self) -> 'FeedServerProcess':
+        self._process = subprocess.Popen(
+            [
+                sys.executable, '-m', 'benchmarks.server',
+                '--feeds', str(self.feeds),
+                '--entries', str(self.entries),
+            ],
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        self.base_url = self._process.stdout.readline().strip()
+
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._process.terminate()
+        self._process.wait()
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.server')
+    parser.add_argument('--feeds', type=int, required=True)
+    parser.add_argument('--entries', type=int, required=True)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    server = FeedServer(args.feeds, args.entries, args.host, args.port)
+    print(server.base_url, flush=True)
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
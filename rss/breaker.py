@@ -0,0 +1,79 @@
+import logging
+import typing
+
+from nameko import config
+from redis import RedisError
+
+logger = logging.getLogger(__name__)
+
+
+class HostCircuitBreaker:
+    FAILURES_KEY = 'rss:breaker:failures:{}'
+    OPEN_KEY = 'rss:breaker:open:{}'
+
+    def __init__(self, client, threshold: int, cooldown: int):
+        self.client = client
+        self.threshold = threshold
+        self.cooldown = cooldown
+
+    @classmethod
+    def from_config(cls, client) -> 'HostCircuitBreaker':
+        return cls(
+            client=client,
+            threshold=int(config.get('FEED_BREAKER_THRESHOLD', 5)),
+            cooldown=int(config.get('FEED_BREAKER_COOLDOWN', 15 * 60)),
+        )
+
+    def open_hosts(self, hosts: typing.Iterable[str]) -> typing.Set[str]:
+        hosts = list(set(hosts))
+
+        if not hosts:
+            return set()
+
+        # an unreachable breaker must not stop the sweep, so every host is
+        # polled until it can be read again
+        try:
+            states = self.client.mget([self.OPEN_KEY.format(host) for host in hosts])
+        except RedisError:
+            logger.warning('circuit breaker unavailable, polling all hosts', exc_info=True)
+            return set()
+
+        return {host for host, state in zip(hosts, states) if state is not None}
+
+    def record(self, failures: typing.Dict[str, int], successes: typing.Iterable[str]) -> typing.Set[str]:
+        try:
+            return self._record(failures, successes)
+        except RedisError:
+            logger.warning('circuit breaker unavailable, dropping host results', exc_info=True)
+            return set()
+
+    def _record(self, failures: typing.Dict[str, int], successes: typing.Iterable[str]) -> typing.Set[str]:
+        # a host only counts as failing when none of its feeds could be fetched,
+        # so a single broken feed can not trip the breaker for a healthy host
+        successes = set(successes)
+        failures = {host: count for host, count in failures.items() if host not in successes}
+
+        pipeline = self.client.pipeline()
+
+        for host in successes:
+            pipeline.delete(self.FAILURES_KEY.format(host))
+
+        for host, count in failures.items():
+            pipeline.incrby(self.FAILURES_KEY.format(host), count)
+            pipeline.expire(self.FAILURES_KEY.format(host), self.cooldown * 4)
+
+        results = pipeline.execute()[-2 * len(failures):] if failures else []
+        tripped = {
+            host for host, total in zip(failures, results[::2]) if total >= self.threshold
+        }
+
+        if tripped:
+            pipeline = self.client.pipeline()
+
+            for host in tripped:
+                pipeline.set(self.OPEN_KEY.format(host), 1, ex=self.cooldown)
+                pipeline.delete(self.FAILURES_KEY.format(host))
+
+            pipeline.execute()
+
+        return tripped
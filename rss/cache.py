@@ -0,0 +1,149 @@
+import json
+import logging
+import typing
+import uuid
+from datetime import datetime
+
+from nameko import config
+from redis import RedisError
+
+from .models.rss import RssEntity
+from .models.feed import FeedEntity
+
+logger = logging.getLogger(__name__)
+
+
+def _encode(value):
+    if isinstance(value, uuid.UUID):
+        return {'__uuid__': str(value)}
+
+    if isinstance(value, datetime):
+        return {'__datetime__': value.isoformat()}
+
+    raise TypeError('{} is not cacheable'.format(type(value).__name__))
+
+
+def _decode(value: dict):
+    if '__uuid__' in value:
+        return uuid.UUID(value['__uuid__'])
+
+    if '__datetime__' in value:
+        return datetime.fromisoformat(value['__datetime__'])
+
+    return value
+
+
+class RssCache:
+    STATS_KEY = 'rss:cache:stats'
+    RSS_FIELDS = ('id', 'url', 'status', 'created_at', 'updated_at')
+    FEED_FIELDS = (
+        'id', 'rss_id', 'guid', 'data', 'title', 'link', 'published_at', 'author', 'summary', 'created_at', 'updated_at',
+        'comment_count', 'bookmarked',
+    )
+
+    def __init__(self, client, subscriptions_ttl: int, timeline_ttl: int):
+        self.client = client
+        self.subscriptions_ttl = subscriptions_ttl
+        self.timeline_ttl = timeline_ttl
+
+    @classmethod
+    def from_config(cls, client) -> 'RssCache':
+        return cls(
+            client=client,
+            subscriptions_ttl=int(config.get('CACHE_SUBSCRIPTIONS_TTL', 10 * 60)),
+            timeline_ttl=int(config.get('CACHE_TIMELINE_TTL', 60)),
+        )
+
+    def subscriptions(self, user_id, loader: typing.Callable[[], list]) -> [RssEntity]:
+        return self._read_through(
+            'rss:subscriptions:{}'.format(user_id),
+            self.subscriptions_ttl,
+            loader,
+            RssEntity,
+            self.RSS_FIELDS,
+        )
+
+    def timeline_page(self, user_id, page_key: str, loader: typing.Callable[[], list]) -> [FeedEntity]:
+        # reading the version keeps it alive for as long as pages cached under
+        # it, so an expired version can not bring back an older page
+        pipeline = self.client.pipeline()
+        pipeline.get(self._timeline_version_key(user_id))
+        pipeline.expire(self._timeline_version_key(user_id), self.timeline_ttl)
+
+        try:
+            version, _ = pipeline.execute()
+        except RedisError:
+            logger.warning('cache unavailable, loading timeline of user %s', user_id, exc_info=True)
+            return loader()
+
+        return self._read_through(
+            'rss:timeline:{}:{}:{}'.format(user_id, version or 0, page_key),
+            self.timeline_ttl,
+            loader,
+            FeedEntity,
+            self.FEED_FIELDS,
+        )
+
+    def invalidate_subscriptions(self, user_id) -> None:
+        pipeline = self.client.pipeline()
+        pipeline.delete('rss:subscriptions:{}'.format(user_id))
+        self._bump_timeline_version(pipeline, user_id)
+        self._execute(pipeline)
+
+    def invalidate_timelines(self, user_ids) -> None:
+        pipeline = self.client.pipeline()
+        for user_id in user_ids:
+            self._bump_timeline_version(pipeline, user_id)
+        self._execute(pipeline)
+
+    def stats(self) -> dict:
+        stats = self.client.hgetall(self.STATS_KEY)
+
+        return {
+            'hits': int(stats.get('hits', 0)),
+            'misses': int(stats.get('misses', 0)),
+        }
+
+    def _read_through(self, key: str, ttl: int, loader, entity_cls, field_names) -> list:
+        try:
+            cached = self.client.get(key)
+
+            if cached is not None:
+                self.client.hincrby(self.STATS_KEY, 'hits', 1)
+                return [entity_cls(**row) for row in json.loads(cached, object_hook=_decode)]
+
+            self.client.hincrby(self.STATS_KEY, 'misses', 1)
+        except RedisError:
+            logger.warning('cache unavailable, loading %s', key, exc_info=True)
+            return loader()
+
+        entities = loader()
+
+        try:
+            self.client.set(
+                key,
+                json.dumps(
+                    [{name: getattr(entity, name) for name in field_names} for entity in entities],
+                    default=_encode,
+                ),
+                ex=ttl,
+            )
+        except RedisError:
+            logger.warning('cache unavailable, not storing %s', key, exc_info=True)
+
+        return entities
+
+    def _bump_timeline_version(self, pipeline, user_id) -> None:
+        pipeline.incr(self._timeline_version_key(user_id))
+        pipeline.expire(self._timeline_version_key(user_id), self.timeline_ttl)
+
+    def _execute(self, pipeline) -> None:
+        # the database write has already been committed, so a missed
+        # invalidation only serves stale entries until they expire
+        try:
+            pipeline.execute()
+        except RedisError:
+            logger.warning('cache unavailable, entries expire on their own', exc_info=True)
+
+    def _timeline_version_key(self, user_id) -> str:
+        return 'rss:timeline:{}:version'.format(user_id)
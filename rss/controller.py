@@ -1,18 +1,37 @@
 import json
+import uuid
 
+from apollo_shared import exception
 from apollo_shared.schema import rss as rss_schema
 from apollo_shared.utils import Context
+from nameko.events import EventDispatcher, event_handler
 from nameko.rpc import rpc
+from nameko.web.handlers import http
 from nameko.timer import timer
 from apollo_shared.rpc.rss import RssRPC
 from nameko_sqlalchemy import Database
 from apollo_shared.alembic.models import Base as DeclarativeBase
 from .service import RssService
 from .dal import RssDAL
+from .breaker import HostCircuitBreaker
+from .cache import RssCache
+from .dependencies import FeedParser, Metrics, Redis
+from .fetcher import FeedFetcher
+from .ingest import IngestBatcher
+from .metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from .outbox import OutboxRelay
+from .scheduler import PollScheduler
+from .sharding import ShardCoordinator
+from .timeline import TimelineFanout
+from .websub import WebSubSubscriber
 
 
 class RssController(RssRPC):
     db = Database(DeclarativeBase)
+    redis = Redis('rss')
+    feed_parser = FeedParser()
+    dispatch = EventDispatcher()
+    metrics = Metrics()
 
     @rpc
     def subscribe_rss(self,
@@ -24,6 +43,27 @@ class RssController(RssRPC):
 
         return rss_schema.SubscribeRSSSchemaRPCResponse().dump(result)
 
+    @rpc
+    def subscribe_rss_async(self,
+                            context: Context,
+                            data: rss_schema.SubscribeRSSSchemaRPC
+                            ) -> rss_schema.SubscribeRSSSchemaRPCResponse:
+        rss_service = self.__get_rss_service(context)
+        result = rss_service.subscribe_rss_async(data)
+
+        return rss_schema.SubscribeRSSSchemaRPCResponse().dump(result)
+
+    @rpc
+    def get_subscription_status(self, context: Context, data: rss_schema.GetRSSSchemaRPC) -> dict:
+        rss_service = self.__get_rss_service(context)
+
+        return rss_service.get_subscription_status(data)
+
+    @event_handler('rss', 'rss_subscription_requested')
+    def validate_subscription(self, payload: dict):
+        rss_service = self.__get_rss_service(Context())
+        rss_service.validate_pending_rss(uuid.UUID(payload['rss_id']))
+
     @rpc
     def unsubscribe_rss(self, context: Context,
                         data: rss_schema.UnsubscribeRSSSchemaRPC):
@@ -61,7 +101,7 @@ class RssController(RssRPC):
                                       data: rss_schema.GetFeedsOfSubscribedRSSesSchemaRPC
                                       ) -> rss_schema.GetFeedsOfSubscribedRSSesSchemaRPCResponse:
         rss_service = self.__get_rss_service(context)
-        feeds = rss_service.get_feeds_of_subscribed_rsses()
+        feeds = rss_service.get_feeds_of_subscribed_rsses(data)
 
         return rss_schema.GetFeedsOfSubscribedRSSesSchemaRPCResponse(many=True).dump(feeds)
 
@@ -76,6 +116,13 @@ class RssController(RssRPC):
 
         return rss_schema.GetFeedsOfSubscribedRSSSchemaRPCResponse(many=True).dump(feeds)
 
+    @rpc
+    def search_feeds(self, context: Context, data: dict) -> rss_schema.GetFeedsOfSubscribedRSSesSchemaRPCResponse:
+        rss_service = self.__get_rss_service(context)
+        feeds = rss_service.search_feeds(data)
+
+        return rss_schema.GetFeedsOfSubscribedRSSesSchemaRPCResponse(many=True).dump(feeds)
+
     @rpc
     def add_comment_on_feed(self,
                             context: Context,
@@ -106,6 +153,12 @@ class RssController(RssRPC):
 
         return rss_schema.GetCommentOnFeedSchemaRPCResponse().dump(comment)
 
+    @rpc
+    def get_comments_counts_for_feeds(self, context: Context, data: dict) -> dict:
+        rss_service = self.__get_rss_service(context)
+
+        return rss_service.count_comments_on_subscribed_feeds(data)
+
     @rpc
     def delete_comment_on_feed(self,
                                context: Context,
@@ -126,6 +179,13 @@ class RssController(RssRPC):
 
         return rss_schema.AddToBookmarksSchemaRPCResponse().dump(new_bookmark)
 
+    @rpc
+    def add_to_bookmarks_batch(self, context: Context, data: dict) -> rss_schema.GetBookmarksSchemaRPCResponse:
+        rss_service = self.__get_rss_service(context)
+        bookmarks = rss_service.add_feeds_to_bookmarks(data)
+
+        return rss_schema.GetBookmarksSchemaRPCResponse(many=True).dump(bookmarks)
+
     @rpc
     def get_bookmarks(self,
                       context: Context,
@@ -145,6 +205,13 @@ class RssController(RssRPC):
 
         return rss_schema.GetBookmarkSchemaRPCResponse().dump(bookmark)
 
+    @rpc
+    def get_bookmarks_by_ids(self, context: Context, data: dict) -> rss_schema.GetBookmarksSchemaRPCResponse:
+        rss_service = self.__get_rss_service(context)
+        bookmarks = rss_service.get_user_bookmarks_by_ids(data)
+
+        return rss_schema.GetBookmarksSchemaRPCResponse(many=True).dump(bookmarks)
+
     @rpc
     def delete_from_bookmarks(self,
                               context: Context,
@@ -155,11 +222,58 @@ class RssController(RssRPC):
 
         return rss_schema.DeleteFromBookmarksSchemaRPCResponse().dump({})
 
+    @rpc
+    def get_cache_stats(self, context: Context, data: dict) -> dict:
+        rss_service = self.__get_rss_service(context)
+
+        return rss_service.get_cache_stats()
+
     @timer(interval=60)
     def update_feeds(self):
         rss_service = self.__get_rss_service(Context())
         rss_service.update_feeds()
 
+    @timer(interval=10)
+    def relay_outbox(self):
+        rss_service = self.__get_rss_service(Context())
+        rss_service.relay_outbox()
+
+    @http('GET', '/metrics')
+    def get_metrics(self, request):
+        return 200, {'Content-Type': METRICS_CONTENT_TYPE}, self.metrics.render()
+
+    @http('GET', '/websub/<uuid:rss_id>')
+    def verify_websub_subscription(self, request, rss_id):
+        rss_service = self.__get_rss_service(Context())
+
+        try:
+            challenge = rss_service.verify_websub_subscription(
+                rss_id,
+                request.args.get('hub.mode'),
+                request.args.get('hub.topic'),
+                request.args.get('hub.challenge'),
+                request.args.get('hub.lease_seconds', type=int),
+            )
+        except exception.NotFound:
+            return 404, ''
+
+        return 200, challenge
+
+    @http('POST', '/websub/<uuid:rss_id>')
+    def receive_websub_push(self, request, rss_id):
+        rss_service = self.__get_rss_service(Context())
+
+        try:
+            rss_service.receive_websub_push(
+                rss_id,
+                request.get_data(),
+                {key.lower(): value for key, value in request.headers.items()},
+            )
+        except exception.NotFound:
+            return 404, ''
+
+        return 202, ''
+
     def __get_rss_service(self, context: Context) -> RssService:
         rss_dal = RssDAL(
             db_session=self.db.session,
@@ -168,4 +282,16 @@ class RssController(RssRPC):
         return RssService(
             context=context,
             rss_dal=rss_dal,
+            rss_cache=RssCache.from_config(self.redis),
+            feed_fetcher=FeedFetcher.from_config(),
+            feed_parser=self.feed_parser,
+            ingest_batcher=IngestBatcher.from_config(),
+            poll_scheduler=PollScheduler.from_config(),
+            shard_coordinator=ShardCoordinator.from_config(rss_dal),
+            timeline_fanout=TimelineFanout.from_config(rss_dal),
+            host_breaker=HostCircuitBreaker.from_config(self.redis),
+            metrics=self.metrics,
+            websub=WebSubSubscriber.from_config(),
+            outbox_relay=OutboxRelay.from_config(rss_dal, self.dispatch),
+            event_dispatcher=self.dispatch,
         )
@@ -1,25 +1,69 @@
+import contextlib
+import itertools
+import typing
 import uuid
+from datetime import datetime
 
-from rss.models.rss import RssEntity, RssUserEntity
-from rss.models.feed import FeedEntity
-from rss.models.bookmark import BookmarkEntity
+from rss.models.rss import RssEntity, RssUserEntity, rss_user as rss_user_table, rsses as rsses_table, shard_for, STATUS_INVALID
+from rss.models.feed import FeedEntity, feeds as feeds_table
+from rss.models.bookmark import BookmarkEntity, bookmarks as bookmarks_table
 from rss.models.comment import CommentEntity
-from sqlalchemy import func, select
+from rss.models.outbox import OutboxEntity, FEEDS_INGESTED
+from rss.models.timeline import TimelineEntity, timelines as timelines_table
+from rss.models.worker import WorkerEntity, workers as workers_table
+from rss.search import InvertedIndex
+from sqlalchemy import JSON, cast, exists, func, literal, select, tuple_, true, type_coerce, union, UUID as UUIDField
+from sqlalchemy.dialects import postgresql, sqlite
+
+
+class ClaimedRsses(typing.NamedTuple):
+    rsses: [RssEntity]
+    due_at: typing.Optional[datetime]
 
 
 class RssDAL:
+    INSERT_BATCH_SIZE = 1000
+    SEARCH_CONFIG = 'english'
 
     def __init__(self, db_session):
         self.db_session = db_session
+        self._in_unit_of_work = False
 
     def fetch_rss_by_url_or_none(self, url: str) -> RssEntity | None:
         return self.db_session.query(RssEntity).filter(
             RssEntity.url == url
         ).one_or_none()
 
-    def create_rss(self, entity: RssEntity) -> None:
-        self.db_session.add(entity)
-        self.db_session.commit()
+    def fetch_rss_by_id_or_none(self, rss_id: uuid.UUID) -> RssEntity | None:
+        return self.db_session.query(RssEntity).filter(
+            RssEntity.id == rss_id
+        ).one_or_none()
+
+    def save_rss(self, rss: RssEntity) -> None:
+        self.db_session.add(rss)
+        self._commit()
+
+    @contextlib.contextmanager
+    def unit_of_work(self) -> typing.Iterator[None]:
+        if self._in_unit_of_work:
+            yield
+            return
+
+        self._in_unit_of_work = True
+        try:
+            yield
+            self.db_session.commit()
+        except Exception:
+            self.db_session.rollback()
+            raise
+        finally:
+            self._in_unit_of_work = False
+
+    def _commit(self) -> None:
+        if self._in_unit_of_work:
+            self.db_session.flush()
+        else:
+            self.db_session.commit()
 
     def check_user_attached_to_rss(self, user_id: str, rss_id: uuid.UUID) -> RssEntity | None:
         return self.db_session.query(RssUserEntity).filter(
@@ -27,75 +71,367 @@ class RssDAL:
             RssUserEntity.rss_id == rss_id,
         ).first()
 
-    def attach_rss_to_user(self, entity: RssUserEntity):
-        self.db_session.add(entity)
-        self.db_session.commit()
+    def upsert_rss_and_attach(self, rss: RssEntity, user_id) -> bool:
+        now = datetime.utcnow()
+        rss_id = rss.id or uuid.uuid4()
+        upsert = self._insert(rsses_table).values(
+            id=rss_id,
+            url=rss.url,
+            shard=shard_for(rss_id),
+            status=rss.status,
+            next_poll_at=rss.next_poll_at,
+            hub_url=rss.hub_url,
+            hub_topic=rss.hub_topic,
+            hub_secret=rss.hub_secret,
+            hub_requested_at=rss.hub_requested_at,
+            created_at=rss.created_at,
+            updated_at=rss.updated_at,
+        )
+        upsert = upsert.on_conflict_do_update(
+            index_elements=['url'],
+            set_={'url': upsert.excluded.url},
+        ).returning(rsses_table.c.id)
+        attach_values = {
+            'id': uuid.uuid4(),
+            'user_id': user_id,
+            'created_at': now,
+            'updated_at': now,
+        }
+
+        if self.db_session.get_bind().dialect.name == 'postgresql':
+            upserted = upsert.cte('upserted_rss')
+            attached = postgresql.insert(rss_user_table).from_select(
+                [*attach_values, 'rss_id'],
+                select(
+                    *(literal(value, rss_user_table.c[key].type) for key, value in attach_values.items()),
+                    upserted.c.id,
+                ),
+            ).on_conflict_do_nothing(
+                index_elements=['user_id', 'rss_id'],
+            ).returning(rss_user_table.c.rss_id).cte('attached')
+
+            rss_id, is_attached = self.db_session.execute(
+                select(
+                    upserted.c.id,
+                    attached.c.rss_id.is_not(None),
+                ).select_from(
+                    upserted.outerjoin(attached, true()),
+                )
+            ).one()
+        else:
+            rss_id = self.db_session.execute(upsert).scalar_one()
+            is_attached = self.db_session.execute(
+                sqlite.insert(rss_user_table).values(
+                    rss_id=rss_id,
+                    **attach_values,
+                ).on_conflict_do_nothing(
+                    index_elements=['user_id', 'rss_id'],
+                ).returning(rss_user_table.c.rss_id)
+            ).first() is not None
+
+        if rss.id != rss_id:
+            rss.id = rss_id
+
+        self._commit()
+
+        return is_attached
 
     def detach_rss_from_user(self, user_id, rss_id):
         self.db_session.query(RssUserEntity).filter(
             RssUserEntity.rss_id == rss_id,
             RssUserEntity.user_id == user_id,
         ).delete()
-        self.db_session.commit()
+        self._commit()
 
     def get_rsses(self, user_id):
         return self.db_session.query(
             RssEntity,
-        ).filter(
-            RssEntity.id == RssUserEntity.rss_id
+        ).join(
+            RssUserEntity, RssUserEntity.rss_id == RssEntity.id,
         ).filter(
             RssUserEntity.user_id == user_id
         ).all()
 
-    def get_rss_by_rss_id_and_user_id(self, rss_id, user_id) -> RssEntity | None:
-        return self.db_session.query(
-            RssEntity,
-        ).filter(
-            RssEntity.id == RssUserEntity.rss_id
-        ).filter(
-            RssUserEntity.user_id == user_id
-        ).filter(
-            RssEntity.id == rss_id
-        ).first()
-
     def get_feed_by_id_and_user_id(self, feed_id, user_id):
         return self.db_session.query(
             FeedEntity,
-        ).filter(
-            FeedEntity.rss_id == RssUserEntity.rss_id
+        ).join(
+            RssUserEntity, RssUserEntity.rss_id == FeedEntity.rss_id,
         ).filter(
             RssUserEntity.user_id == user_id
         ).filter(
             FeedEntity.id == feed_id
         ).first()
 
-    def get_feeds_by_user_id(self, user_id):
-        return self.db_session.query(
+    def get_feeds_by_user_id(
+            self,
+            user_id,
+            cursor: dict | None = None,
+            limit: int = 50,
+            data_fields: typing.Optional[typing.List[str]] = None,
+            with_stats: bool = False,
+    ) -> [FeedEntity]:
+        if self.db_session.get_bind().dialect.name == 'postgresql':
+            # each subscription contributes at most a page of its newest feeds
+            # through the (rss_id, created_at, id) index, so a page costs the
+            # same however many feeds the subscriptions have accumulated
+            latest = feeds_table.alias('latest')
+            newest = select(
+                latest.c.id,
+            ).filter(
+                latest.c.rss_id == RssUserEntity.rss_id,
+            )
+
+            if cursor is not None:
+                newest = newest.filter(
+                    tuple_(latest.c.created_at, latest.c.id) < (cursor['created_at'], cursor['id'])
+                )
+
+            newest = newest.order_by(
+                latest.c.created_at.desc(),
+                latest.c.id.desc(),
+            ).limit(limit).lateral()
+
+            query = self.db_session.query(
+                FeedEntity,
+            ).select_from(
+                RssUserEntity,
+            ).join(
+                newest, true(),
+            ).join(
+                FeedEntity, FeedEntity.id == newest.c.id,
+            ).filter(
+                RssUserEntity.user_id == user_id
+            )
+        else:
+            query = self.db_session.query(
+                FeedEntity,
+            ).join(
+                RssUserEntity, RssUserEntity.rss_id == FeedEntity.rss_id,
+            ).filter(
+                RssUserEntity.user_id == user_id
+            )
+
+        return self._paginate_feeds(query, cursor, limit, data_fields, user_id if with_stats else None)
+
+    def get_feeds_by_rss_id_and_user_id(
+            self,
+            rss_id,
+            user_id,
+            cursor: dict | None = None,
+            limit: int = 50,
+            data_fields: typing.Optional[typing.List[str]] = None,
+            with_stats: bool = False,
+    ) -> [FeedEntity]:
+        query = self.db_session.query(
             FeedEntity,
-        ).filter(
-            RssEntity.id == RssUserEntity.rss_id
-        ).filter(
-            RssEntity.id == FeedEntity.rss_id
+        ).join(
+            RssUserEntity, RssUserEntity.rss_id == FeedEntity.rss_id,
         ).filter(
             RssUserEntity.user_id == user_id
-        ).all()
+        ).filter(
+            FeedEntity.rss_id == rss_id
+        )
 
-    def get_feeds_by_rss_id_and_user_id(self, rss_id, user_id):
-        return self.db_session.query(
-            FeedEntity,
+        return self._paginate_feeds(query, cursor, limit, data_fields, user_id if with_stats else None)
+
+    def get_timeline_by_user_id(
+            self,
+            user_id,
+            cursor: dict | None = None,
+            limit: int = 50,
+            data_fields: typing.Optional[typing.List[str]] = None,
+            with_stats: bool = False,
+    ) -> [FeedEntity]:
+        fanned_out = select(
+            TimelineEntity.feed_id.label('feed_id'),
         ).filter(
-            RssEntity.id == RssUserEntity.rss_id
+            TimelineEntity.user_id == user_id,
+        )
+        if cursor is not None:
+            fanned_out = fanned_out.filter(
+                tuple_(TimelineEntity.created_at, TimelineEntity.feed_id) < (cursor['created_at'], cursor['id'])
+            )
+        fanned_out = fanned_out.order_by(
+            TimelineEntity.created_at.desc(),
+            TimelineEntity.feed_id.desc(),
+        ).limit(limit).subquery()
+
+        popular = select(
+            FeedEntity.id.label('feed_id'),
+        ).join(
+            RssUserEntity, RssUserEntity.rss_id == FeedEntity.rss_id,
+        ).join(
+            RssEntity, RssEntity.id == FeedEntity.rss_id,
         ).filter(
-            RssEntity.id == FeedEntity.rss_id
+            RssUserEntity.user_id == user_id,
+            RssEntity.fanout_disabled.is_(True),
+        )
+        if cursor is not None:
+            popular = popular.filter(
+                tuple_(FeedEntity.created_at, FeedEntity.id) < (cursor['created_at'], cursor['id'])
+            )
+        popular = popular.order_by(
+            FeedEntity.created_at.desc(),
+            FeedEntity.id.desc(),
+        ).limit(limit).subquery()
+
+        feed_ids = union(
+            select(fanned_out.c.feed_id),
+            select(popular.c.feed_id),
+        ).subquery()
+
+        query = self.db_session.query(
+            FeedEntity,
+        ).join(
+            feed_ids, feed_ids.c.feed_id == FeedEntity.id,
+        )
+
+        return self._paginate_feeds(query, None, limit, data_fields, user_id if with_stats else None)
+
+    def _paginate_feeds(
+            self,
+            query,
+            cursor: dict | None,
+            limit: int,
+            data_fields: typing.Optional[typing.List[str]],
+            stats_user_id=None,
+    ) -> [FeedEntity]:
+        if cursor is not None:
+            query = query.filter(
+                tuple_(FeedEntity.created_at, FeedEntity.id) < (cursor['created_at'], cursor['id'])
+            )
+
+        if data_fields is not None:
+            query = query.with_entities(
+                *(column for column in feeds_table.c if column.key not in ('data', 'content', 'search_vector')),
+                self._project_data(data_fields).label('data'),
+            )
+
+        if stats_user_id is not None:
+            query = query.add_columns(
+                select(
+                    func.count(CommentEntity.id),
+                ).filter(
+                    CommentEntity.feed_id == FeedEntity.id,
+                ).scalar_subquery().label('comment_count'),
+                exists().where(
+                    BookmarkEntity.feed_id == FeedEntity.id,
+                    BookmarkEntity.user_id == stats_user_id,
+                ).label('bookmarked'),
+            )
+
+        rows = query.order_by(
+            FeedEntity.created_at.desc(),
+            FeedEntity.id.desc(),
+        ).limit(limit).all()
+
+        if data_fields is not None:
+            return [
+                FeedEntity(**{
+                    **row._asdict(),
+                    'data': {key: value for key, value in row.data.items() if value is not None},
+                })
+                for row in rows
+            ]
+
+        if stats_user_id is None:
+            return rows
+
+        feeds = []
+        for feed, comment_count, bookmarked in rows:
+            feed.comment_count = comment_count
+            feed.bookmarked = bookmarked
+            feeds.append(feed)
+
+        return feeds
+
+    def _project_data(self, data_fields: [str]):
+        if self.db_session.get_bind().dialect.name == 'postgresql':
+            build_object = func.jsonb_build_object
+        else:
+            build_object = func.json_object
+
+        return type_coerce(
+            build_object(*itertools.chain.from_iterable(
+                (literal(key), FeedEntity.data[key]) for key in data_fields
+            )),
+            JSON,
+        )
+
+    def search_feeds(self, user_id, query: str, limit: int = 50, offset: int = 0) -> [FeedEntity]:
+        subscribed = self.db_session.query(
+            FeedEntity,
+        ).join(
+            RssUserEntity, RssUserEntity.rss_id == FeedEntity.rss_id,
         ).filter(
             RssUserEntity.user_id == user_id
-        ).filter(
-            RssEntity.id == rss_id
-        ).all()
+        )
+
+        if self.db_session.get_bind().dialect.name == 'postgresql':
+            ts_query = func.websearch_to_tsquery(cast(self.SEARCH_CONFIG, postgresql.REGCONFIG), query)
+
+            return subscribed.filter(
+                feeds_table.c.search_vector.bool_op('@@')(ts_query)
+            ).order_by(
+                func.ts_rank_cd(feeds_table.c.search_vector, ts_query).desc(),
+                FeedEntity.created_at.desc(),
+                FeedEntity.id.desc(),
+            ).limit(limit).offset(offset).all()
+
+        index = InvertedIndex()
+        for row in subscribed.with_entities(
+            FeedEntity.id, FeedEntity.title, FeedEntity.summary, FeedEntity.author,
+        ).order_by(
+            FeedEntity.created_at.desc(),
+            FeedEntity.id.desc(),
+        ):
+            index.add(row.id, {'title': row.title, 'summary': row.summary, 'author': row.author})
+
+        feed_ids = [feed_id for feed_id, _ in index.search(query)[offset:offset + limit]]
+        feeds = {feed.id: feed for feed in subscribed.filter(FeedEntity.id.in_(feed_ids))}
+
+        return [feeds[feed_id] for feed_id in feed_ids]
 
     def store_bookmark(self, bookmark: BookmarkEntity) -> None:
         self.db_session.add(bookmark)
-        self.db_session.commit()
+        self._commit()
+
+    def store_bookmarks(self, user_id, feed_ids: [uuid.UUID]) -> [BookmarkEntity]:
+        try:
+            rows = {
+                row.feed_id: row for row in self.db_session.execute(
+                    select(bookmarks_table).filter(
+                        bookmarks_table.c.user_id == user_id,
+                        bookmarks_table.c.feed_id.in_(feed_ids),
+                    )
+                )
+            }
+            missing_feed_ids = [feed_id for feed_id in feed_ids if feed_id not in rows]
+
+            if missing_feed_ids:
+                now = datetime.utcnow()
+                rows.update(
+                    (row.feed_id, row) for row in self.db_session.execute(
+                        self._insert(bookmarks_table).values([
+                            {
+                                'id': uuid.uuid4(),
+                                'user_id': user_id,
+                                'feed_id': feed_id,
+                                'created_at': now,
+                                'updated_at': now,
+                            }
+                            for feed_id in missing_feed_ids
+                        ]).returning(*bookmarks_table.c)
+                    )
+                )
+
+            self._commit()
+        except Exception:
+            self.db_session.rollback()
+            raise
+
+        return [BookmarkEntity(**rows[feed_id]._asdict()) for feed_id in feed_ids]
 
     def fetch_bookmark_by_user_id_and_feed_id(self, user_id, feed_id) -> BookmarkEntity | None:
         return self.db_session.query(
@@ -120,6 +456,14 @@ class RssDAL:
             BookmarkEntity.user_id == user_id,
         ).one_or_none()
 
+    def fetch_bookmarks_by_ids_and_user_id(self, bookmark_ids: [uuid.UUID], user_id) -> [BookmarkEntity]:
+        return self.db_session.query(
+            BookmarkEntity,
+        ).filter(
+            BookmarkEntity.id.in_(bookmark_ids),
+            BookmarkEntity.user_id == user_id,
+        ).all()
+
     def delete_bookmark_by_id_and_user_id(self, bookmark_id: str, user_id: str) -> None:
         self.db_session.query(
             BookmarkEntity,
@@ -127,25 +471,42 @@ class RssDAL:
             BookmarkEntity.id == bookmark_id,
             BookmarkEntity.user_id == user_id,
         ).delete()
-        self.db_session.commit()
+        self._commit()
 
     def store_comment(self, comment: CommentEntity) -> None:
         self.db_session.add(comment)
-        self.db_session.commit()
+        self._commit()
 
     def fetch_comments_on_subscribed_feed_by_feed_id(self, feed_id: str, user_id: str):
         return self.db_session.query(
             CommentEntity,
+        ).join(
+            FeedEntity, FeedEntity.id == CommentEntity.feed_id,
+        ).join(
+            RssUserEntity, RssUserEntity.rss_id == FeedEntity.rss_id,
         ).filter(
             CommentEntity.feed_id == feed_id,
-        ).filter(
-            FeedEntity.id == CommentEntity.feed_id,
-        ).filter(
-            FeedEntity.rss_id == RssUserEntity.rss_id,
         ).filter(
             RssUserEntity.user_id == user_id,
         ).all()
 
+    def count_comments_on_subscribed_feeds_by_feed_ids(self, feed_ids: [uuid.UUID], user_id) -> typing.Dict[uuid.UUID, int]:
+        return dict(
+            self.db_session.query(
+                CommentEntity.feed_id,
+                func.count(CommentEntity.id),
+            ).join(
+                FeedEntity, FeedEntity.id == CommentEntity.feed_id,
+            ).join(
+                RssUserEntity, RssUserEntity.rss_id == FeedEntity.rss_id,
+            ).filter(
+                CommentEntity.feed_id.in_(feed_ids),
+                RssUserEntity.user_id == user_id,
+            ).group_by(
+                CommentEntity.feed_id,
+            ).all()
+        )
+
     def fetch_comment_on_subscribed_feed_by_feed_id(self,
                                                     comment_id: uuid.UUID,
                                                     feed_id: uuid.UUID,
@@ -153,13 +514,13 @@ class RssDAL:
                                                     ) -> CommentEntity | None:
         return self.db_session.query(
             CommentEntity,
+        ).join(
+            FeedEntity, FeedEntity.id == CommentEntity.feed_id,
+        ).join(
+            RssUserEntity, RssUserEntity.rss_id == FeedEntity.rss_id,
         ).filter(
             CommentEntity.id == comment_id,
             CommentEntity.feed_id == feed_id,
-        ).filter(
-            FeedEntity.id == CommentEntity.feed_id,
-        ).filter(
-            FeedEntity.rss_id == RssUserEntity.rss_id,
         ).filter(
             RssUserEntity.user_id == user_id,
         ).one_or_none()
@@ -171,28 +532,286 @@ class RssDAL:
             CommentEntity.id == comment_id,
             CommentEntity.user_id == user_id,
         ).delete()
-        self.db_session.commit()
+        self._commit()
 
-    def get_all_rsses(self) -> [RssEntity]:
+    def get_subscriber_ids(self, rss_ids) -> [uuid.UUID]:
+        return [
+            user_id for user_id, in self.db_session.query(
+                RssUserEntity.user_id,
+            ).filter(
+                RssUserEntity.rss_id.in_(rss_ids),
+            ).distinct()
+        ]
+
+    def count_subscribers_by_rss_ids(self, rss_ids) -> typing.Dict[uuid.UUID, int]:
+        return dict(
+            self.db_session.query(
+                RssUserEntity.rss_id,
+                func.count(RssUserEntity.id),
+            ).filter(
+                RssUserEntity.rss_id.in_(rss_ids),
+            ).group_by(
+                RssUserEntity.rss_id,
+            ).all()
+        )
+
+    def count_subscribers(self, rss_id) -> int:
         return self.db_session.query(
+            func.count(RssUserEntity.id),
+        ).filter(
+            RssUserEntity.rss_id == rss_id,
+        ).scalar()
+
+    def disable_fanout(self, rss: RssEntity) -> None:
+        self.db_session.query(
             RssEntity,
-        ).all()
+        ).filter(
+            RssEntity.id == rss.id,
+        ).update({'fanout_disabled': True}, synchronize_session=False)
+        rss.fanout_disabled = True
+        self._commit()
 
-    def insert_feeds(self, feeds: [FeedEntity]) -> None:
-        self.db_session.bulk_save_objects(feeds)
-        self.db_session.commit()
+    def backfill_timeline(self, user_id, rss_id) -> None:
+        self.db_session.execute(
+            self._insert(timelines_table).from_select(
+                ['user_id', 'feed_id', 'created_at'],
+                select(
+                    literal(user_id, UUIDField(as_uuid=True)),
+                    FeedEntity.id,
+                    FeedEntity.created_at,
+                ).filter(
+                    FeedEntity.rss_id == rss_id,
+                ),
+            ).on_conflict_do_nothing()
+        )
+        self._commit()
 
-    def get_rsses_last_feeds(self) -> [FeedEntity]:
-        subquery = self.db_session.query(
-            FeedEntity,
-            func.rank().over(
-                order_by=FeedEntity.created_at.desc(),
-                partition_by=FeedEntity.guid,
-            ).label('rnk')
-        ).subquery()
+    def remove_from_timeline(self, user_id, rss_id) -> None:
+        self.db_session.query(
+            TimelineEntity,
+        ).filter(
+            TimelineEntity.user_id == user_id,
+            TimelineEntity.feed_id.in_(
+                select(FeedEntity.id).filter(FeedEntity.rss_id == rss_id)
+            ),
+        ).delete(synchronize_session=False)
+        self._commit()
 
-        return self.db_session.query(
-            subquery,
+    def fan_out_feeds(self, feed_ids: [uuid.UUID]) -> None:
+        for start in range(0, len(feed_ids), self.INSERT_BATCH_SIZE):
+            self.db_session.execute(
+                self._insert(timelines_table).from_select(
+                    ['user_id', 'feed_id', 'created_at'],
+                    select(
+                        RssUserEntity.user_id,
+                        FeedEntity.id,
+                        FeedEntity.created_at,
+                    ).join(
+                        FeedEntity, FeedEntity.rss_id == RssUserEntity.rss_id,
+                    ).join(
+                        RssEntity, RssEntity.id == FeedEntity.rss_id,
+                    ).filter(
+                        FeedEntity.id.in_(feed_ids[start:start + self.INSERT_BATCH_SIZE]),
+                        RssEntity.fanout_disabled.is_(False),
+                    ),
+                ).on_conflict_do_nothing()
+            )
+
+        self._commit()
+
+    def claim_due_rsses(self,
+                        now: datetime,
+                        claim_until: datetime,
+                        limit: int,
+                        shards: typing.Optional[typing.List[int]] = None,
+                        rss_ids: typing.Optional[typing.List[uuid.UUID]] = None) -> ClaimedRsses:
+        query = self.db_session.query(
+            RssEntity,
+        ).filter(
+            RssEntity.next_poll_at <= now,
+            RssEntity.status != STATUS_INVALID,
+        )
+
+        if shards is not None:
+            query = query.filter(RssEntity.shard.in_(shards))
+
+        if rss_ids is not None:
+            query = query.filter(RssEntity.id.in_(rss_ids))
+
+        rsses = query.order_by(
+            RssEntity.next_poll_at,
+        ).limit(limit).with_for_update(skip_locked=True).all()
+
+        # rows come back oldest first, so the first one is the most overdue
+        # before claiming moves its next_poll_at forward
+        due_at = rsses[0].next_poll_at if rsses else None
+
+        claimed_ids = []
+        for rss in rsses:
+            rss.next_poll_at = claim_until
+            claimed_ids.append(rss.id)
+
+        self._commit()
+
+        if not claimed_ids:
+            return ClaimedRsses([], None)
+
+        # reload the claimed rows in one query so that fetching them from
+        # green threads does not lazy-load the expired attributes
+        claimed = self.db_session.query(
+            RssEntity,
         ).filter(
-            subquery.c.rnk == 1,
+            RssEntity.id.in_(claimed_ids),
         ).all()
+
+        # claimed rows are detached until save_ingest_batch adds them back, so
+        # committing one batch does not expire the rows of the batches after it
+        for rss in claimed:
+            self.db_session.expunge(rss)
+
+        return ClaimedRsses(claimed, due_at)
+
+    def heartbeat_worker(self, worker_id: str, now: datetime) -> None:
+        self.db_session.execute(
+            self._insert(workers_table).values(
+                id=worker_id,
+                heartbeat_at=now,
+                started_at=now,
+            ).on_conflict_do_update(
+                index_elements=['id'],
+                set_={'heartbeat_at': now},
+            )
+        )
+        self._commit()
+
+    def get_live_worker_ids(self, since: datetime) -> [str]:
+        return self.db_session.scalars(
+            select(WorkerEntity.id).filter(
+                WorkerEntity.heartbeat_at >= since,
+            ).order_by(
+                WorkerEntity.started_at,
+                WorkerEntity.id,
+            )
+        ).all()
+
+    def expire_workers(self, before: datetime) -> None:
+        self.db_session.query(WorkerEntity).filter(
+            WorkerEntity.heartbeat_at < before,
+        ).delete()
+        self._commit()
+
+    def save_ingest_batch(self, rsses: [RssEntity], feeds: [FeedEntity]) -> [uuid.UUID]:
+        try:
+            inserted = self._insert_feeds(feeds)
+            self.db_session.add_all(rsses)
+
+            # written in the same transaction as the feeds, so the event is
+            # published if and only if they were stored
+            if inserted:
+                self.db_session.add(self._feeds_ingested_event(inserted))
+
+            self._commit()
+        except Exception:
+            self.db_session.rollback()
+            raise
+
+        return [feed_id for feed_id, _ in inserted]
+
+    def _feeds_ingested_event(self, inserted: [typing.Tuple[uuid.UUID, uuid.UUID]]) -> OutboxEntity:
+        feed_ids = {}
+        for feed_id, rss_id in inserted:
+            feed_ids.setdefault(rss_id, []).append(str(feed_id))
+
+        subscriber_counts = self.count_subscribers_by_rss_ids(list(feed_ids))
+
+        return OutboxEntity(
+            event_type=FEEDS_INGESTED,
+            payload={
+                'rsses': [
+                    {
+                        'rss_id': str(rss_id),
+                        'feed_ids': ids,
+                        'subscriber_count': subscriber_counts.get(rss_id, 0),
+                    }
+                    for rss_id, ids in feed_ids.items()
+                ],
+            },
+        )
+
+    def fetch_unpublished_events(self, limit: int) -> [OutboxEntity]:
+        query = self.db_session.query(OutboxEntity).filter(
+            OutboxEntity.published_at.is_(None),
+        ).order_by(
+            OutboxEntity.created_at,
+        ).limit(limit)
+
+        # concurrent relays skip each other's rows instead of publishing them twice
+        if self.db_session.get_bind().dialect.name == 'postgresql':
+            query = query.with_for_update(skip_locked=True)
+
+        return query.all()
+
+    def mark_events_published(self, event_ids: [uuid.UUID], now: datetime) -> None:
+        self.db_session.query(OutboxEntity).filter(
+            OutboxEntity.id.in_(event_ids),
+        ).update({
+            OutboxEntity.published_at: now,
+            OutboxEntity.updated_at: now,
+        }, synchronize_session=False)
+        self._commit()
+
+    def purge_published_events(self, before: datetime) -> None:
+        self.db_session.query(OutboxEntity).filter(
+            OutboxEntity.published_at < before,
+        ).delete(synchronize_session=False)
+        self._commit()
+
+    def _insert_feeds(self, feeds: [FeedEntity]) -> [typing.Tuple[uuid.UUID, uuid.UUID]]:
+        inserted = []
+
+        for start in range(0, len(feeds), self.INSERT_BATCH_SIZE):
+            inserted += self.db_session.execute(
+                self._insert(feeds_table).values([
+                    {
+                        'id': feed.id or uuid.uuid4(),
+                        'rss_id': feed.rss_id,
+                        'data': feed.data,
+                        'guid': feed.guid,
+                        'title': feed.title,
+                        'link': feed.link,
+                        'published_at': feed.published_at,
+                        'author': feed.author,
+                        'summary': feed.summary,
+                        'content': feed.content,
+                        'search_vector': self._search_vector(feed),
+                        'created_at': feed.created_at,
+                        'updated_at': feed.updated_at,
+                    }
+                    for feed in feeds[start:start + self.INSERT_BATCH_SIZE]
+                ]).on_conflict_do_nothing(
+                    index_elements=['rss_id', 'guid'],
+                ).returning(
+                    feeds_table.c.id,
+                    feeds_table.c.rss_id,
+                )
+            ).tuples().all()
+
+        return inserted
+
+    def _search_vector(self, feed: FeedEntity):
+        if self.db_session.get_bind().dialect.name != 'postgresql':
+            return None
+
+        config = cast(self.SEARCH_CONFIG, postgresql.REGCONFIG)
+
+        return func.setweight(func.to_tsvector(config, feed.title or ''), 'A').op('||')(
+            func.setweight(func.to_tsvector(config, feed.summary or ''), 'B')
+        ).op('||')(
+            func.setweight(func.to_tsvector(config, feed.author or ''), 'C')
+        )
+
+    def _insert(self, table):
+        if self.db_session.get_bind().dialect.name == 'postgresql':
+            return postgresql.insert(table)
+
+        return sqlite.insert(table)
@@ -0,0 +1,109 @@
+import time
+from dataclasses import dataclass
+
+import greenlet
+import redis
+from nameko.extensions import DependencyProvider
+
+from .metrics import RssMetrics
+from .parser import ParserPool
+from .profiler import QueryProfiler
+
+
+class Redis(DependencyProvider):
+
+    def __init__(self, key: str):
+        self.key = key
+        self.client = None
+
+    def setup(self):
+        self.redis_uri = self.container.config['REDIS_URIS'][self.key]
+
+    def start(self):
+        self.client = redis.Redis.from_url(self.redis_uri, decode_responses=True)
+
+    def stop(self):
+        self.client.close()
+        self.client = None
+
+    def kill(self):
+        self.stop()
+
+    def get_dependency(self, worker_ctx):
+        return self.client
+
+
+class FeedParser(DependencyProvider):
+
+    def __init__(self):
+        self.pool = None
+
+    def setup(self):
+        self.workers = int(self.container.config.get('FEED_PARSE_WORKERS', 0))
+        self.timeout = float(self.container.config.get('FEED_PARSE_TIMEOUT', 30))
+
+    def start(self):
+        self.pool = ParserPool(self.workers, self.timeout)
+        self.pool.start()
+
+    def stop(self):
+        self.pool.stop()
+        self.pool = None
+
+    def kill(self):
+        self.stop()
+
+    def get_dependency(self, worker_ctx):
+        return self.pool
+
+
+@dataclass
+class _Call:
+    method: str
+    started_at: float
+
+
+class Metrics(DependencyProvider):
+
+    def __init__(self):
+        self.metrics = None
+        self.profiler = None
+        self._calls = {}
+
+    def setup(self):
+        self.metrics = RssMetrics()
+        self.profiler = QueryProfiler.from_config()
+
+    def start(self):
+        self.profiler.start()
+
+    def stop(self):
+        self.profiler.stop()
+
+    def kill(self):
+        self.stop()
+
+    def get_dependency(self, worker_ctx):
+        return self.metrics
+
+    # nameko runs the setup, the entrypoint and the teardown of a worker in one
+    # green thread, which is how the profiler attributes statements to it
+    def worker_setup(self, worker_ctx):
+        self._calls[greenlet.getcurrent()] = _Call(worker_ctx.entrypoint.method_name, time.perf_counter())
+        self.profiler.begin()
+
+    def worker_teardown(self, worker_ctx):
+        call = self._calls.pop(greenlet.getcurrent(), None)
+        profile = self.profiler.end()
+
+        if call is None or profile is None:
+            return
+
+        self.metrics.rpc_duration.observe(time.perf_counter() - call.started_at, call.method)
+        self.metrics.rpc_statements.observe(profile.statement_count, call.method)
+
+        for record in profile.records:
+            self.metrics.query_duration.observe(record.duration, call.method)
+
+        if profile.rows:
+            self.metrics.query_rows.inc(call.method, amount=profile.rows)
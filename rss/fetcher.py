@@ -0,0 +1,122 @@
+import time
+import typing
+from dataclasses import dataclass, field
+from urllib.parse import urlsplit
+
+import eventlet
+import feedparser
+import requests
+from feedparser.http import ACCEPT_HEADER
+from eventlet.greenpool import GreenPool
+from eventlet.semaphore import Semaphore
+from nameko import config
+
+from .models.rss import RssEntity
+
+
+def url_host(url: str) -> str:
+    return urlsplit(url).netloc.lower()
+
+
+@dataclass
+class FetchResult:
+    status: typing.Optional[int] = None
+    content: bytes = b''
+    headers: dict = field(default_factory=dict)
+    error: typing.Optional[str] = None
+    elapsed: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and self.status is not None and self.status < 400
+
+    @property
+    def not_modified(self) -> bool:
+        return self.status == 304
+
+
+@dataclass
+class FetchRequest:
+    url: str
+    etag: typing.Optional[str] = None
+    last_modified: typing.Optional[str] = None
+
+
+class FeedFetcher:
+
+    def __init__(self, pool_size: int, per_host_limit: int, timeout: float):
+        self.pool_size = pool_size
+        self.per_host_limit = per_host_limit
+        self.timeout = timeout
+        self._host_semaphores: dict[str, Semaphore] = {}
+
+    @classmethod
+    def from_config(cls) -> 'FeedFetcher':
+        return cls(
+            pool_size=int(config.get('FEED_FETCH_POOL_SIZE', 100)),
+            per_host_limit=int(config.get('FEED_FETCH_PER_HOST_LIMIT', 4)),
+            timeout=float(config.get('FEED_FETCH_TIMEOUT', 15)),
+        )
+
+    def fetch_all(self, rsses: [RssEntity]) -> typing.Iterator[typing.Tuple[RssEntity, FetchResult]]:
+        pool = GreenPool(self.pool_size)
+        # green threads must not touch the session, so read everything they
+        # need before the caller starts committing
+        fetch_requests = [FetchRequest(rss.url, rss.etag, rss.last_modified) for rss in rsses]
+
+        return zip(rsses, pool.imap(self.fetch, fetch_requests))
+
+    def fetch(self, rss: typing.Union[RssEntity, FetchRequest]) -> FetchResult:
+        started_at = time.perf_counter()
+        result = self._fetch(rss)
+        result.elapsed = time.perf_counter() - started_at
+
+        return result
+
+    def _fetch(self, rss: typing.Union[RssEntity, FetchRequest]) -> FetchResult:
+        with self._host_semaphore(rss.url):
+            response = None
+
+            try:
+                with eventlet.Timeout(self.timeout, False):
+                    response = requests.get(
+                        rss.url,
+                        headers=self._request_headers(rss),
+                        timeout=self.timeout,
+                    )
+            except requests.RequestException as e:
+                return FetchResult(error=str(e))
+
+        if response is None:
+            return FetchResult(error='timed out after {}s'.format(self.timeout))
+
+        headers = {key.lower(): value for key, value in response.headers.items()}
+        headers.setdefault('content-location', response.url)
+
+        return FetchResult(
+            status=response.status_code,
+            content=response.content,
+            headers=headers,
+        )
+
+    def _request_headers(self, rss: typing.Union[RssEntity, FetchRequest]) -> dict:
+        headers = {
+            'User-Agent': feedparser.USER_AGENT,
+            'Accept': ACCEPT_HEADER,
+        }
+
+        if rss.etag:
+            headers['If-None-Match'] = rss.etag
+
+        if rss.last_modified:
+            headers['If-Modified-Since'] = rss.last_modified
+
+        return headers
+
+    def _host_semaphore(self, url: str) -> Semaphore:
+        host = url_host(url)
+
+        if host not in self._host_semaphores:
+            self._host_semaphores[host] = Semaphore(self.per_host_limit)
+
+        return self._host_semaphores[host]
@@ -0,0 +1,48 @@
+import typing
+from dataclasses import dataclass, field
+
+from nameko import config
+
+from .models.feed import FeedEntity
+from .models.rss import RssEntity
+
+
+@dataclass
+class IngestBatch:
+    rsses: typing.List[RssEntity] = field(default_factory=list)
+    feeds: typing.List[FeedEntity] = field(default_factory=list)
+    size: int = 0
+
+
+class IngestBatcher:
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+    @classmethod
+    def from_config(cls) -> 'IngestBatcher':
+        return cls(
+            max_entries=int(config.get('FEED_INGEST_BATCH_SIZE', 500)),
+            max_bytes=int(config.get('FEED_INGEST_BATCH_BYTES', 8 * 1024 * 1024)),
+        )
+
+    def batches(
+            self,
+            items: typing.Iterable[typing.Tuple[RssEntity, typing.List[FeedEntity], int]],
+    ) -> typing.Iterator[IngestBatch]:
+        batch = IngestBatch()
+
+        # a feed's entries always travel with its rss state, otherwise a failed
+        # batch could leave recent_guids pointing at entries that were never stored
+        for rss, feeds, size in items:
+            batch.rsses.append(rss)
+            batch.feeds += feeds
+            batch.size += size
+
+            if len(batch.feeds) >= self.max_entries or batch.size >= self.max_bytes:
+                yield batch
+                batch = IngestBatch()
+
+        if batch.rsses:
+            yield batch
@@ -0,0 +1,159 @@
+import math
+import time
+import typing
+from contextlib import contextmanager
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LATENCY_BUCKETS = (.001, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30, 60)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250, 1000)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name: str, documentation: str, labelnames: typing.Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+
+    def _key(self, labels: tuple) -> tuple:
+        if len(labels) != len(self.labelnames):
+            raise ValueError('{} expects labels {}'.format(self.name, self.labelnames))
+
+        return tuple(str(label) for label in labels)
+
+    def samples(self) -> typing.Iterator[typing.Tuple[str, dict, float]]:
+        for labels, value in sorted(self._values.items()):
+            yield self.name, dict(zip(self.labelnames, labels)), value
+
+    def render(self) -> str:
+        lines = [
+            '# HELP {} {}'.format(self.name, self.documentation),
+            '# TYPE {} {}'.format(self.name, self.type),
+        ]
+
+        for name, labels, value in self.samples():
+            if labels:
+                name = '{}{{{}}}'.format(
+                    name,
+                    ','.join('{}="{}"'.format(key, _escape(label)) for key, label in labels.items()),
+                )
+
+            lines.append('{} {}'.format(name, _format_value(value)))
+
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, *labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(Metric):
+    type = 'gauge'
+
+    def set(self, value: float, *labels) -> None:
+        self._values[self._key(labels)] = value
+
+    def value(self, *labels) -> typing.Optional[float]:
+        return self._values.get(self._key(labels))
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self,
+                 name: str,
+                 documentation: str,
+                 labelnames: typing.Sequence[str] = (),
+                 buckets: typing.Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, *labels) -> None:
+        key = self._key(labels)
+        counts, total = self._values.get(key, ([0] * len(self.buckets), 0))
+
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[index] += 1
+
+        self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, *labels):
+        started_at = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started_at, *labels)
+
+    def count(self, *labels) -> int:
+        counts, _ = self._values.get(self._key(labels), ([0], 0))
+
+        return counts[-1]
+
+    def samples(self) -> typing.Iterator[typing.Tuple[str, dict, float]]:
+        for labels, (counts, total) in sorted(self._values.items()):
+            labels = dict(zip(self.labelnames, labels))
+
+            for bound, count in zip(self.buckets, counts):
+                yield '{}_bucket'.format(self.name), {**labels, 'le': _format_value(bound)}, count
+
+            yield '{}_sum'.format(self.name), labels, total
+            yield '{}_count'.format(self.name), labels, counts[-1]
+
+
+class RssMetrics:
+
+    def __init__(self):
+        self.rpc_duration = Histogram(
+            'rss_rpc_duration_seconds', 'Entrypoint latency.', ('method',),
+        )
+        self.rpc_statements = Histogram(
+            'rss_rpc_db_statements', 'SQL statements executed per entrypoint call.', ('method',), COUNT_BUCKETS,
+        )
+        self.query_duration = Histogram(
+            'rss_db_query_duration_seconds', 'SQL statement latency by calling entrypoint.', ('method',),
+        )
+        self.query_rows = Counter(
+            'rss_db_rows_total', 'Rows returned or affected as reported by the driver.', ('method',),
+        )
+        self.ingest_stage_duration = Histogram(
+            'rss_ingest_stage_duration_seconds', 'Time spent per feed fetch, per feed parse and per batch insert.', ('stage',),
+        )
+        self.fetched_bytes = Counter(
+            'rss_fetched_bytes_total', 'Feed document bytes downloaded.',
+        )
+        self.ingested_entries = Counter(
+            'rss_ingested_entries_total', 'New feed entries stored.',
+        )
+        self.sweep_lag = Gauge(
+            'rss_sweep_lag_seconds', 'How long the most overdue feed of the last sweep waited past its poll time.',
+        )
+
+    def __iter__(self) -> typing.Iterator[Metric]:
+        return (value for value in vars(self).values() if isinstance(value, Metric))
+
+    def render(self) -> str:
+        return '\n'.join(metric.render() for metric in self) + '\n'
@@ -3,7 +3,7 @@ from datetime import datetime
 from uuid import UUID
 from dataclasses import dataclass, field
 from apollo_shared.alembic import models as common_models
-from sqlalchemy import Table, Column, ForeignKey, JSON, UUID as UUIDField, Text
+from sqlalchemy import Table, Column, ForeignKey, Index, JSON, UUID as UUIDField, Text
 
 
 @dataclass
@@ -27,6 +27,7 @@ bookmarks = Table(
     Column('user_id', UUIDField(as_uuid=True)),
     common_models.created_at_column(),
     common_models.updated_at_column(),
+    Index('ix_bookmarks_user_id_feed_id', 'user_id', 'feed_id'),
 )
 
 common_models.mapper_registry.map_imperatively(BookmarkEntity, bookmarks)
@@ -1,9 +1,19 @@
 import typing
+import zlib
 from datetime import datetime
 from uuid import UUID
 from dataclasses import dataclass, field
 from apollo_shared.alembic import models as common_models
-from sqlalchemy import Table, Column, ForeignKey, JSON, UUID as UUIDField, Text
+from sqlalchemy import Table, Column, DateTime, ForeignKey, Index, JSON, LargeBinary, UUID as UUIDField, Text
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
+from sqlalchemy.orm import deferred
+
+TEXT_DATA_FIELDS = ('title', 'link', 'published', 'updated', 'author', 'summary')
+DATA_FIELDS = TEXT_DATA_FIELDS + ('tags', 'enclosures')
+
+
+def compress_content(content: str) -> bytes:
+    return zlib.compress(content.encode())
 
 
 @dataclass
@@ -13,22 +23,51 @@ class FeedEntity:
     guid: str
 
     id: typing.Optional[UUID] = None
+    title: typing.Optional[str] = None
+    link: typing.Optional[str] = None
+    published_at: typing.Optional[datetime] = None
+    author: typing.Optional[str] = None
+    summary: typing.Optional[str] = None
+    content: typing.Optional[bytes] = None
     created_at: typing.Optional[datetime] = field(
         default_factory=datetime.utcnow
     )
     updated_at: typing.Optional[datetime] = field(
         default_factory=datetime.utcnow
     )
+    comment_count: typing.Optional[int] = None
+    bookmarked: typing.Optional[bool] = None
+
+    @property
+    def full_content(self) -> typing.Optional[str]:
+        return zlib.decompress(self.content).decode() if self.content else None
 
 
 feeds = Table(
     'feeds', common_models.metadata,
     common_models.uuid_primary_key_column(),
     Column('rss_id', UUIDField(as_uuid=True), ForeignKey('rsses.id'), nullable=False),
-    Column('data', JSON, default={}),
+    Column('data', JSON().with_variant(JSONB(), 'postgresql'), default={}),
     Column("guid", Text),
+    Column('title', Text, nullable=True),
+    Column('link', Text, nullable=True),
+    Column('published_at', DateTime(timezone=True), nullable=True),
+    Column('author', Text, nullable=True),
+    Column('summary', Text, nullable=True),
+    Column('content', LargeBinary, nullable=True),
+    Column('search_vector', Text().with_variant(TSVECTOR(), 'postgresql'), nullable=True),
     common_models.created_at_column(),
     common_models.updated_at_column(),
+    Index('uq_feeds_rss_id_guid', 'rss_id', 'guid', unique=True),
+    Index('ix_feeds_rss_id_created_at_id', 'rss_id', 'created_at', 'id'),
+    Index(
+        'ix_feeds_data', 'data',
+        postgresql_using='gin',
+        postgresql_ops={'data': 'jsonb_path_ops'},
+    ).ddl_if(dialect='postgresql'),
+    Index('ix_feeds_search_vector', 'search_vector', postgresql_using='gin').ddl_if(dialect='postgresql'),
 )
 
-common_models.mapper_registry.map_imperatively(FeedEntity, feeds)
+common_models.mapper_registry.map_imperatively(FeedEntity, feeds, properties={
+    'content': deferred(feeds.c.content),
+}, exclude_properties=['search_vector'])
@@ -0,0 +1,42 @@
+import typing
+from datetime import datetime
+from uuid import UUID
+from dataclasses import dataclass, field
+from apollo_shared.alembic import models as common_models
+from sqlalchemy import Table, Column, Text, DateTime, Index, JSON, text
+
+FEEDS_INGESTED = 'feeds_ingested'
+
+
+@dataclass
+class OutboxEntity:
+    event_type: str
+    payload: dict
+
+    id: typing.Optional[UUID] = None
+    published_at: typing.Optional[datetime] = None
+    created_at: typing.Optional[datetime] = field(
+        default_factory=datetime.utcnow
+    )
+    updated_at: typing.Optional[datetime] = field(
+        default_factory=datetime.utcnow
+    )
+
+
+outbox = Table(
+    'outbox', common_models.metadata,
+    common_models.uuid_primary_key_column(),
+    Column(name="event_type", type_=Text, nullable=False),
+    Column(name="payload", type_=JSON, nullable=False),
+    Column(name="published_at", type_=DateTime(timezone=True), nullable=True),
+    common_models.created_at_column(),
+    common_models.updated_at_column(),
+    Index(
+        'ix_outbox_unpublished_created_at', 'created_at',
+        postgresql_where=text('published_at IS NULL'),
+        sqlite_where=text('published_at IS NULL'),
+    ),
+    Index('ix_outbox_published_at', 'published_at'),
+)
+
+common_models.mapper_registry.map_imperatively(OutboxEntity, outbox)
@@ -3,7 +3,17 @@ from datetime import datetime
 from uuid import UUID
 from dataclasses import dataclass, field
 from apollo_shared.alembic import models as common_models
-from sqlalchemy import Table, Column, Text, ForeignKey, UUID as UUIDField
+from sqlalchemy import Table, Column, Text, Integer, SmallInteger, DateTime, Index, JSON, Boolean, ForeignKey, UUID as UUIDField
+
+SHARD_COUNT = 1024
+
+STATUS_ACTIVE = 'active'
+STATUS_PENDING = 'pending'
+STATUS_INVALID = 'invalid'
+
+
+def shard_for(rss_id: UUID) -> int:
+    return rss_id.int % SHARD_COUNT
 
 
 @dataclass
@@ -11,6 +21,25 @@ class RssEntity:
     url: str
 
     id: typing.Optional[UUID] = None
+    etag: typing.Optional[str] = None
+    last_modified: typing.Optional[str] = None
+    poll_interval: typing.Optional[int] = None
+    failure_count: int = 0
+    next_poll_at: typing.Optional[datetime] = field(
+        default_factory=datetime.utcnow
+    )
+    recent_guids: list = field(
+        default_factory=list
+    )
+    fanout_disabled: bool = False
+    shard: typing.Optional[int] = None
+    status: str = STATUS_ACTIVE
+    last_error: typing.Optional[str] = None
+    hub_url: typing.Optional[str] = None
+    hub_topic: typing.Optional[str] = None
+    hub_secret: typing.Optional[str] = None
+    hub_lease_expires_at: typing.Optional[datetime] = None
+    hub_requested_at: typing.Optional[datetime] = None
     created_at: typing.Optional[datetime] = field(
         default_factory=datetime.utcnow
     )
@@ -23,8 +52,30 @@ rsses = Table(
     'rsses', common_models.metadata,
     common_models.uuid_primary_key_column(),
     Column(name="url", type_=Text),
+    Column(name="etag", type_=Text, nullable=True),
+    Column(name="last_modified", type_=Text, nullable=True),
+    Column(name="poll_interval", type_=Integer, nullable=True),
+    Column(name="failure_count", type_=Integer, nullable=False, default=0),
+    Column(name="next_poll_at", type_=DateTime(timezone=True), nullable=False),
+    Column(name="recent_guids", type_=JSON, nullable=False, default=[]),
+    Column(name="fanout_disabled", type_=Boolean, nullable=False, default=False),
+    Column(
+        name="shard",
+        type_=SmallInteger,
+        nullable=False,
+        default=lambda context: shard_for(context.get_current_parameters()['id']),
+    ),
+    Column(name="status", type_=Text, nullable=False, default=STATUS_ACTIVE),
+    Column(name="last_error", type_=Text, nullable=True),
+    Column(name="hub_url", type_=Text, nullable=True),
+    Column(name="hub_topic", type_=Text, nullable=True),
+    Column(name="hub_secret", type_=Text, nullable=True),
+    Column(name="hub_lease_expires_at", type_=DateTime(timezone=True), nullable=True),
+    Column(name="hub_requested_at", type_=DateTime(timezone=True), nullable=True),
     common_models.created_at_column(),
     common_models.updated_at_column(),
+    Index('uq_rsses_url', 'url', unique=True),
+    Index('ix_rsses_next_poll_at', 'next_poll_at'),
 )
 
 common_models.mapper_registry.map_imperatively(RssEntity, rsses)
@@ -51,6 +102,8 @@ rss_user = Table(
     Column('rss_id', UUIDField(as_uuid=True), ForeignKey('rsses.id'), nullable=False),
     common_models.created_at_column(),
     common_models.updated_at_column(),
+    Index('uq_rss_user_user_id_rss_id', 'user_id', 'rss_id', unique=True),
+    Index('ix_rss_user_rss_id', 'rss_id'),
 )
 
 common_models.mapper_registry.map_imperatively(RssUserEntity, rss_user)
@@ -0,0 +1,23 @@
+from datetime import datetime
+from uuid import UUID
+from dataclasses import dataclass
+from apollo_shared.alembic import models as common_models
+from sqlalchemy import Table, Column, ForeignKey, Index, DateTime, UUID as UUIDField
+
+
+@dataclass
+class TimelineEntity:
+    user_id: UUID
+    feed_id: UUID
+    created_at: datetime
+
+
+timelines = Table(
+    'timelines', common_models.metadata,
+    Column('user_id', UUIDField(as_uuid=True), primary_key=True),
+    Column('feed_id', UUIDField(as_uuid=True), ForeignKey('feeds.id'), primary_key=True),
+    Column('created_at', DateTime(timezone=True), nullable=False),
+    Index('ix_timelines_user_id_created_at_feed_id', 'user_id', 'created_at', 'feed_id'),
+)
+
+common_models.mapper_registry.map_imperatively(TimelineEntity, timelines)
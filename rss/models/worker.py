@@ -0,0 +1,24 @@
+from datetime import datetime
+from dataclasses import dataclass, field
+from apollo_shared.alembic import models as common_models
+from sqlalchemy import Table, Column, DateTime, Index, Text
+
+
+@dataclass
+class WorkerEntity:
+    id: str
+    heartbeat_at: datetime
+    started_at: datetime = field(
+        default_factory=datetime.utcnow
+    )
+
+
+workers = Table(
+    'rss_workers', common_models.metadata,
+    Column('id', Text, primary_key=True),
+    Column('heartbeat_at', DateTime(timezone=True), nullable=False),
+    Column('started_at', DateTime(timezone=True), nullable=False),
+    Index('ix_rss_workers_heartbeat_at', 'heartbeat_at'),
+)
+
+common_models.mapper_registry.map_imperatively(WorkerEntity, workers)
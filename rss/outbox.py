@@ -0,0 +1,52 @@
+import typing
+from datetime import datetime, timedelta
+
+from nameko import config
+
+from .dal import RssDAL
+
+
+class OutboxRelay:
+
+    def __init__(self,
+                 rss_dal: RssDAL,
+                 event_dispatcher: typing.Callable[[str, dict], None],
+                 batch_size: int,
+                 retention: int):
+        self.rss_dal = rss_dal
+        self.event_dispatcher = event_dispatcher
+        self.batch_size = batch_size
+        self.retention = retention
+
+    @classmethod
+    def from_config(cls, rss_dal: RssDAL, event_dispatcher: typing.Callable[[str, dict], None]) -> 'OutboxRelay':
+        return cls(
+            rss_dal=rss_dal,
+            event_dispatcher=event_dispatcher,
+            batch_size=int(config.get('OUTBOX_RELAY_BATCH_SIZE', 100)),
+            retention=int(config.get('OUTBOX_RETENTION', 24 * 60 * 60)),
+        )
+
+    def relay(self) -> int:
+        # delivery is at least once: an event that was dispatched but not yet
+        # marked is sent again, so consumers dedupe on its event_id
+        relayed = 0
+
+        while True:
+            events = self.rss_dal.fetch_unpublished_events(self.batch_size)
+            published_ids = []
+
+            try:
+                for event in events:
+                    self.event_dispatcher(event.event_type, {**event.payload, 'event_id': str(event.id)})
+                    published_ids.append(event.id)
+            finally:
+                self.rss_dal.mark_events_published(published_ids, datetime.utcnow())
+
+            relayed += len(published_ids)
+
+            if len(events) < self.batch_size:
+                return relayed
+
+    def purge(self, now: datetime) -> None:
+        self.rss_dal.purge_published_events(now - timedelta(seconds=self.retention))
@@ -0,0 +1,187 @@
+import calendar
+import hashlib
+import json
+import multiprocessing
+import re
+import typing
+from html import unescape
+
+import feedparser
+from eventlet.hubs import trampoline
+from eventlet.queue import LightQueue
+
+from .models.feed import TEXT_DATA_FIELDS, compress_content
+
+FEED_HINTS = ('ttl', 'sy_updateperiod', 'sy_updatefrequency')
+LINK_HINTS = ('hub', 'self')
+SUMMARY_LIMIT = 500
+TAG = re.compile(r'<[^>]+>')
+
+
+class ParsedEntry(typing.NamedTuple):
+    guid: str
+    published: typing.Optional[int]
+    data: dict
+    title: typing.Optional[str] = None
+    link: typing.Optional[str] = None
+    author: typing.Optional[str] = None
+    summary: typing.Optional[str] = None
+    content: typing.Optional[bytes] = None
+
+
+class ParsedFeed(typing.NamedTuple):
+    feed: dict
+    entries: typing.List[ParsedEntry]
+
+
+def parse_feed(content: bytes, headers: dict) -> ParsedFeed:
+    parsed_data = feedparser.parse(content, response_headers=headers)
+
+    return ParsedFeed(
+        feed=feed_hints(parsed_data.feed),
+        entries=[entry for entry in map(_entry, parsed_data.entries) if entry is not None],
+    )
+
+
+def feed_hints(feed) -> dict:
+    hints = {key: feed[key] for key in FEED_HINTS if key in feed}
+
+    for link in feed.get('links') or []:
+        if link.get('rel') in LINK_HINTS and link.get('href'):
+            hints.setdefault(link['rel'], link['href'])
+
+    return hints
+
+
+def _entry(entry) -> typing.Optional[ParsedEntry]:
+    published = entry.get('published_parsed') or entry.get('updated_parsed')
+    summary = entry.get('summary')
+    content = '\n'.join(item.get('value', '') for item in entry.get('content') or [])
+    data = compact_entry(entry)
+    guid = entry.get('id') or entry.get('link') or _fingerprint(data)
+
+    if guid is None:
+        return None
+
+    return ParsedEntry(
+        guid=guid,
+        published=_timestamp(published),
+        data=data,
+        title=entry.get('title'),
+        link=entry.get('link'),
+        author=entry.get('author'),
+        summary=_excerpt(summary),
+        content=compress_content(content) if content and content != summary else None,
+    )
+
+
+def compact_entry(entry) -> dict:
+    data = {key: entry[key] for key in TEXT_DATA_FIELDS if entry.get(key)}
+
+    if entry.get('tags'):
+        data['tags'] = [tag.get('term') for tag in entry['tags'] if tag.get('term')]
+
+    if entry.get('enclosures'):
+        data['enclosures'] = [
+            {key: enclosure[key] for key in ('href', 'type', 'length') if key in enclosure}
+            for enclosure in entry['enclosures']
+        ]
+
+    return data
+
+
+def _fingerprint(data: dict) -> typing.Optional[str]:
+    if not data:
+        return None
+
+    return hashlib.sha1(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _excerpt(html: typing.Optional[str]) -> typing.Optional[str]:
+    if not html:
+        return None
+
+    text = ' '.join(unescape(TAG.sub(' ', html)).split())
+
+    return text[:SUMMARY_LIMIT] or None
+
+
+def _timestamp(value) -> typing.Optional[int]:
+    return calendar.timegm(value) if value else None
+
+
+def _serve(connection) -> None:
+    while True:
+        try:
+            function, args = connection.recv()
+        except EOFError:
+            return
+
+        try:
+            connection.send((True, function(*args)))
+        except Exception as e:
+            connection.send((False, e))
+
+
+class ParseTimeout(Exception):
+    pass
+
+
+class ParserPool:
+
+    def __init__(self, workers: int, timeout: typing.Optional[float] = None):
+        self.workers = workers
+        self.timeout = timeout
+        self._context = multiprocessing.get_context('fork')
+        self._idle = LightQueue()
+        self._processes = {}
+
+    def start(self) -> None:
+        for _ in range(self.workers):
+            self._idle.put(self._spawn())
+
+    def stop(self) -> None:
+        for connection, process in self._processes.items():
+            connection.close()
+            process.join(1)
+
+            if process.is_alive():
+                process.terminate()
+
+        self._processes = {}
+        self._idle = LightQueue()
+
+    def parse(self, content: bytes, headers: dict) -> ParsedFeed:
+        if not self._processes:
+            return parse_feed(content, headers)
+
+        return self._call(parse_feed, content, headers)
+
+    def _call(self, function, *args):
+        connection = self._idle.get()
+
+        try:
+            connection.send((function, args))
+            trampoline(connection.fileno(), read=True, timeout=self.timeout, timeout_exc=ParseTimeout)
+            ok, result = connection.recv()
+        except (EOFError, OSError, ParseTimeout):
+            self._processes.pop(connection).terminate()
+            connection.close()
+            connection = self._spawn()
+            raise
+        finally:
+            self._idle.put(connection)
+
+        if not ok:
+            raise result
+
+        return result
+
+    def _spawn(self):
+        connection, child_connection = self._context.Pipe()
+        process = self._context.Process(target=_serve, args=(child_connection,), daemon=True)
+        process.start()
+        child_connection.close()
+        self._processes[connection] = process
+
+        return connection
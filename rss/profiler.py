@@ -0,0 +1,161 @@
+import logging
+import random
+import time
+import typing
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+import greenlet
+from nameko import config
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+
+def _is_select(statement: str) -> bool:
+    return statement.lstrip().upper().startswith(('SELECT', 'WITH'))
+
+
+@dataclass
+class StatementRecord:
+    statement: str
+    duration: float
+    rows: int
+
+
+@dataclass
+class QueryProfile:
+    records: typing.List[StatementRecord] = field(default_factory=list)
+
+    @property
+    def statement_count(self) -> int:
+        return len(self.records)
+
+    @property
+    def rows(self) -> int:
+        return sum(record.rows for record in self.records)
+
+    @property
+    def duration(self) -> float:
+        return sum(record.duration for record in self.records)
+
+    def describe(self) -> str:
+        return '\n'.join(
+            '{:.1f}ms {} rows: {}'.format(record.duration * 1000, record.rows, ' '.join(record.statement.split()))
+            for record in self.records
+        )
+
+
+class QueryProfiler:
+    STARTED_AT_KEY = 'rss_profiler_started_at'
+
+    def __init__(self,
+                 slow_threshold: typing.Optional[float] = None,
+                 sample_rate: float = 0.0,
+                 count_rows: bool = False):
+        self.slow_threshold = slow_threshold
+        self.sample_rate = sample_rate
+        self.count_rows = count_rows
+        self._profiles = {}
+
+    @classmethod
+    def from_config(cls) -> 'QueryProfiler':
+        return cls(
+            slow_threshold=float(config.get('DB_SLOW_QUERY_THRESHOLD', 0.5)),
+            sample_rate=float(config.get('DB_SLOW_QUERY_SAMPLE_RATE', 0.1)),
+        )
+
+    def start(self) -> None:
+        event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    def stop(self) -> None:
+        if event.contains(Engine, 'before_cursor_execute', self._before_cursor_execute):
+            event.remove(Engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.remove(Engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    # profiles are kept per green thread, so concurrent workers sharing an
+    # engine only see their own statements
+    def begin(self) -> QueryProfile:
+        profile = QueryProfile()
+        self._profiles[greenlet.getcurrent()] = profile
+
+        return profile
+
+    def end(self) -> typing.Optional[QueryProfile]:
+        return self._profiles.pop(greenlet.getcurrent(), None)
+
+    @contextmanager
+    def profile(self) -> typing.Iterator[QueryProfile]:
+        profile = self.begin()
+
+        try:
+            yield profile
+        finally:
+            self.end()
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info[self.STARTED_AT_KEY] = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started_at = conn.info.get(self.STARTED_AT_KEY)
+        profile = self._profiles.get(greenlet.getcurrent())
+
+        if started_at is None:
+            return
+
+        duration = time.perf_counter() - started_at
+
+        if profile is not None:
+            profile.records.append(StatementRecord(statement, duration, self._rows(cursor, statement, parameters)))
+
+        if self.slow_threshold is not None and duration >= self.slow_threshold and random.random() < self.sample_rate:
+            logger.warning(
+                'slow query took %.1fms: %s\n%s',
+                duration * 1000,
+                ' '.join(statement.split()),
+                self._explain(conn, cursor, statement, parameters) if _is_select(statement) else '',
+            )
+
+    def _rows(self, cursor, statement, parameters) -> int:
+        if cursor.rowcount >= 0:
+            return cursor.rowcount
+
+        if not self.count_rows or not _is_select(statement):
+            return 0
+
+        # sqlite reports no row count for selects; recount on a raw cursor so
+        # the extra statement does not go through these hooks again
+        count_cursor = cursor.connection.cursor()
+
+        try:
+            count_cursor.execute('SELECT count(*) FROM ({}) AS profiled'.format(statement), parameters)
+            return count_cursor.fetchone()[0]
+        finally:
+            count_cursor.close()
+
+    def _explain(self, conn, cursor, statement, parameters) -> str:
+        is_postgresql = conn.dialect.name == 'postgresql'
+        explain_cursor = cursor.connection.cursor()
+
+        try:
+            if is_postgresql:
+                # keeps a failing EXPLAIN from aborting the caller's transaction
+                explain_cursor.execute('SAVEPOINT rss_profiler_explain')
+
+            try:
+                explain_cursor.execute('{} {}'.format('EXPLAIN' if is_postgresql else 'EXPLAIN QUERY PLAN', statement), parameters)
+                plan = '\n'.join(' '.join(str(column) for column in row) for row in explain_cursor.fetchall())
+            except Exception as e:
+                if is_postgresql:
+                    explain_cursor.execute('ROLLBACK TO SAVEPOINT rss_profiler_explain')
+
+                return 'no plan: {}'.format(e)
+
+            if is_postgresql:
+                explain_cursor.execute('RELEASE SAVEPOINT rss_profiler_explain')
+
+            return plan
+        finally:
+            explain_cursor.close()
@@ -0,0 +1,120 @@
+import calendar
+import statistics
+import typing
+from datetime import datetime, timedelta, timezone
+
+from nameko import config
+
+from .models.rss import RssEntity
+from .parser import ParsedFeed
+
+UPDATE_PERIODS = {
+    'hourly': 60 * 60,
+    'daily': 24 * 60 * 60,
+    'weekly': 7 * 24 * 60 * 60,
+    'monthly': 30 * 24 * 60 * 60,
+    'yearly': 365 * 24 * 60 * 60,
+}
+
+
+def naive_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value
+
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+class PollScheduler:
+
+    def __init__(self,
+                 batch_size: int,
+                 min_interval: int,
+                 default_interval: int,
+                 max_interval: int,
+                 max_backoff: int):
+        self.batch_size = batch_size
+        self.min_interval = min_interval
+        self.default_interval = default_interval
+        self.max_interval = max_interval
+        self.max_backoff = max_backoff
+
+    @classmethod
+    def from_config(cls) -> 'PollScheduler':
+        return cls(
+            batch_size=int(config.get('FEED_POLL_BATCH_SIZE', 500)),
+            min_interval=int(config.get('FEED_POLL_MIN_INTERVAL', 5 * 60)),
+            default_interval=int(config.get('FEED_POLL_DEFAULT_INTERVAL', 60 * 60)),
+            max_interval=int(config.get('FEED_POLL_MAX_INTERVAL', 24 * 60 * 60)),
+            max_backoff=int(config.get('FEED_POLL_MAX_BACKOFF', 7 * 24 * 60 * 60)),
+        )
+
+    def reschedule(self, rss: RssEntity, now: datetime, parsed_data: typing.Optional[ParsedFeed] = None, new_entries: int = 0) -> None:
+        rss.poll_interval = self.next_interval(rss.poll_interval, now, parsed_data, new_entries)
+        rss.failure_count = 0
+        rss.next_poll_at = now + timedelta(seconds=rss.poll_interval)
+
+    def backoff(self, rss: RssEntity, now: datetime) -> None:
+        rss.failure_count = (rss.failure_count or 0) + 1
+        interval = (rss.poll_interval or self.default_interval) * 2 ** rss.failure_count
+        rss.next_poll_at = now + timedelta(seconds=min(interval, self.max_backoff))
+
+    def postpone(self, rss: RssEntity, now: datetime, seconds: int) -> None:
+        rss.next_poll_at = now + timedelta(seconds=seconds)
+
+    def next_interval(self,
+                      previous_interval: typing.Optional[int],
+                      now: datetime,
+                      parsed_data: typing.Optional[ParsedFeed] = None,
+                      new_entries: int = 0) -> int:
+        previous_interval = previous_interval or self.default_interval
+        observed = self._observed_interval(parsed_data, now) if parsed_data is not None else None
+
+        if observed is not None:
+            interval = (previous_interval + observed) / 2
+        elif new_entries:
+            interval = previous_interval * 0.75
+        else:
+            interval = previous_interval * 1.5
+
+        hint = self._publisher_hint(parsed_data) if parsed_data is not None else None
+        if hint is not None:
+            interval = max(interval, hint)
+
+        return int(min(max(interval, self.min_interval), self.max_interval))
+
+    def _observed_interval(self, parsed_data: ParsedFeed, now: datetime) -> typing.Optional[float]:
+        published = sorted(
+            (entry.published for entry in parsed_data.entries if entry.published),
+            reverse=True,
+        )
+
+        if len(published) < 2:
+            return None
+
+        gaps = [newer - older for newer, older in zip(published, published[1:]) if newer > older]
+        if not gaps:
+            return None
+
+        since_newest = calendar.timegm(now.utctimetuple()) - published[0]
+
+        return max(statistics.median(gaps), since_newest / 2)
+
+    def _publisher_hint(self, parsed_data: ParsedFeed) -> typing.Optional[int]:
+        feed = parsed_data.feed
+        hints = []
+
+        try:
+            hints.append(int(feed['ttl']) * 60)
+        except (KeyError, ValueError, TypeError):
+            pass
+
+        period = UPDATE_PERIODS.get(str(feed.get('sy_updateperiod', '')).strip().lower())
+        if period is not None:
+            try:
+                frequency = max(int(feed.get('sy_updatefrequency', 1)), 1)
+            except (ValueError, TypeError):
+                frequency = 1
+
+            hints.append(period // frequency)
+
+        return max(hints) if hints else None
@@ -0,0 +1,45 @@
+from marshmallow import Schema, fields, validate, EXCLUDE
+
+from .models.feed import DATA_FIELDS
+
+
+class FeedCursorSchema(Schema):
+    created_at = fields.DateTime(required=True)
+    id = fields.UUID(required=True)
+
+
+class FeedPageSchema(Schema):
+    class Meta:
+        unknown = EXCLUDE
+
+    cursor = fields.Nested(FeedCursorSchema, load_default=None, allow_none=True)
+    limit = fields.Integer(load_default=50, validate=validate.Range(min=1, max=200))
+    data_fields = fields.List(
+        fields.String(validate=validate.OneOf(DATA_FIELDS)),
+        data_key='fields',
+        load_default=None,
+    )
+    with_stats = fields.Boolean(load_default=False)
+
+
+class FeedSearchSchema(Schema):
+    class Meta:
+        unknown = EXCLUDE
+
+    query = fields.String(required=True, validate=validate.Length(min=1, max=256))
+    limit = fields.Integer(load_default=50, validate=validate.Range(min=1, max=200))
+    offset = fields.Integer(load_default=0, validate=validate.Range(min=0, max=1000))
+
+
+class FeedIdsSchema(Schema):
+    class Meta:
+        unknown = EXCLUDE
+
+    feed_ids = fields.List(fields.UUID(), required=True, validate=validate.Length(min=1, max=200))
+
+
+class BookmarkIdsSchema(Schema):
+    class Meta:
+        unknown = EXCLUDE
+
+    bookmark_ids = fields.List(fields.UUID(), required=True, validate=validate.Length(min=1, max=200))
@@ -0,0 +1,43 @@
+import collections
+import math
+import re
+import typing
+
+WORD = re.compile(r'\w+', re.UNICODE)
+FIELD_WEIGHTS = {'title': 1.0, 'summary': 0.4, 'author': 0.2}
+
+
+def tokenize(text: typing.Optional[str]) -> [str]:
+    return WORD.findall(text.lower()) if text else []
+
+
+class InvertedIndex:
+
+    def __init__(self):
+        self._postings = collections.defaultdict(dict)
+        self._documents = 0
+
+    def add(self, document_id, fields: typing.Dict[str, typing.Optional[str]]) -> None:
+        self._documents += 1
+
+        for name, text in fields.items():
+            for term in tokenize(text):
+                postings = self._postings[term]
+                postings[document_id] = postings.get(document_id, 0.0) + FIELD_WEIGHTS[name]
+
+    def search(self, query: str) -> typing.List[typing.Tuple[typing.Any, float]]:
+        terms = set(tokenize(query))
+
+        if not terms or any(term not in self._postings for term in terms):
+            return []
+
+        candidates = set.intersection(*(set(self._postings[term]) for term in terms))
+        scores = {
+            document_id: sum(
+                self._postings[term][document_id] * math.log(1 + self._documents / len(self._postings[term]))
+                for term in terms
+            )
+            for document_id in candidates
+        }
+
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)
@@ -1,52 +1,151 @@
+import dataclasses
 import feedparser
+import itertools
+import logging
+import typing
+from collections import Counter
 
 from apollo_shared import exception
 from apollo_shared.schema import rss as rss_schema
 from apollo_shared.utils import Context
-from .models.rss import RssEntity, RssUserEntity
+from .models.rss import RssEntity, STATUS_ACTIVE, STATUS_INVALID, STATUS_PENDING
 from .models.feed import FeedEntity
 from .models.bookmark import BookmarkEntity
 from .models.comment import CommentEntity
 from .dal import RssDAL
-from uuid import uuid4
+from .breaker import HostCircuitBreaker
+from .cache import RssCache
+from .fetcher import FeedFetcher, FetchResult, url_host
+from .ingest import IngestBatcher
+from .metrics import RssMetrics
+from .outbox import OutboxRelay
+from .parser import ParserPool, feed_hints
+from .scheduler import PollScheduler, naive_utc
+from .schema import BookmarkIdsSchema, FeedIdsSchema, FeedPageSchema, FeedSearchSchema
+from .sharding import ShardCoordinator
+from .timeline import TimelineFanout
+from .websub import HubSubscription, WebSubSubscriber, discover_hub, verify_signature
+from datetime import datetime, timedelta
+from eventlet.greenpool import GreenPool
+from marshmallow import ValidationError
+from sqlalchemy.exc import SQLAlchemyError
+from uuid import UUID, uuid4
+
+logger = logging.getLogger(__name__)
+
+
+class SubscriptionResult(typing.NamedTuple):
+    rss_id: UUID
+    url: str
+    status: str
 
-class RssService:
 
-    def __init__(self, context: Context, rss_dal: RssDAL):
+class RssService:
+    RECENT_GUIDS_LIMIT = 500
+
+    def __init__(self,
+                 context: Context,
+                 rss_dal: RssDAL,
+                 rss_cache: RssCache,
+                 feed_fetcher: FeedFetcher,
+                 feed_parser: ParserPool,
+                 ingest_batcher: IngestBatcher,
+                 poll_scheduler: PollScheduler,
+                 shard_coordinator: ShardCoordinator,
+                 timeline_fanout: TimelineFanout,
+                 host_breaker: HostCircuitBreaker,
+                 metrics: RssMetrics,
+                 websub: WebSubSubscriber,
+                 outbox_relay: OutboxRelay,
+                 event_dispatcher: typing.Callable[[str, dict], None]):
         self.context = context
         self.rss_dal = rss_dal
+        self.rss_cache = rss_cache
+        self.feed_fetcher = feed_fetcher
+        self.feed_parser = feed_parser
+        self.ingest_batcher = ingest_batcher
+        self.poll_scheduler = poll_scheduler
+        self.shard_coordinator = shard_coordinator
+        self.timeline_fanout = timeline_fanout
+        self.host_breaker = host_breaker
+        self.metrics = metrics
+        self.websub = websub
+        self.outbox_relay = outbox_relay
+        self.event_dispatcher = event_dispatcher
 
     def subscribe_rss(
             self,
             data: rss_schema.SubscribeRSSSchemaRPC
     ) -> RssEntity:
         rss_entity = self.rss_dal.fetch_rss_by_url_or_none(data['url'])
+        subscribe_to_hub = False
 
-        if rss_entity is None:
-            if len(feedparser.parse(data['url']).entries) == 0:
+        # invalid rsses are skipped by the sweeps, so they are validated again
+        # like a new url before anyone else subscribes to them
+        if rss_entity is None or rss_entity.status == STATUS_INVALID:
+            parsed_data = feedparser.parse(data['url'])
+
+            if len(parsed_data.entries) == 0:
                 raise exception.BadRequest('invalid RRS')
 
+        if rss_entity is None:
             rss_entity = RssEntity(
                 url=data['url'],
             )
 
-            self.rss_dal.create_rss(rss_entity)
+            if self.websub.enabled:
+                hub_url, topic = discover_hub(rss_entity, feed_hints(parsed_data.feed), parsed_data.get('headers') or {})
+                subscribe_to_hub = self.websub.prepare(rss_entity, hub_url, topic, datetime.utcnow())
+        elif rss_entity.status == STATUS_INVALID:
+            self.__revalidate(rss_entity, STATUS_ACTIVE)
 
-        if self.rss_dal.check_user_attached_to_rss(
-                user_id=self.context['user_id'],
-                rss_id=rss_entity.id,
-        ):
-            raise exception.BadRequest("user has been subscribe to rss!")
+        with self.rss_dal.unit_of_work():
+            if not self.rss_dal.upsert_rss_and_attach(rss_entity, self.context['user_id']):
+                raise exception.BadRequest("user has been subscribe to rss!")
 
-        self.rss_dal.attach_rss_to_user(
-            RssUserEntity(
-                user_id=self.context['user_id'],
-                rss_id=rss_entity.id,
+            self.timeline_fanout.subscribed(rss_entity, self.context['user_id'])
+
+        self.rss_cache.invalidate_subscriptions(self.context['user_id'])
+
+        if subscribe_to_hub:
+            self.__subscribe_to_hubs([HubSubscription.of(rss_entity)])
+
+        return rss_entity
+
+    def subscribe_rss_async(
+            self,
+            data: rss_schema.SubscribeRSSSchemaRPC
+    ) -> RssEntity:
+        rss_entity = self.rss_dal.fetch_rss_by_url_or_none(data['url'])
+
+        if rss_entity is None:
+            rss_entity = RssEntity(
+                url=data['url'],
+                status=STATUS_PENDING,
             )
-        )
+        elif rss_entity.status == STATUS_INVALID:
+            self.__revalidate(rss_entity, STATUS_PENDING)
+
+        with self.rss_dal.unit_of_work():
+            if not self.rss_dal.upsert_rss_and_attach(rss_entity, self.context['user_id']):
+                raise exception.BadRequest("user has been subscribe to rss!")
+
+            self.timeline_fanout.subscribed(rss_entity, self.context['user_id'])
+
+        self.rss_cache.invalidate_subscriptions(self.context['user_id'])
+
+        if rss_entity.status == STATUS_PENDING:
+            self.event_dispatcher('rss_subscription_requested', {'rss_id': str(rss_entity.id)})
 
         return rss_entity
 
+    def __revalidate(self, rss: RssEntity, status: str) -> None:
+        # the stored validators belong to the document that made the rss
+        # invalid, and a 304 for them would skip the next validation
+        rss.status = status
+        rss.etag = rss.last_modified = None
+        rss.next_poll_at = datetime.utcnow()
+
     def unsubscribe_rss(
             self,
             data: rss_schema.UnsubscribeRSSSchemaRPC,
@@ -58,43 +157,112 @@ class RssService:
         ) is None:
             raise exception.NotFound('rss user not found')
 
-        self.rss_dal.detach_rss_from_user(
-            self.context['user_id'],
-            data['id'],
-        )
+        with self.rss_dal.unit_of_work():
+            self.rss_dal.detach_rss_from_user(
+                self.context['user_id'],
+                data['id'],
+            )
+            self.timeline_fanout.unsubscribed(data['id'], self.context['user_id'])
+
+        self.rss_cache.invalidate_subscriptions(self.context['user_id'])
 
     def get_rsses(self):
         user_id = self.context['user_id']
 
-        return self.rss_dal.get_rsses(user_id)
+        return self.rss_cache.subscriptions(user_id, lambda: self.rss_dal.get_rsses(user_id))
 
     def get_rss(self, data: rss_schema.GetRSSSchemaRPC) -> RssEntity:
-        user_id = self.context['user_id']
-
-        rss = self.rss_dal.get_rss_by_rss_id_and_user_id(data['id'], user_id)
+        rss = next((rss for rss in self.get_rsses() if str(rss.id) == str(data['id'])), None)
 
         if rss is None:
             raise exception.NotFound("rss not found!")
 
         return rss
 
+    def get_subscription_status(self, data: rss_schema.GetRSSSchemaRPC) -> dict:
+        rss = self.get_rss(data)
+
+        return {
+            'id': str(rss.id),
+            'status': rss.status,
+        }
+
     def get_feed_of_subscribed_rss(self, data: rss_schema.GetFeedOfSubscribedRSSSchemaRPC):
         return self.rss_dal.get_feed_by_id_and_user_id(
             data['id'],
             self.context['user_id'],
         )
 
-    def get_feeds_of_subscribed_rsses(self):
-        return self.rss_dal.get_feeds_by_user_id(
+    def get_feeds_of_subscribed_rsses(self, data: rss_schema.GetFeedsOfSubscribedRSSesSchemaRPC):
+        page = self.__load_feed_page(data)
+
+        get_feeds = self.rss_dal.get_timeline_by_user_id if self.timeline_fanout.enabled else self.rss_dal.get_feeds_by_user_id
+
+        return self.rss_cache.timeline_page(
             self.context['user_id'],
+            self.__page_key('all', page),
+            lambda: get_feeds(
+                self.context['user_id'],
+                cursor=page['cursor'],
+                limit=page['limit'],
+                data_fields=page['data_fields'],
+                with_stats=page['with_stats'],
+            ),
         )
 
     def get_feeds_of_subscribed_rss(self, data: rss_schema.GetFeedsOfSubscribedRSSSchemaRPC):
-        return self.rss_dal.get_feeds_by_rss_id_and_user_id(
-            data['rss_id'],
+        page = self.__load_feed_page(data)
+
+        return self.rss_cache.timeline_page(
+            self.context['user_id'],
+            self.__page_key(data['rss_id'], page),
+            lambda: self.rss_dal.get_feeds_by_rss_id_and_user_id(
+                data['rss_id'],
+                self.context['user_id'],
+                cursor=page['cursor'],
+                limit=page['limit'],
+                data_fields=page['data_fields'],
+                with_stats=page['with_stats'],
+            ),
+        )
+
+    def search_feeds(self, data: dict) -> [FeedEntity]:
+        search = self.__load(FeedSearchSchema(), data)
+
+        return self.rss_dal.search_feeds(
             self.context['user_id'],
+            search['query'],
+            limit=search['limit'],
+            offset=search['offset'],
         )
 
+    def get_cache_stats(self) -> dict:
+        return self.rss_cache.stats()
+
+    def __load_feed_page(self, data) -> dict:
+        return self.__load(FeedPageSchema(), data)
+
+    def __load(self, schema, data) -> dict:
+        try:
+            return schema.load(data or {})
+        except ValidationError as e:
+            raise exception.BadRequest(str(e.messages))
+
+    def __page_key(self, scope, page: dict) -> str:
+        cursor = page['cursor']
+        key = '{}:{}'.format(scope, page['limit'])
+
+        if page['data_fields'] is not None:
+            key = '{}:{}'.format(key, ','.join(sorted(set(page['data_fields']))))
+
+        if page['with_stats']:
+            key = '{}:stats'.format(key)
+
+        if cursor is None:
+            return key
+
+        return '{}:{}:{}'.format(key, cursor['created_at'].isoformat(), cursor['id'])
+
     def add_feed_to_bookmarks(self, data: rss_schema.AddToBookmarksSchemaRPC) -> BookmarkEntity:
         if self.rss_dal.fetch_bookmark_by_user_id_and_feed_id(self.context['user_id'], data['feed_id']) is not None:
             raise exception.BadRequest('bookmark exists')
@@ -105,9 +273,18 @@ class RssService:
         )
 
         self.rss_dal.store_bookmark(bookmark)
+        self.rss_cache.invalidate_timelines([self.context['user_id']])
 
         return bookmark
 
+    def add_feeds_to_bookmarks(self, data: dict) -> [BookmarkEntity]:
+        feed_ids = list(dict.fromkeys(self.__load(FeedIdsSchema(), data)['feed_ids']))
+
+        bookmarks = self.rss_dal.store_bookmarks(self.context['user_id'], feed_ids)
+        self.rss_cache.invalidate_timelines([self.context['user_id']])
+
+        return bookmarks
+
     def get_user_bookmarks(self):
         return self.rss_dal.fetch_bookmarks_by_user_id(self.context['user_id'])
 
@@ -119,8 +296,15 @@ class RssService:
 
         return bookmark
 
+    def get_user_bookmarks_by_ids(self, data: dict) -> [BookmarkEntity]:
+        return self.rss_dal.fetch_bookmarks_by_ids_and_user_id(
+            self.__load(BookmarkIdsSchema(), data)['bookmark_ids'],
+            self.context['user_id'],
+        )
+
     def delete_user_bookmark(self, data: rss_schema.DeleteFromBookmarksSchemaRPC) -> None:
         self.rss_dal.delete_bookmark_by_id_and_user_id(data['bookmark_id'], self.context['user_id'])
+        self.rss_cache.invalidate_timelines([self.context['user_id']])
 
     def add_comment_on_feed(self, data: rss_schema.AddCommentOnFeedSchemaRPC) -> CommentEntity:
         comment = CommentEntity(
@@ -130,12 +314,19 @@ class RssService:
         )
 
         self.rss_dal.store_comment(comment)
+        self.rss_cache.invalidate_timelines([self.context['user_id']])
 
         return comment
 
     def get_comments_on_subscribed_feed(self, data: rss_schema.GetCommentsOnFeedSchemaRPC):
         return self.rss_dal.fetch_comments_on_subscribed_feed_by_feed_id(data['feed_id'], self.context['user_id'])
 
+    def count_comments_on_subscribed_feeds(self, data: dict) -> dict:
+        feed_ids = self.__load(FeedIdsSchema(), data)['feed_ids']
+        counts = self.rss_dal.count_comments_on_subscribed_feeds_by_feed_ids(feed_ids, self.context['user_id'])
+
+        return {str(feed_id): counts.get(feed_id, 0) for feed_id in feed_ids}
+
     def get_comment_on_subscribed_feed(self, data: rss_schema.GetCommentOnFeedSchemaRPC) -> CommentEntity:
         comment = self.rss_dal.fetch_comment_on_subscribed_feed_by_feed_id(
             data['comment_id'],
@@ -150,28 +341,266 @@ class RssService:
 
     def delete_user_comment(self, data: rss_schema.DeleteCommentOnFeedSchemaRPC) -> None:
         self.rss_dal.delete_comment_by_id_and_user_id(data['comment_id'], self.context['user_id'])
+        self.rss_cache.invalidate_timelines([self.context['user_id']])
+
+    def verify_websub_subscription(self, rss_id, mode: str, topic: str, challenge: str, lease_seconds: typing.Optional[int]) -> str:
+        rss = self.rss_dal.fetch_rss_by_id_or_none(rss_id)
+
+        if rss is None or rss.hub_topic is None or rss.hub_topic != topic:
+            raise exception.NotFound('websub subscription not found')
+
+        if mode == 'denied':
+            logger.warning('hub %s denied the subscription of rss %s', rss.hub_url, rss.id)
+            rss.hub_lease_expires_at = rss.hub_requested_at = None
+            self.rss_dal.save_rss(rss)
+            return ''
+
+        # only a subscribe we have sent and not yet seen verified is confirmed
+        if mode != 'subscribe' or not challenge or rss.hub_requested_at is None:
+            raise exception.NotFound('websub subscription not found')
+
+        rss.hub_lease_expires_at = datetime.utcnow() + timedelta(seconds=lease_seconds or self.websub.lease_seconds)
+        rss.hub_requested_at = None
+        self.rss_dal.save_rss(rss)
+
+        return challenge
+
+    def receive_websub_push(self, rss_id, body: bytes, headers: dict) -> int:
+        rss = self.rss_dal.fetch_rss_by_id_or_none(rss_id)
+
+        if rss is None or rss.hub_secret is None:
+            raise exception.NotFound('websub subscription not found')
+
+        # the hub still expects a 2xx for pushes we ignore, so a bad signature
+        # is dropped rather than reported
+        if not verify_signature(rss.hub_secret, body, headers.get('x-hub-signature')):
+            logger.warning('ignoring a websub push with a bad signature for rss %s', rss.id)
+            return 0
+
+        # relative links resolve against the feed url, as they do when polled
+        parsed_data = self.feed_parser.parse(body, {'content-location': rss.url, **headers})
+        new_feeds = self.__dedup(rss, parsed_data)
+        feed_ids = self.__store([rss], new_feeds)
+        self.__publish(feed_ids, new_feeds)
+        self.__relay_outbox()
+
+        return len(feed_ids)
 
     def update_feeds(self) -> None:
-        rsses = self.rss_dal.get_all_rsses()
-        last_feed_guids = {(str(feed.rss_id), feed.guid) for feed in self.rss_dal.get_rsses_last_feeds()}
-        new_feeds = []
+        now = datetime.utcnow()
+        claim = self.shard_coordinator.claim_due_rsses(now, self.poll_scheduler.batch_size)
+
+        if claim.due_at is not None:
+            self.metrics.sweep_lag.set(max((now - naive_utc(claim.due_at)).total_seconds(), 0))
+
+        self.__ingest(claim.rsses, now)
+
+    def validate_pending_rss(self, rss_id) -> None:
+        # the rss is skipped here if a feed sweep has already claimed it, and
+        # that sweep completes the subscription instead
+        now = datetime.utcnow()
+        self.__ingest(self.shard_coordinator.claim_rsses(now, [rss_id]), now)
+
+    def __ingest(self, rsses: [RssEntity], now: datetime) -> None:
+        open_hosts = self.host_breaker.open_hosts(url_host(rss.url) for rss in rsses)
+        skipped = [rss for rss in rsses if url_host(rss.url) in open_hosts]
+        rsses = [rss for rss in rsses if url_host(rss.url) not in open_hosts]
+        # pending rsses of a paused host are completed once they are fetched
+        pending_ids = {rss.id for rss in rsses if rss.status == STATUS_PENDING}
+
+        for rss in skipped:
+            self.poll_scheduler.postpone(rss, now, self.host_breaker.cooldown)
+
+        host_failures = Counter()
+        host_successes = set()
+        hub_subscriptions = []
+        saved_ids = set()
+        parse_pool = GreenPool(max(self.feed_parser.workers, 1))
+        results = parse_pool.starmap(self.__parse, self.feed_fetcher.fetch_all(rsses))
+        new_feeds = itertools.chain(
+            ((rss, [], 0) for rss in skipped),
+            self.__collect_new_feeds(results, now, host_failures, host_successes, hub_subscriptions),
+        )
+
+        for batch in self.ingest_batcher.batches(new_feeds):
+            # read before the commit expires the batch's rsses
+            batch_ids = [rss.id for rss in batch.rsses]
+            completed = [
+                SubscriptionResult(rss.id, rss.url, rss.status)
+                for rss in batch.rsses
+                if rss.id in pending_ids
+            ]
+
+            try:
+                with self.metrics.ingest_stage_duration.time('insert'):
+                    feed_ids = self.__store(batch.rsses, batch.feeds)
+            except SQLAlchemyError:
+                # the batch's rsses stay claimed and are retried once the claim expires
+                logger.exception('failed to store %d feeds of %d rsses', len(batch.feeds), len(batch.rsses))
+                continue
+
+            saved_ids.update(batch_ids)
+            self.__publish(feed_ids, batch.feeds)
+            self.__complete_subscriptions(completed)
+
+        tripped = self.host_breaker.record(host_failures, host_successes)
+        if tripped:
+            logger.warning('pausing polls of failing hosts: %s', ', '.join(sorted(tripped)))
+
+        self.__subscribe_to_hubs([subscription for subscription in hub_subscriptions if subscription.rss_id in saved_ids])
+        self.__relay_outbox()
+
+    def relay_outbox(self) -> None:
+        self.outbox_relay.relay()
+        self.outbox_relay.purge(datetime.utcnow())
+
+    def __relay_outbox(self) -> None:
+        try:
+            self.outbox_relay.relay()
+        except Exception:
+            # the events stay in the outbox for the relay_outbox timer
+            logger.exception('failed to relay outbox events')
+
+    def __store(self, rsses: [RssEntity], feeds: [FeedEntity]) -> [UUID]:
+        # timeline rows share the batch's transaction, so stored feeds can not
+        # miss their subscribers' timelines
+        with self.rss_dal.unit_of_work():
+            feed_ids = self.rss_dal.save_ingest_batch(rsses, feeds)
+            self.timeline_fanout.inserted(feed_ids)
+
+        return feed_ids
+
+    def __publish(self, feed_ids: [UUID], feeds: [FeedEntity]) -> None:
+        self.metrics.ingested_entries.inc(amount=len(feed_ids))
+
+        if feeds:
+            self.rss_cache.invalidate_timelines(
+                self.rss_dal.get_subscriber_ids({feed.rss_id for feed in feeds})
+            )
+
+    def __subscribe_to_hubs(self, hub_subscriptions: [HubSubscription]) -> None:
+        if not hub_subscriptions:
+            return
 
-        for rss in rsses:
-            parsed_data = feedparser.parse(rss.url)
+        pool = GreenPool(self.feed_fetcher.pool_size)
 
-            for entry in parsed_data.entries:
-                rss_id = rss.id
-                guid = entry['id']
+        for subscription, accepted in zip(hub_subscriptions, pool.imap(self.websub.subscribe, hub_subscriptions)):
+            if not accepted:
+                logger.warning('hub %s refused the subscription of rss %s', subscription.hub_url, subscription.rss_id)
 
-                if (str(rss_id), guid) in last_feed_guids:
-                    break
+    def __complete_subscriptions(self, results: [SubscriptionResult]) -> None:
+        for result in results:
+            user_ids = self.rss_dal.get_subscriber_ids([result.rss_id])
 
-                new_feeds.append(
-                    FeedEntity(
-                        rss_id=rss_id,
-                        data=dict(entry),
-                        guid=guid,
-                    )
+            for user_id in user_ids:
+                self.rss_cache.invalidate_subscriptions(user_id)
+
+            self.event_dispatcher('rss_subscription_completed', {
+                'rss_id': str(result.rss_id),
+                'url': result.url,
+                'status': result.status,
+                'user_ids': [str(user_id) for user_id in user_ids],
+            })
+
+    def __collect_new_feeds(self, results, now: datetime, host_failures: Counter, host_successes: set, hub_subscriptions: list):
+        for rss, response, parsed_data in results:
+            self.metrics.ingest_stage_duration.observe(response.elapsed, 'fetch')
+            self.metrics.fetched_bytes.inc(amount=len(response.content))
+
+            if response.status is None:
+                host_failures[url_host(rss.url)] += 1
+            else:
+                host_successes.add(url_host(rss.url))
+
+            try:
+                yield self.__new_feeds(rss, response, parsed_data, now, hub_subscriptions)
+            except Exception as e:
+                logger.exception('failed to ingest rss %s', rss.id)
+                yield self.__failed(rss, 'ingest failed: {}'.format(e), now)
+
+    def __failed(self, rss: RssEntity, error: str, now: datetime):
+        if rss.status == STATUS_PENDING:
+            rss.status = STATUS_INVALID
+
+        rss.last_error = error
+        self.poll_scheduler.backoff(rss, now)
+
+        return rss, [], 0
+
+    def __new_feeds(self, rss: RssEntity, response: FetchResult, parsed_data, now: datetime, hub_subscriptions: list):
+        if not response.ok:
+            return self.__failed(rss, response.error or 'HTTP {}'.format(response.status), now)
+
+        rss.last_error = None
+
+        if response.not_modified:
+            self.__reschedule(rss, now)
+            return rss, [], 0
+
+        if rss.status == STATUS_PENDING:
+            rss.status = STATUS_ACTIVE if parsed_data.entries else STATUS_INVALID
+
+        rss.etag = response.headers.get('etag')
+        rss.last_modified = response.headers.get('last-modified')
+
+        if self.websub.enabled:
+            hub_url, topic = discover_hub(rss, parsed_data.feed, response.headers)
+
+            # captured now, the rss expires once its batch is committed
+            if self.websub.prepare(rss, hub_url, topic, now):
+                hub_subscriptions.append(HubSubscription.of(rss))
+
+        new_feeds = self.__dedup(rss, parsed_data)
+        self.__reschedule(rss, now, parsed_data, len(new_feeds))
+
+        return rss, new_feeds, len(response.content) * len(new_feeds) // max(len(parsed_data.entries), 1)
+
+    def __dedup(self, rss: RssEntity, parsed_data) -> [FeedEntity]:
+        seen_guids = set(rss.recent_guids)
+        guids = []
+        new_feeds = []
+
+        for entry in parsed_data.entries:
+            guids.append(entry.guid)
+
+            if entry.guid in seen_guids:
+                continue
+
+            new_feeds.append(
+                FeedEntity(
+                    rss_id=rss.id,
+                    data=entry.data,
+                    guid=entry.guid,
+                    title=entry.title,
+                    link=entry.link,
+                    published_at=datetime.utcfromtimestamp(entry.published) if entry.published else None,
+                    author=entry.author,
+                    summary=entry.summary,
+                    content=entry.content,
                 )
+            )
+            seen_guids.add(entry.guid)
+
+        # pushes only carry the changed entries, so guids seen earlier are
+        # kept behind the new ones instead of being replaced
+        if guids:
+            rss.recent_guids = (guids + [guid for guid in rss.recent_guids if guid not in guids])[:self.RECENT_GUIDS_LIMIT]
+
+        return new_feeds
+
+    def __reschedule(self, rss: RssEntity, now: datetime, parsed_data=None, new_entries: int = 0) -> None:
+        self.poll_scheduler.reschedule(rss, now, parsed_data, new_entries)
+
+        # feeds pushed by a hub are only polled as a fallback
+        if self.websub.active(rss, now):
+            self.poll_scheduler.postpone(rss, now, max(rss.poll_interval, self.websub.fallback_interval))
+
+    def __parse(self, rss: RssEntity, response: FetchResult):
+        if not response.ok or response.not_modified:
+            return rss, response, None
 
-        self.rss_dal.insert_feeds(new_feeds)
+        try:
+            with self.metrics.ingest_stage_duration.time('parse'):
+                return rss, response, self.feed_parser.parse(response.content, response.headers)
+        except Exception as e:
+            return rss, dataclasses.replace(response, error='parse failed: {!r}'.format(e)), None
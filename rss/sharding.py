@@ -0,0 +1,78 @@
+import hashlib
+import os
+import socket
+import typing
+import uuid
+from datetime import datetime, timedelta
+
+from nameko import config
+
+from .dal import ClaimedRsses, RssDAL
+from .models.rss import RssEntity, SHARD_COUNT
+
+WORKER_ID = '{}:{}:{}'.format(socket.gethostname(), os.getpid(), uuid.uuid4().hex[:8])
+
+
+def shard_owner(shard: int, worker_ids: [str]) -> str:
+    return max(
+        worker_ids,
+        key=lambda worker_id: hashlib.md5('{}:{}'.format(worker_id, shard).encode()).digest(),
+    )
+
+
+class ShardCoordinator:
+
+    def __init__(self, rss_dal: RssDAL, worker_id: str, lease_ttl: int, claim_ttl: int):
+        self.rss_dal = rss_dal
+        self.worker_id = worker_id
+        self.lease_ttl = lease_ttl
+        self.claim_ttl = claim_ttl
+
+    @classmethod
+    def from_config(cls, rss_dal: RssDAL) -> 'ShardCoordinator':
+        return cls(
+            rss_dal=rss_dal,
+            worker_id=WORKER_ID,
+            lease_ttl=int(config.get('FEED_WORKER_LEASE_TTL', 3 * 60)),
+            claim_ttl=int(config.get('FEED_CLAIM_TTL', 10 * 60)),
+        )
+
+    def members(self, now: datetime) -> [str]:
+        self.rss_dal.heartbeat_worker(self.worker_id, now)
+        since = now - timedelta(seconds=self.lease_ttl)
+        worker_ids = self.rss_dal.get_live_worker_ids(since)
+
+        # members are listed oldest first and the oldest one expires leases
+        if worker_ids[0] == self.worker_id:
+            self.rss_dal.expire_workers(since)
+
+        return worker_ids
+
+    def owned_shards(self, now: datetime) -> typing.Optional[typing.List[int]]:
+        worker_ids = self.members(now)
+
+        if worker_ids == [self.worker_id]:
+            return None
+
+        return [shard for shard in range(SHARD_COUNT) if shard_owner(shard, worker_ids) == self.worker_id]
+
+    def claim_due_rsses(self, now: datetime, limit: int) -> ClaimedRsses:
+        shards = self.owned_shards(now)
+
+        if shards == []:
+            return ClaimedRsses([], None)
+
+        return self.rss_dal.claim_due_rsses(
+            now,
+            now + timedelta(seconds=self.claim_ttl),
+            limit,
+            shards,
+        )
+
+    def claim_rsses(self, now: datetime, rss_ids: [uuid.UUID]) -> [RssEntity]:
+        return self.rss_dal.claim_due_rsses(
+            now,
+            now + timedelta(seconds=self.claim_ttl),
+            len(rss_ids),
+            rss_ids=rss_ids,
+        ).rsses
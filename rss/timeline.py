@@ -0,0 +1,38 @@
+from nameko import config
+
+from .dal import RssDAL
+from .models.rss import RssEntity
+
+
+class TimelineFanout:
+
+    def __init__(self, rss_dal: RssDAL, enabled: bool, max_subscribers: int):
+        self.rss_dal = rss_dal
+        self.enabled = enabled
+        self.max_subscribers = max_subscribers
+
+    @classmethod
+    def from_config(cls, rss_dal: RssDAL) -> 'TimelineFanout':
+        return cls(
+            rss_dal=rss_dal,
+            enabled=str(config.get('TIMELINE_FANOUT_ENABLED', False)).lower() in ('1', 'true', 'yes'),
+            max_subscribers=int(config.get('TIMELINE_FANOUT_MAX_SUBSCRIBERS', 1000)),
+        )
+
+    def subscribed(self, rss: RssEntity, user_id) -> None:
+        if not self.enabled or rss.fanout_disabled:
+            return
+
+        if self.rss_dal.count_subscribers(rss.id) > self.max_subscribers:
+            self.rss_dal.disable_fanout(rss)
+            return
+
+        self.rss_dal.backfill_timeline(user_id, rss.id)
+
+    def unsubscribed(self, rss_id, user_id) -> None:
+        if self.enabled:
+            self.rss_dal.remove_from_timeline(user_id, rss_id)
+
+    def inserted(self, feed_ids) -> None:
+        if self.enabled and feed_ids:
+            self.rss_dal.fan_out_feeds(feed_ids)
@@ -0,0 +1,132 @@
+import hashlib
+import hmac
+import secrets
+import typing
+from datetime import datetime, timedelta
+
+import requests
+from nameko import config
+from requests.utils import parse_header_links
+
+from .models.rss import RssEntity
+from .scheduler import naive_utc
+
+SIGNATURE_ALGORITHMS = {
+    'sha1': hashlib.sha1,
+    'sha256': hashlib.sha256,
+    'sha384': hashlib.sha384,
+    'sha512': hashlib.sha512,
+}
+
+
+def discover_hub(rss: RssEntity, feed_hints: dict, headers: dict) -> typing.Tuple[typing.Optional[str], str]:
+    links = {
+        link.get('rel'): link['url']
+        for link in parse_header_links(headers.get('link', ''))
+        if link.get('url')
+    }
+
+    hub_url = links.get('hub') or feed_hints.get('hub')
+    topic = links.get('self') or feed_hints.get('self') or rss.url
+
+    return hub_url, topic
+
+
+def verify_signature(secret: str, body: bytes, signature: typing.Optional[str]) -> bool:
+    algorithm, _, digest = (signature or '').partition('=')
+
+    if algorithm not in SIGNATURE_ALGORITHMS or not digest:
+        return False
+
+    expected = hmac.new(secret.encode(), body, SIGNATURE_ALGORITHMS[algorithm]).hexdigest()
+
+    return hmac.compare_digest(expected, digest)
+
+
+class HubSubscription(typing.NamedTuple):
+    rss_id: typing.Any
+    hub_url: str
+    topic: str
+    secret: str
+
+    @classmethod
+    def of(cls, rss: RssEntity) -> 'HubSubscription':
+        return cls(rss.id, rss.hub_url, rss.hub_topic, rss.hub_secret)
+
+
+class WebSubSubscriber:
+
+    def __init__(self,
+                 callback_url: typing.Optional[str],
+                 lease_seconds: int,
+                 fallback_interval: int,
+                 timeout: float):
+        self.callback_url = callback_url
+        self.lease_seconds = lease_seconds
+        self.fallback_interval = fallback_interval
+        self.timeout = timeout
+
+    @classmethod
+    def from_config(cls) -> 'WebSubSubscriber':
+        return cls(
+            callback_url=config.get('WEBSUB_CALLBACK_URL') or None,
+            lease_seconds=int(config.get('WEBSUB_LEASE_SECONDS', 10 * 24 * 60 * 60)),
+            fallback_interval=int(config.get('WEBSUB_FALLBACK_INTERVAL', 24 * 60 * 60)),
+            timeout=float(config.get('FEED_FETCH_TIMEOUT', 15)),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.callback_url is not None
+
+    def active(self, rss: RssEntity, now: datetime) -> bool:
+        return (
+            rss.hub_url is not None
+            and rss.hub_lease_expires_at is not None
+            and naive_utc(rss.hub_lease_expires_at) > now
+        )
+
+    def prepare(self, rss: RssEntity, hub_url: typing.Optional[str], topic: str, now: datetime) -> bool:
+        # leases are renewed once they would run out before the fallback poll
+        # after next, and unverified requests are repeated on every poll
+        if hub_url is None:
+            rss.hub_url = rss.hub_topic = rss.hub_secret = rss.hub_lease_expires_at = rss.hub_requested_at = None
+            return False
+
+        if (
+            hub_url == rss.hub_url
+            and topic == rss.hub_topic
+            and self.active(rss, now + timedelta(seconds=2 * self.fallback_interval))
+        ):
+            return False
+
+        if hub_url != rss.hub_url or topic != rss.hub_topic:
+            rss.hub_lease_expires_at = None
+
+        # a renewal keeps the secret the hub is still signing pushes with
+        if rss.hub_secret is None or not self.active(rss, now):
+            rss.hub_secret = secrets.token_hex(20)
+
+        rss.hub_url = hub_url
+        rss.hub_topic = topic
+        rss.hub_requested_at = now
+
+        return True
+
+    def subscribe(self, subscription: HubSubscription) -> bool:
+        try:
+            response = requests.post(
+                subscription.hub_url,
+                data={
+                    'hub.mode': 'subscribe',
+                    'hub.topic': subscription.topic,
+                    'hub.callback': '{}/{}'.format(self.callback_url.rstrip('/'), subscription.rss_id),
+                    'hub.secret': subscription.secret,
+                    'hub.lease_seconds': self.lease_seconds,
+                },
+                timeout=self.timeout,
+            )
+        except requests.RequestException:
+            return False
+
+        return response.status_code in (202, 204)
@@ -1,8 +1,13 @@
+import fakeredis
+import os
 import pytest
 import uuid
+import warnings
+from contextlib import contextmanager
 from nameko.testing.services import worker_factory
 from apollo_shared.alembic.models import Base
 from sqlalchemy import event
+from sqlalchemy.exc import SAWarning
 from sqlalchemy.engine import Engine
 from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.dialects import postgresql
@@ -13,7 +18,7 @@ from sqlalchemy.orm import sessionmaker
 
 @pytest.fixture(scope='session')
 def db_url():
-    return 'sqlite:///:memory:'
+    return os.environ.get('RSS_TEST_DB_URL', 'sqlite:///:memory:')
 
 
 @pytest.yield_fixture(scope='session')
@@ -21,7 +26,7 @@ def db_connection(db_url, model_base, db_engine_options):
     engine = create_engine(db_url, **db_engine_options)
     model_base.metadata.create_all(engine)
 
-    from rss.models import bookmark, comment, feed, rss
+    from rss.models import bookmark, comment, feed, outbox, rss, timeline, worker
 
     rss.rsses.drop(engine)
     rss.rsses.create(engine)
@@ -32,12 +37,21 @@ def db_connection(db_url, model_base, db_engine_options):
     feed.feeds.drop(engine)
     feed.feeds.create(engine)
 
+    timeline.timelines.drop(engine)
+    timeline.timelines.create(engine)
+
     comment.comments.drop(engine)
     comment.comments.create(engine)
 
     bookmark.bookmarks.drop(engine)
     bookmark.bookmarks.create(engine)
 
+    worker.workers.drop(engine)
+    worker.workers.create(engine)
+
+    outbox.outbox.drop(engine)
+    outbox.outbox.create(engine)
+
     connection = engine.connect()
     model_base.metadata.bind = engine
 
@@ -77,6 +91,35 @@ def context():
 
 
 @pytest.fixture
-def rss_controller(database):
+def redis():
+    return fakeredis.FakeRedis(server=fakeredis.FakeServer(), decode_responses=True)
+
+
+@pytest.fixture
+def rss_controller(database, redis):
     from rss.controller import RssController
-    return worker_factory(RssController, db=database)
+    from rss.metrics import RssMetrics
+    from rss.parser import ParserPool
+    return worker_factory(RssController, db=database, redis=redis, feed_parser=ParserPool(workers=0), metrics=RssMetrics())
+
+
+@pytest.fixture
+def query_budget():
+    from rss.profiler import QueryProfiler
+    profiler = QueryProfiler(count_rows=True)
+    profiler.start()
+
+    @contextmanager
+    def budget(statements: int, rows: int | None = None):
+        with warnings.catch_warnings():
+            warnings.filterwarnings('error', message='.*cartesian product', category=SAWarning)
+
+            with profiler.profile() as profile:
+                yield profile
+
+        assert profile.statement_count <= statements, 'expected at most {} statements, ran:\n{}'.format(statements, profile.describe())
+        assert rows is None or profile.rows <= rows, 'expected at most {} rows, read:\n{}'.format(rows, profile.describe())
+
+    yield budget
+
+    profiler.stop()
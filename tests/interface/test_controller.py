@@ -1,4 +1,8 @@
+import feedparser
+import hashlib
+import hmac
 import uuid
+from datetime import datetime, timedelta
 
 import pytest
 from apollo_shared.exception import BadRequest, NotFound
@@ -6,8 +10,20 @@ from rss.dal import RssDAL
 from rss.service import RssService
 from rss.models.rss import RssEntity, RssUserEntity
 from rss.models.feed import FeedEntity
+from rss.models.timeline import TimelineEntity
+from sqlalchemy.exc import SQLAlchemyError
 from unittest.mock import patch, Mock
 from unittest import mock
+from werkzeug.wrappers import Request
+
+
+def websub_document(*guids) -> bytes:
+    return (
+        b'<rss version="2.0" xmlns:atom="http://www.w3.org/2005/Atom"><channel><title>t</title>'
+        b'<atom:link rel="hub" href="https://hub.erfan.com/"/><atom:link rel="self" href="https://erfan.com/feed"/>'
+        + b''.join(b'<item><guid>%s</guid><title>%s</title></item>' % (guid.encode(), guid.encode()) for guid in guids)
+        + b'</channel></rss>'
+    )
 
 
 @pytest.fixture
@@ -91,6 +107,150 @@ class TestRss:
         with pytest.raises(BadRequest, match="invalid RRS"):
             rss_controller.subscribe_rss(context, rss_data_sample)
 
+    @mock.patch('rss.service.feedparser.parse')
+    def test_subscribe_rss_revalidates_invalid_rss(self, mock_feedparser_parse, rss_controller, context, rss_data_sample, db_session):
+        rss_id = uuid.uuid4()
+        db_session.add(RssEntity(
+            id=rss_id,
+            url=rss_data_sample['url'],
+            status='invalid',
+            next_poll_at=datetime.utcnow() + timedelta(days=1),
+        ))
+        db_session.commit()
+        mock_feedparser_parse.return_value = Mock(entries=[])
+
+        with pytest.raises(BadRequest, match="invalid RRS"):
+            rss_controller.subscribe_rss(context, rss_data_sample)
+
+        assert rss_controller.get_rsses(context, {}) == []
+
+        mock_feedparser_parse.return_value = Mock(entries=[{'title': 'Test Feed'}])
+        result = rss_controller.subscribe_rss(context, rss_data_sample)
+
+        assert result['id'] == str(rss_id)
+        assert result['status'] == 'active'
+        rss = db_session.query(RssEntity).one()
+        assert rss.next_poll_at <= datetime.utcnow()
+
+    @mock.patch('rss.service.feedparser.parse')
+    def test_subscribe_rss_is_atomic(self, mock_feedparser_parse, rss_controller, context, rss_data_sample):
+        mock_feedparser_result = Mock()
+        mock_feedparser_result.entries = [{'title': 'Test Feed'}]
+        mock_feedparser_parse.return_value = mock_feedparser_result
+
+        with patch('rss.timeline.TimelineFanout.subscribed', side_effect=SQLAlchemyError):
+            with pytest.raises(SQLAlchemyError):
+                rss_controller.subscribe_rss(context, rss_data_sample)
+
+        assert rss_controller.get_rsses(context, {}) == []
+        mock_feedparser_parse.reset_mock()
+
+        result = rss_controller.subscribe_rss(context, rss_data_sample)
+        assert result['url'] == rss_data_sample['url']
+        assert mock_feedparser_parse.called
+
+    @mock.patch('rss.fetcher.requests.get')
+    @mock.patch('rss.service.feedparser.parse')
+    def test_subscribe_rss_async(self, mock_feedparser_parse, mock_requests_get, rss_controller, context, rss_data_sample):
+        result = rss_controller.subscribe_rss_async(context, rss_data_sample)
+        assert result['status'] == 'pending'
+        assert not mock_feedparser_parse.called
+        rss_controller.dispatch.assert_called_once_with('rss_subscription_requested', {'rss_id': result['id']})
+        assert rss_controller.get_subscription_status(context, {'id': uuid.UUID(result['id'])}) == {
+            'id': result['id'],
+            'status': 'pending',
+        }
+
+        mock_requests_get.return_value = Mock(status_code=200, content=b'<rss/>', headers={}, url=rss_data_sample['url'])
+        mock_feedparser_result = Mock(feed={})
+        mock_feedparser_result.entries = [{"id": 1, 'title': 'Test Feed1'}, {"id": 2, 'title': 'Test Feed2'}]
+        mock_feedparser_parse.return_value = mock_feedparser_result
+
+        rss_controller.validate_subscription({'rss_id': result['id']})
+
+        assert mock_requests_get.call_count == 1
+        rss_controller.dispatch.assert_any_call('rss_subscription_completed', {
+            'rss_id': result['id'],
+            'url': rss_data_sample['url'],
+            'status': 'active',
+            'user_ids': [str(context['user_id'])],
+        })
+        assert rss_controller.get_subscription_status(context, {'id': uuid.UUID(result['id'])})['status'] == 'active'
+        assert len(rss_controller.get_feeds_of_subscribed_rsses(context, {})) == 2
+
+    @mock.patch('rss.fetcher.requests.get')
+    def test_subscribe_rss_async_marks_unreachable_feeds_invalid(self, mock_requests_get, rss_controller, context, rss_data_sample):
+        result = rss_controller.subscribe_rss_async(context, rss_data_sample)
+        mock_requests_get.return_value = Mock(status_code=404, content=b'', headers={}, url=rss_data_sample['url'])
+
+        rss_controller.validate_subscription({'rss_id': result['id']})
+        rss_controller.update_feeds()
+
+        assert mock_requests_get.call_count == 1
+        assert rss_controller.dispatch.call_args[0][1]['status'] == 'invalid'
+        assert rss_controller.get_subscription_status(context, {'id': uuid.UUID(result['id'])})['status'] == 'invalid'
+
+    @mock.patch('rss.fetcher.requests.get')
+    @mock.patch('rss.parser.feedparser.parse')
+    def test_subscribe_rss_async_revalidates_invalid_rss(self, mock_feedparser_parse, mock_requests_get, rss_controller, context, rss_data_sample, db_session):
+        def origin(url, headers, **kwargs):
+            if headers.get('If-None-Match') == '"v1"':
+                return Mock(status_code=304, content=b'', headers={}, url=url)
+
+            return Mock(status_code=200, content=b'<rss/>', headers={'ETag': '"v1"'}, url=url)
+
+        mock_requests_get.side_effect = origin
+        mock_feedparser_parse.return_value = Mock(feed={}, entries=[])
+        result = rss_controller.subscribe_rss_async(context, rss_data_sample)
+        rss_controller.validate_subscription({'rss_id': result['id']})
+        rss_controller.unsubscribe_rss(context, {'id': uuid.UUID(result['id'])})
+
+        assert db_session.query(RssEntity).one().status == 'invalid'
+
+        mock_feedparser_parse.return_value = Mock(feed={}, entries=[{"id": "guid-1", 'title': 'Test Feed1'}])
+        second_context = dict(context, user_id=uuid.uuid4())
+        rss_controller.subscribe_rss_async(second_context, rss_data_sample)
+        rss_controller.validate_subscription({'rss_id': result['id']})
+
+        assert 'If-None-Match' not in mock_requests_get.call_args.kwargs['headers']
+        rss_controller.dispatch.assert_any_call('rss_subscription_completed', {
+            'rss_id': result['id'],
+            'url': rss_data_sample['url'],
+            'status': 'active',
+            'user_ids': [str(second_context['user_id'])],
+        })
+
+    @mock.patch('rss.fetcher.requests.get')
+    def test_subscribe_rss_async_waits_for_open_circuit(self, mock_requests_get, rss_controller, context, rss_data_sample, redis):
+        result = rss_controller.subscribe_rss_async(context, rss_data_sample)
+        redis.set('rss:breaker:open:erfan.com', 1)
+
+        rss_controller.validate_subscription({'rss_id': result['id']})
+
+        assert not mock_requests_get.called
+        assert rss_controller.dispatch.call_args_list == [
+            mock.call('rss_subscription_requested', {'rss_id': result['id']}),
+        ]
+        assert rss_controller.get_subscription_status(context, {'id': uuid.UUID(result['id'])})['status'] == 'pending'
+
+    @mock.patch.dict('rss.websub.config', {'WEBSUB_CALLBACK_URL': 'https://rss.erfan.com/websub'})
+    @mock.patch('rss.websub.requests.post')
+    @mock.patch('rss.service.feedparser.parse')
+    def test_subscribe_rss_subscribes_to_websub_hub(self, mock_feedparser_parse, mock_hub_post, rss_controller, context, rss_data_sample):
+        mock_feedparser_parse.return_value = feedparser.FeedParserDict(
+            feed={'links': [{'rel': 'hub', 'href': 'https://hub.erfan.com/'}]},
+            entries=[{'title': 'Test Feed'}],
+            headers={},
+        )
+        mock_hub_post.return_value = Mock(status_code=202)
+
+        rss = rss_controller.subscribe_rss(context, rss_data_sample)
+
+        (hub_url,), hub_request = mock_hub_post.call_args
+        assert hub_url == 'https://hub.erfan.com/'
+        assert hub_request['data']['hub.topic'] == 'https://erfan.com'
+        assert hub_request['data']['hub.callback'] == 'https://rss.erfan.com/websub/{}'.format(rss['id'])
+
     @mock.patch('rss.service.feedparser.parse')
     def test_get_rsses(self, mock_feedparser_parse, rss_controller, context, rss_data_sample):
         result = rss_controller.get_rsses(context, {})
@@ -104,6 +264,13 @@ class TestRss:
         result = rss_controller.get_rsses(context, {})
         assert len(result) > 0
 
+    def test_get_rsses_stays_within_query_budget(self, rss_model, rss_controller, context, query_budget):
+        with query_budget(statements=1, rows=1):
+            rss_controller.get_rsses(context, {})
+
+        with query_budget(statements=0):
+            rss_controller.get_rsses(context, {})
+
     def test_get_rss(self, rss_model, rss_controller, rss_data_sample, db_session, context):
         rss = db_session.query(
             RssEntity,
@@ -158,18 +325,109 @@ class TestRss:
         )
         assert len(result) == 2
 
-    def test_get_feeds_of_subscribed_rss(self, db_session, feed_model, feed_model_two, rss_controller, context):
-        rss = db_session.query(
-            RssEntity,
-        ).filter(
-            RssEntity.id == RssUserEntity.rss_id
-        ).filter(
-            RssUserEntity.user_id == context['user_id']
-        ).first()
+    def test_get_feeds_of_subscribed_rsses_stays_within_query_budget(self, feed_model, feed_model_two, rss_controller, context, query_budget):
+        with query_budget(statements=1, rows=1):
+            result = rss_controller.get_feeds_of_subscribed_rsses(context, {'limit': 1, 'fields': ['title'], 'with_stats': True})
+
+        assert len(result) == 1
 
+    def test_get_feeds_of_subscribed_rsses_paginates(self, db_session, feed_model, feed_model_two, rss_controller, context):
+        feed_model_three = FeedEntity(
+            rss_id=feed_model.rss_id,
+            data={"title": "salam3"},
+            guid="http://guid3.com",
+        )
+        db_session.add(feed_model_three)
+        db_session.commit()
+
+        first_page = rss_controller.get_feeds_of_subscribed_rsses(context, {"limit": 2})
+        assert [feed['data']['title'] for feed in first_page] == ["salam3", "salam2"]
+
+        second_page = rss_controller.get_feeds_of_subscribed_rsses(context, {
+            "limit": 2,
+            "cursor": {
+                "created_at": first_page[-1]['created_at'],
+                "id": first_page[-1]['id'],
+            },
+        })
+        assert [feed['data']['title'] for feed in second_page] == ["salam"]
+
+        with pytest.raises(BadRequest):
+            rss_controller.get_feeds_of_subscribed_rsses(context, {"limit": 0})
+
+    def test_get_feeds_of_subscribed_rsses_projects_fields(self, db_session, feed_model, rss_controller, context):
+        feed_model_three = FeedEntity(
+            rss_id=feed_model.rss_id,
+            data={"title": "salam3", "link": "http://link3.com", "tags": ["news"], "summary": "long text"},
+            guid="http://guid3.com",
+        )
+        db_session.add(feed_model_three)
+        db_session.commit()
+
+        result = rss_controller.get_feeds_of_subscribed_rsses(context, {"fields": ["title", "tags"]})
+        assert [feed['data'] for feed in result] == [
+            {"title": "salam3", "tags": ["news"]},
+            {"title": "salam"},
+        ]
+        assert result[0]['guid'] == "http://guid3.com"
+
+        result = rss_controller.get_feeds_of_subscribed_rsses(context, {})
+        assert result[0]['data']['summary'] == "long text"
+
+        with pytest.raises(BadRequest):
+            rss_controller.get_feeds_of_subscribed_rsses(context, {"fields": ["content"]})
+
+    def test_get_feeds_of_subscribed_rsses_with_stats(self, feed_model, feed_model_two, rss_controller, context):
+        rss_controller.add_to_bookmarks(context, {"feed_id": feed_model.id})
+        for _ in range(2):
+            rss_controller.add_comment_on_feed(context, {"feed_id": feed_model.id, "message": "message"})
+
+        result = rss_controller.get_feeds_of_subscribed_rsses(context, {"with_stats": True})
+        assert [(feed['data']['title'], feed['comment_count'], feed['bookmarked']) for feed in result] == [
+            ("salam2", 0, False),
+            ("salam", 2, True),
+        ]
+
+        rss_controller.add_comment_on_feed(context, {"feed_id": feed_model_two.id, "message": "message"})
+        result = rss_controller.get_feeds_of_subscribed_rss(context, {
+            "rss_id": feed_model.rss_id,
+            "with_stats": True,
+            "fields": ["title"],
+        })
+        assert [(feed['data'], feed['comment_count'], feed['bookmarked']) for feed in result] == [
+            ({"title": "salam2"}, 1, False),
+            ({"title": "salam"}, 2, True),
+        ]
+
+    def test_search_feeds(self, db_session, feed_model, rss_controller, context):
+        other_rss = RssEntity(url="https://other.com/rss")
+        db_session.add(other_rss)
+        db_session.flush()
+        db_session.add_all([
+            FeedEntity(rss_id=feed_model.rss_id, data={}, guid="http://guid3.com",
+                       title="Weekly digest", summary="Python release notes"),
+            FeedEntity(rss_id=feed_model.rss_id, data={}, guid="http://guid4.com",
+                       title="Python release", summary="What changed"),
+            FeedEntity(rss_id=other_rss.id, data={}, guid="http://guid5.com",
+                       title="Python release", summary="Not subscribed"),
+        ])
+        db_session.commit()
+
+        result = rss_controller.search_feeds(context, {"query": "python release"})
+        assert [feed['guid'] for feed in result] == ["http://guid4.com", "http://guid3.com"]
+
+        result = rss_controller.search_feeds(context, {"query": "python release", "limit": 1, "offset": 1})
+        assert [feed['guid'] for feed in result] == ["http://guid3.com"]
+
+        assert rss_controller.search_feeds(context, {"query": "golang"}) == []
+
+        with pytest.raises(BadRequest):
+            rss_controller.search_feeds(context, {})
+
+    def test_get_feeds_of_subscribed_rss(self, feed_model, feed_model_two, rss_controller, context):
         result = rss_controller.get_feeds_of_subscribed_rss(
             context, {
-                "rss_id": rss.id,
+                "rss_id": feed_model.rss_id,
             }
         )
         assert len(result) > 0
@@ -195,6 +453,30 @@ class TestRss:
         )
         assert len(result) > 0
 
+    def test_get_comments_on_feed_stays_within_query_budget(self, feed_model, rss_controller, context, query_budget):
+        for _ in range(3):
+            rss_controller.add_comment_on_feed(context, {
+                "feed_id": feed_model.id,
+                "message": "message",
+            })
+
+        with query_budget(statements=1, rows=3):
+            result = rss_controller.get_comments_on_feed(context, {"feed_id": feed_model.id})
+
+        assert len(result) == 3
+
+    def test_get_comments_counts_for_feeds(self, feed_model, feed_model_two, rss_controller, context):
+        for _ in range(2):
+            rss_controller.add_comment_on_feed(context, {
+                "feed_id": feed_model.id,
+                "message": "message",
+            })
+
+        result = rss_controller.get_comments_counts_for_feeds(context, {
+            "feed_ids": [feed_model.id, feed_model_two.id],
+        })
+        assert result == {str(feed_model.id): 2, str(feed_model_two.id): 0}
+
     def test_get_comment_on_feed(self, feed_model, rss_controller, context):
         first_result = rss_controller.add_comment_on_feed(context, {
             "feed_id": feed_model.id,
@@ -239,6 +521,24 @@ class TestRss:
         )
         assert result['feed_id'] == str(feed_model.id)
 
+    def test_add_to_bookmarks_batch(self, feed_model, feed_model_two, rss_controller, context):
+        existing = rss_controller.add_to_bookmarks(context, {"feed_id": feed_model.id})
+
+        result = rss_controller.add_to_bookmarks_batch(context, {
+            "feed_ids": [feed_model_two.id, feed_model.id, feed_model_two.id],
+        })
+        assert [bookmark['feed_id'] for bookmark in result] == [str(feed_model_two.id), str(feed_model.id)]
+        assert result[1]['id'] == existing['id']
+        assert len(rss_controller.get_bookmarks(context, {})) == 2
+
+        fetched = rss_controller.get_bookmarks_by_ids(context, {
+            "bookmark_ids": [uuid.UUID(bookmark['id']) for bookmark in result] + [uuid.uuid4()],
+        })
+        assert {bookmark['id'] for bookmark in fetched} == {bookmark['id'] for bookmark in result}
+
+        with pytest.raises(BadRequest):
+            rss_controller.add_to_bookmarks_batch(context, {"feed_ids": []})
+
     def test_get_bookmarks(self, feed_model, rss_controller, context):
         rss_controller.add_to_bookmarks(
             context,
@@ -306,9 +606,12 @@ class TestRss:
 
         assert len(result) == 0
 
+    @mock.patch('rss.fetcher.requests.get')
     @mock.patch('rss.service.feedparser.parse')
-    def test_update_feeds(self, mock_feedparser_parse, rss_model, rss_controller, db_session):
-        mock_feedparser_result = Mock()
+    def test_update_feeds(self, mock_feedparser_parse, mock_requests_get, rss_model, rss_controller, db_session):
+        mock_requests_get.return_value = Mock(status_code=200, content=b'<rss/>', headers={}, url='https://erfan.com')
+
+        mock_feedparser_result = Mock(feed={})
         mock_feedparser_result.entries = [
             {"id": 1, 'title': 'Test Feed1'},
             {"id": 2, 'title': 'Test Feed2'},
@@ -325,3 +628,408 @@ class TestRss:
         ).all()
 
         assert len(feeds) == 5
+
+    @mock.patch('rss.fetcher.requests.get')
+    @mock.patch('rss.service.feedparser.parse')
+    def test_update_feeds_uses_http_validators(self, mock_feedparser_parse, mock_requests_get, rss_model, rss_controller, db_session):
+        mock_requests_get.return_value = Mock(
+            status_code=200,
+            content=b'<rss/>',
+            headers={'ETag': '"v1"', 'Last-Modified': 'Wed, 01 Nov 2023 18:42:21 GMT'},
+            url='https://erfan.com',
+        )
+        mock_feedparser_result = Mock(feed={})
+        mock_feedparser_result.entries = [{"id": 1, 'title': 'Test Feed1'}]
+        mock_feedparser_parse.return_value = mock_feedparser_result
+
+        rss_controller.update_feeds()
+
+        rss = db_session.query(RssEntity).one()
+        assert rss.etag == '"v1"'
+        assert rss.last_modified == 'Wed, 01 Nov 2023 18:42:21 GMT'
+
+        rss.next_poll_at = datetime.utcnow()
+        db_session.commit()
+        mock_requests_get.return_value = Mock(status_code=304, content=b'', headers={}, url='https://erfan.com')
+        mock_feedparser_parse.reset_mock()
+
+        rss_controller.update_feeds()
+
+        assert mock_requests_get.call_args.kwargs['headers']['If-None-Match'] == '"v1"'
+        mock_feedparser_parse.assert_not_called()
+        assert db_session.query(FeedEntity).count() == 1
+
+    @mock.patch('rss.fetcher.requests.get')
+    @mock.patch('rss.service.feedparser.parse')
+    def test_update_feeds_polls_only_due_feeds(self, mock_feedparser_parse, mock_requests_get, rss_model, rss_controller, db_session):
+        mock_requests_get.return_value = Mock(status_code=200, content=b'<rss/>', headers={}, url='https://erfan.com')
+        mock_feedparser_result = Mock(feed={})
+        mock_feedparser_result.entries = [{"id": 1, 'title': 'Test Feed1'}]
+        mock_feedparser_parse.return_value = mock_feedparser_result
+
+        rss_controller.update_feeds()
+
+        rss = db_session.query(RssEntity).one()
+        assert rss.poll_interval is not None
+        assert rss.next_poll_at > datetime.utcnow()
+
+        mock_requests_get.reset_mock()
+        rss_controller.update_feeds()
+        mock_requests_get.assert_not_called()
+
+    @mock.patch('rss.fetcher.requests.get')
+    def test_update_feeds_backs_off_failing_feeds(self, mock_requests_get, rss_model, rss_controller, db_session):
+        mock_requests_get.return_value = Mock(status_code=500, content=b'', headers={}, url='https://erfan.com')
+
+        rss_controller.update_feeds()
+
+        rss = db_session.query(RssEntity).one()
+        assert rss.failure_count == 1
+        assert rss.next_poll_at > datetime.utcnow()
+
+    @mock.patch('rss.fetcher.requests.get')
+    @mock.patch('rss.service.feedparser.parse')
+    def test_update_feeds_skips_known_entries(self, mock_feedparser_parse, mock_requests_get, rss_model, rss_controller, db_session):
+        mock_requests_get.return_value = Mock(status_code=200, content=b'<rss/>', headers={}, url='https://erfan.com')
+        mock_feedparser_result = Mock(feed={})
+        mock_feedparser_result.entries = [{"id": "guid-2", 'title': 'Test Feed2'}, {"id": "guid-1", 'title': 'Test Feed1'}]
+        mock_feedparser_parse.return_value = mock_feedparser_result
+
+        rss_controller.update_feeds()
+
+        rss = db_session.query(RssEntity).one()
+        assert rss.recent_guids == ["guid-2", "guid-1"]
+
+        rss.next_poll_at = datetime.utcnow()
+        db_session.commit()
+        mock_feedparser_result.entries = [{"id": "guid-1", 'title': 'Test Feed1'}, {"id": "guid-3", 'title': 'Test Feed3'}, {"id": "guid-2", 'title': 'Test Feed2'}]
+
+        rss_controller.update_feeds()
+
+        assert sorted(feed.guid for feed in db_session.query(FeedEntity).all()) == ['guid-1', 'guid-2', 'guid-3']
+        assert db_session.query(RssEntity).one().recent_guids == ["guid-1", "guid-3", "guid-2"]
+
+    @mock.patch('rss.fetcher.requests.get')
+    @mock.patch('rss.service.feedparser.parse')
+    def test_update_feeds_is_idempotent(self, mock_feedparser_parse, mock_requests_get, rss_model, rss_controller, db_session):
+        mock_requests_get.return_value = Mock(status_code=200, content=b'<rss/>', headers={}, url='https://erfan.com')
+        mock_feedparser_result = Mock(feed={})
+        mock_feedparser_result.entries = [{"id": "guid-1", 'title': 'Test Feed1'}, {"id": "guid-2", 'title': 'Test Feed2'}]
+        mock_feedparser_parse.return_value = mock_feedparser_result
+
+        rss_controller.update_feeds()
+
+        rss = db_session.query(RssEntity).one()
+        rss.recent_guids = []
+        rss.next_poll_at = datetime.utcnow()
+        db_session.commit()
+
+        rss_controller.update_feeds()
+
+        assert db_session.query(FeedEntity).count() == 2
+
+    @mock.patch.dict('rss.ingest.config', {'FEED_INGEST_BATCH_SIZE': 1})
+    @mock.patch('rss.fetcher.requests.get')
+    @mock.patch('rss.parser.feedparser.parse')
+    def test_update_feeds_commits_each_batch(self, mock_feedparser_parse, mock_requests_get, rss_model, rss_controller, db_session):
+        db_session.add(RssEntity(url='https://erfan2.com'))
+        db_session.commit()
+        mock_requests_get.return_value = Mock(status_code=200, content=b'<rss/>', headers={}, url='https://erfan.com')
+        mock_feedparser_result = Mock(feed={})
+        mock_feedparser_result.entries = [{"id": "guid-1", 'title': 'Test Feed1'}]
+        mock_feedparser_parse.return_value = mock_feedparser_result
+        save_ingest_batch = RssDAL.save_ingest_batch
+        batches = []
+
+        def fail_first_batch(dal, rsses, feeds):
+            batches.append([rss.id for rss in rsses])
+            if len(batches) == 1:
+                dal.db_session.rollback()
+                raise SQLAlchemyError('connection lost')
+
+            return save_ingest_batch(dal, rsses, feeds)
+
+        with mock.patch.object(RssDAL, 'save_ingest_batch', fail_first_batch):
+            rss_controller.update_feeds()
+
+        assert len(batches) == 2
+        assert db_session.query(FeedEntity).one().rss_id == batches[1][0]
+
+        failed = db_session.query(RssEntity).filter(RssEntity.id == batches[0][0]).one()
+        assert failed.recent_guids == []
+        assert failed.next_poll_at > datetime.utcnow()
+
+    @mock.patch('rss.fetcher.requests.get')
+    @mock.patch('rss.parser.feedparser.parse')
+    def test_update_feeds_isolates_failing_feeds(self, mock_feedparser_parse, mock_requests_get, rss_model, rss_controller, db_session):
+        broken_id = uuid.uuid4()
+        db_session.add(RssEntity(url='https://broken.com', id=broken_id))
+        db_session.commit()
+        mock_requests_get.side_effect = lambda url, **kwargs: Mock(status_code=200, content=url.encode(), headers={}, url=url)
+        mock_feedparser_result = Mock(feed={})
+        mock_feedparser_result.entries = [{'title': 'No Guid', 'link': 'https://erfan.com/1'}]
+
+        def parse(content, **kwargs):
+            if content == b'https://broken.com':
+                raise ValueError('bad document')
+
+            return mock_feedparser_result
+
+        mock_feedparser_parse.side_effect = parse
+
+        rss_controller.update_feeds()
+
+        assert [feed.guid for feed in db_session.query(FeedEntity).all()] == ['https://erfan.com/1']
+
+        failed = db_session.query(RssEntity).filter(RssEntity.id == broken_id).one()
+        assert failed.failure_count == 1
+        assert failed.last_error.startswith('parse failed')
+        assert failed.next_poll_at > datetime.utcnow()
+
+    @mock.patch.dict('rss.breaker.config', {'FEED_BREAKER_THRESHOLD': 2})
+    @mock.patch('rss.fetcher.requests.get')
+    def test_update_feeds_skips_hosts_with_open_circuit(self, mock_requests_get, rss_model, rss_controller, db_session):
+        from requests import ConnectionError
+
+        db_session.add(RssEntity(url='https://erfan.com/other'))
+        db_session.commit()
+        mock_requests_get.side_effect = ConnectionError('connection refused')
+
+        rss_controller.update_feeds()
+
+        assert mock_requests_get.call_count == 2
+
+        db_session.query(RssEntity).update({'next_poll_at': datetime.utcnow()})
+        db_session.commit()
+
+        rss_controller.update_feeds()
+
+        assert mock_requests_get.call_count == 2
+        assert [rss.failure_count for rss in db_session.query(RssEntity).all()] == [1, 1]
+        assert all(rss.next_poll_at > datetime.utcnow() for rss in db_session.query(RssEntity).all())
+
+    @mock.patch('rss.fetcher.requests.get')
+    @mock.patch('rss.parser.feedparser.parse')
+    def test_update_feeds_stays_within_query_budget(self, mock_feedparser_parse, mock_requests_get, rss_controller, db_session, query_budget):
+        mock_requests_get.return_value = Mock(status_code=200, content=b'<rss/>', headers={}, url='https://erfan.com')
+        mock_feedparser_parse.return_value = Mock(feed={}, entries=[{"id": "guid-1", 'title': 'Test Feed1'}])
+        db_session.add_all(RssEntity(url='https://erfan.com/{}'.format(i)) for i in range(20))
+        db_session.commit()
+
+        # claim, one batch and the outbox relay, however many feeds are due
+        with query_budget(statements=13):
+            rss_controller.update_feeds()
+
+        assert db_session.query(FeedEntity).count() == 20
+
+    @mock.patch('rss.fetcher.requests.get')
+    @mock.patch('rss.parser.feedparser.parse')
+    def test_update_feeds_records_ingest_metrics(self, mock_feedparser_parse, mock_requests_get, rss_model, rss_controller, db_session):
+        mock_requests_get.return_value = Mock(status_code=200, content=b'<rss/>', headers={}, url='https://erfan.com')
+        mock_feedparser_result = Mock(feed={})
+        mock_feedparser_result.entries = [{"id": "guid-1", 'title': 'Test Feed1'}]
+        mock_feedparser_parse.return_value = mock_feedparser_result
+        db_session.query(RssEntity).update({'next_poll_at': datetime.utcnow() - timedelta(minutes=10)})
+        db_session.commit()
+
+        rss_controller.update_feeds()
+
+        metrics = rss_controller.metrics
+        assert metrics.fetched_bytes.value() == len(b'<rss/>')
+        assert metrics.ingested_entries.value() == 1
+        assert 600 <= metrics.sweep_lag.value() < 660
+        assert [metrics.ingest_stage_duration.count(stage) for stage in ('fetch', 'parse', 'insert')] == [1, 1, 1]
+
+        status, headers, body = rss_controller.get_metrics(Mock())
+        assert status == 200
+        assert headers['Content-Type'].startswith('text/plain')
+        assert 'rss_ingested_entries_total 1' in body.split('\n')
+
+    @mock.patch.dict('rss.websub.config', {'WEBSUB_CALLBACK_URL': 'https://rss.erfan.com/websub', 'WEBSUB_FALLBACK_INTERVAL': 86400})
+    @mock.patch('rss.websub.requests.post')
+    @mock.patch('rss.fetcher.requests.get')
+    def test_update_feeds_subscribes_to_websub_hubs(self, mock_requests_get, mock_hub_post, rss_model, rss_controller, db_session):
+        mock_requests_get.return_value = Mock(status_code=200, content=websub_document('guid-1'), headers={}, url='https://erfan.com')
+        mock_hub_post.return_value = Mock(status_code=202)
+
+        rss_controller.update_feeds()
+
+        (hub_url,), hub_request = mock_hub_post.call_args
+        form = hub_request['data']
+        assert hub_url == 'https://hub.erfan.com/'
+        assert form['hub.mode'] == 'subscribe'
+        assert form['hub.topic'] == 'https://erfan.com/feed'
+        rss_id = uuid.UUID(form['hub.callback'].rsplit('/', 1)[1])
+
+        def verify(topic, mode='subscribe'):
+            return rss_controller.verify_websub_subscription(Request.from_values(query_string={
+                'hub.mode': mode,
+                'hub.topic': topic,
+                'hub.challenge': 'challenge',
+                'hub.lease_seconds': '864000',
+            }), rss_id)
+
+        assert verify('https://erfan.com/other')[0] == 404
+        assert verify('https://erfan.com/feed', mode='unsubscribe')[0] == 404
+        assert verify('https://erfan.com/feed') == (200, 'challenge')
+        assert verify('https://erfan.com/feed')[0] == 404
+
+        def push(body, secret):
+            return rss_controller.receive_websub_push(Request.from_values(method='POST', data=body, headers={
+                'Content-Type': 'application/rss+xml',
+                'X-Hub-Signature': 'sha1=' + hmac.new(secret.encode(), body, hashlib.sha1).hexdigest(),
+            }), rss_id)
+
+        assert push(websub_document('guid-3'), 'forged')[0] == 202
+        assert push(websub_document('guid-2'), form['hub.secret'])[0] == 202
+        assert sorted(feed.title for feed in db_session.query(FeedEntity).all()) == ['guid-1', 'guid-2']
+        assert db_session.query(RssEntity).one().recent_guids == ['https://erfan.com/guid-2', 'https://erfan.com/guid-1']
+
+        db_session.query(RssEntity).update({'next_poll_at': datetime.utcnow()})
+        db_session.commit()
+
+        rss_controller.update_feeds()
+
+        assert mock_hub_post.call_count == 1
+        assert db_session.query(RssEntity).one().next_poll_at > datetime.utcnow() + timedelta(hours=23)
+
+    @mock.patch('rss.fetcher.requests.get')
+    @mock.patch('rss.parser.feedparser.parse')
+    def test_update_feeds_publishes_ingested_feeds(self, mock_feedparser_parse, mock_requests_get, rss_model, rss_controller, context):
+        mock_requests_get.return_value = Mock(status_code=200, content=b'<rss/>', headers={}, url='https://erfan.com')
+        mock_feedparser_result = Mock(feed={})
+        mock_feedparser_result.entries = [{"id": "guid-1", 'title': 'Test Feed1'}, {"id": "guid-2", 'title': 'Test Feed2'}]
+        mock_feedparser_parse.return_value = mock_feedparser_result
+        rss_controller.dispatch.side_effect = [ConnectionError('broker down'), None]
+
+        rss_controller.update_feeds()
+
+        assert rss_controller.dispatch.call_count == 1
+
+        rss_controller.relay_outbox()
+        rss_controller.relay_outbox()
+
+        assert rss_controller.dispatch.call_count == 2
+        event_type, payload = rss_controller.dispatch.call_args[0]
+        assert event_type == 'feeds_ingested'
+        assert payload['event_id'] == rss_controller.dispatch.call_args_list[0][0][1]['event_id']
+
+        (rss,) = payload['rsses']
+        assert rss['subscriber_count'] == 1
+        assert sorted(rss['feed_ids']) == sorted(feed['id'] for feed in rss_controller.get_feeds_of_subscribed_rsses(context, {}))
+
+    def test_get_feeds_of_subscribed_rsses_is_cached(self, db_session, feed_model, rss_controller, context):
+        assert len(rss_controller.get_feeds_of_subscribed_rsses(context, {})) == 1
+
+        db_session.add(FeedEntity(rss_id=feed_model.rss_id, data={"title": "salam2"}, guid="http://guid2.com"))
+        db_session.commit()
+
+        assert len(rss_controller.get_feeds_of_subscribed_rsses(context, {})) == 1
+        assert rss_controller.get_cache_stats(context, {}) == {'hits': 1, 'misses': 1}
+
+    def test_timeline_versions_expire(self, feed_model, rss_controller, context, redis):
+        version_key = 'rss:timeline:{}:version'.format(context['user_id'])
+        rss_controller.get_feeds_of_subscribed_rsses(context, {})
+
+        assert 0 < redis.ttl(version_key) <= 60
+
+    @mock.patch('rss.fetcher.requests.get')
+    @mock.patch('rss.parser.feedparser.parse')
+    def test_falls_back_to_database_without_redis(self, mock_feedparser_parse, mock_requests_get, rss_model, rss_controller, context, redis):
+        mock_requests_get.return_value = Mock(status_code=200, content=b'<rss/>', headers={}, url='https://erfan.com')
+        mock_feedparser_result = Mock(feed={})
+        mock_feedparser_result.entries = [{"id": "guid-1", 'title': 'Test Feed1'}]
+        mock_feedparser_parse.return_value = mock_feedparser_result
+        redis.connection_pool.connection_kwargs['server'].connected = False
+
+        rss_controller.update_feeds()
+
+        assert mock_requests_get.call_count == 1
+        assert len(rss_controller.get_rsses(context, {})) == 1
+        assert len(rss_controller.get_feeds_of_subscribed_rsses(context, {})) == 1
+
+    @mock.patch('rss.fetcher.requests.get')
+    @mock.patch('rss.service.feedparser.parse')
+    def test_update_feeds_invalidates_cached_timelines(self, mock_feedparser_parse, mock_requests_get, rss_model, rss_controller, context):
+        assert rss_controller.get_feeds_of_subscribed_rsses(context, {}) == []
+
+        mock_requests_get.return_value = Mock(status_code=200, content=b'<rss/>', headers={}, url='https://erfan.com')
+        mock_feedparser_result = Mock(feed={})
+        mock_feedparser_result.entries = [{"id": "guid-1", 'title': 'Test Feed1'}]
+        mock_feedparser_parse.return_value = mock_feedparser_result
+
+        rss_controller.update_feeds()
+
+        assert len(rss_controller.get_feeds_of_subscribed_rsses(context, {})) == 1
+
+    @mock.patch('rss.service.feedparser.parse')
+    def test_subscribe_rss_invalidates_cached_subscriptions(self, mock_feedparser_parse, rss_model, rss_controller, context):
+        assert len(rss_controller.get_rsses(context, {})) == 1
+
+        mock_feedparser_result = Mock()
+        mock_feedparser_result.entries = [{'title': 'Test Feed'}]
+        mock_feedparser_parse.return_value = mock_feedparser_result
+        rss_controller.subscribe_rss(context, {'url': 'https://erfan2.com'})
+
+        assert len(rss_controller.get_rsses(context, {})) == 2
+
+    @mock.patch.dict('rss.timeline.config', {'TIMELINE_FANOUT_ENABLED': True, 'TIMELINE_FANOUT_MAX_SUBSCRIBERS': 2})
+    @mock.patch('rss.parser.feedparser.parse')
+    @mock.patch('rss.fetcher.requests.get')
+    @mock.patch('rss.service.feedparser.parse')
+    def test_timeline_fanout(self, mock_feedparser_parse, mock_requests_get, mock_parser_parse, rss_controller, context, rss_data_sample, db_session):
+        mock_requests_get.return_value = Mock(status_code=200, content=b'<rss/>', headers={}, url='https://erfan.com')
+        mock_feedparser_result = Mock(feed={})
+        mock_feedparser_result.entries = [{"id": "guid-1", 'title': 'Test Feed1'}]
+        mock_feedparser_parse.return_value = mock_feedparser_result
+        mock_parser_parse.return_value = mock_feedparser_result
+
+        rss_controller.subscribe_rss(context, rss_data_sample)
+        rss_controller.update_feeds()
+
+        assert db_session.query(TimelineEntity).count() == 1
+        assert len(rss_controller.get_feeds_of_subscribed_rsses(context, {})) == 1
+
+        second_context = dict(context, user_id=uuid.uuid4())
+        rss_controller.subscribe_rss(second_context, rss_data_sample)
+
+        assert db_session.query(TimelineEntity).count() == 2
+        assert len(rss_controller.get_feeds_of_subscribed_rsses(second_context, {})) == 1
+
+        third_context = dict(context, user_id=uuid.uuid4())
+        rss_controller.subscribe_rss(third_context, rss_data_sample)
+
+        rss = db_session.query(RssEntity).one()
+        assert rss.fanout_disabled
+        assert db_session.query(TimelineEntity).count() == 2
+        assert len(rss_controller.get_feeds_of_subscribed_rsses(third_context, {})) == 1
+
+        rss_controller.unsubscribe_rss(context, {"id": rss.id})
+
+        assert rss_controller.get_feeds_of_subscribed_rsses(context, {}) == []
+        assert rss_controller.get_feeds_of_subscribed_rsses(second_context, {}) != []
+
+    @mock.patch.dict('rss.timeline.config', {'TIMELINE_FANOUT_ENABLED': True})
+    @mock.patch('rss.fetcher.requests.get')
+    @mock.patch('rss.parser.feedparser.parse')
+    def test_update_feeds_stores_feeds_and_timeline_atomically(self, mock_feedparser_parse, mock_requests_get, rss_model, rss_controller, db_session):
+        mock_requests_get.return_value = Mock(status_code=200, content=b'<rss/>', headers={}, url='https://erfan.com')
+        mock_feedparser_result = Mock(feed={})
+        mock_feedparser_result.entries = [{"id": "guid-1", 'title': 'Test Feed1'}]
+        mock_feedparser_parse.return_value = mock_feedparser_result
+        feed_count = db_session.query(FeedEntity).count()
+        db_session.commit()
+
+        with patch('rss.timeline.TimelineFanout.inserted', side_effect=SQLAlchemyError):
+            rss_controller.update_feeds()
+
+        assert db_session.query(FeedEntity).count() == feed_count
+        assert db_session.query(TimelineEntity).count() == 0
+        assert rss_controller.dispatch.call_count == 0
+
+        db_session.query(RssEntity).update({'next_poll_at': datetime.utcnow()})
+        db_session.commit()
+        rss_controller.update_feeds()
+
+        assert db_session.query(FeedEntity).count() == feed_count + 1
+        assert db_session.query(TimelineEntity).count() == 1
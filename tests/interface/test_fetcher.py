@@ -0,0 +1,63 @@
+from collections import Counter
+from unittest import mock
+from unittest.mock import Mock
+
+import eventlet
+import requests
+
+from rss.fetcher import FeedFetcher
+from rss.models.rss import RssEntity
+
+
+class TestFeedFetcher:
+
+    @mock.patch('rss.fetcher.requests.get')
+    def test_fetch_all_caps_concurrency_per_host(self, mock_requests_get):
+        in_flight = Counter()
+        peaks = Counter()
+
+        def get(url, **kwargs):
+            host = url.split('/')[2]
+            in_flight[host] += 1
+            peaks[host] = max(peaks[host], in_flight[host])
+            eventlet.sleep(0.01)
+            in_flight[host] -= 1
+
+            return Mock(status_code=200, content=url.encode(), headers={}, url=url)
+
+        mock_requests_get.side_effect = get
+
+        rsses = [RssEntity(url='https://{}.com/{}'.format(host, i)) for host in ('a', 'b') for i in range(5)]
+        fetcher = FeedFetcher(pool_size=10, per_host_limit=2, timeout=1)
+
+        results = list(fetcher.fetch_all(rsses))
+
+        assert [rss.url for rss, _ in results] == [rss.url for rss in rsses]
+        assert all(response.ok and response.content == rss.url.encode() for rss, response in results)
+        assert peaks == {'a.com': 2, 'b.com': 2}
+
+    @mock.patch('rss.fetcher.requests.get')
+    def test_fetch_reports_errors_and_timeouts(self, mock_requests_get):
+        fetcher = FeedFetcher(pool_size=2, per_host_limit=1, timeout=0.05)
+
+        mock_requests_get.side_effect = requests.ConnectionError('refused')
+        response = fetcher.fetch(RssEntity(url='https://down.com'))
+        assert not response.ok
+        assert response.error == 'refused'
+
+        mock_requests_get.side_effect = lambda url, **kwargs: eventlet.sleep(1)
+        response = fetcher.fetch(RssEntity(url='https://slow.com'))
+        assert not response.ok
+        assert 'timed out' in response.error
+
+    @mock.patch('rss.fetcher.requests.get')
+    def test_fetch_sends_conditional_headers(self, mock_requests_get):
+        mock_requests_get.return_value = Mock(status_code=304, content=b'', headers={}, url='https://a.com')
+        fetcher = FeedFetcher(pool_size=1, per_host_limit=1, timeout=1)
+
+        response = fetcher.fetch(RssEntity(url='https://a.com', etag='"v1"', last_modified='Wed, 01 Nov 2023 18:42:21 GMT'))
+
+        headers = mock_requests_get.call_args.kwargs['headers']
+        assert headers['If-None-Match'] == '"v1"'
+        assert headers['If-Modified-Since'] == 'Wed, 01 Nov 2023 18:42:21 GMT'
+        assert response.not_modified
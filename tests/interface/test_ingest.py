@@ -0,0 +1,43 @@
+from rss.ingest import IngestBatcher
+from rss.models.feed import FeedEntity
+from rss.models.rss import RssEntity
+
+
+def items(*entry_counts, size=10):
+    for i, count in enumerate(entry_counts):
+        rss = RssEntity(url='https://feed{}.com'.format(i))
+        feeds = [FeedEntity(rss_id=i, data={}, guid=str(j)) for j in range(count)]
+
+        yield rss, feeds, size * count
+
+
+class TestIngestBatcher:
+
+    def test_batches_by_entry_count(self):
+        batches = list(IngestBatcher(max_entries=3, max_bytes=10 ** 6).batches(items(2, 0, 2, 1, 1)))
+
+        assert [len(batch.feeds) for batch in batches] == [4, 2]
+        assert [len(batch.rsses) for batch in batches] == [3, 2]
+
+    def test_batches_by_byte_budget(self):
+        batches = list(IngestBatcher(max_entries=100, max_bytes=25).batches(items(1, 2, 1, 1)))
+
+        assert [len(batch.feeds) for batch in batches] == [3, 2]
+
+    def test_keeps_a_feed_in_one_batch(self):
+        batches = list(IngestBatcher(max_entries=2, max_bytes=10 ** 6).batches(items(5)))
+
+        assert [len(batch.feeds) for batch in batches] == [5]
+
+    def test_is_lazy(self):
+        consumed = []
+
+        def source():
+            for item in items(1, 1, 1):
+                consumed.append(item)
+                yield item
+
+        batches = IngestBatcher(max_entries=1, max_bytes=10 ** 6).batches(source())
+        next(batches)
+
+        assert len(consumed) == 1
@@ -0,0 +1,56 @@
+from unittest.mock import Mock
+
+import greenlet
+from sqlalchemy import create_engine, text
+
+from rss.dependencies import Metrics
+from rss.metrics import Counter, Histogram
+
+
+class TestMetrics:
+
+    def test_histogram_renders_cumulative_buckets(self):
+        histogram = Histogram('latency_seconds', 'Latency.', ('method',), buckets=(0.1, 1))
+        histogram.observe(0.05, 'get_rss')
+        histogram.observe(0.5, 'get_rss')
+
+        assert histogram.render().split('\n') == [
+            '# HELP latency_seconds Latency.',
+            '# TYPE latency_seconds histogram',
+            'latency_seconds_bucket{method="get_rss",le="0.1"} 1',
+            'latency_seconds_bucket{method="get_rss",le="1"} 2',
+            'latency_seconds_bucket{method="get_rss",le="+Inf"} 2',
+            'latency_seconds_sum{method="get_rss"} 0.55',
+            'latency_seconds_count{method="get_rss"} 2',
+        ]
+
+    def test_counter_escapes_labels(self):
+        counter = Counter('rows_total', 'Rows.', ('method',))
+        counter.inc('say "hi"', amount=3)
+
+        assert counter.render().split('\n')[-1] == 'rows_total{method="say \\"hi\\""} 3'
+
+    def test_provider_attributes_statements_to_the_entrypoint(self):
+        provider = Metrics()
+        provider.setup()
+        provider.start()
+        engine = create_engine('sqlite:///:memory:')
+        worker_ctx = Mock()
+        worker_ctx.entrypoint.method_name = 'get_rsses'
+
+        try:
+            with engine.connect() as connection:
+                connection.execute(text('SELECT 1'))
+
+                provider.worker_setup(worker_ctx)
+                connection.execute(text('SELECT 1'))
+                connection.execute(text('SELECT 2'))
+                provider.worker_teardown(worker_ctx)
+        finally:
+            provider.stop()
+            engine.dispose()
+
+        assert provider.metrics.query_duration.count('get_rsses') == 2
+        assert provider.metrics.rpc_duration.count('get_rsses') == 1
+        assert 'rss_rpc_db_statements_sum{method="get_rsses"} 2' in provider.metrics.rpc_statements.render().split('\n')
+        assert greenlet.getcurrent() not in provider._calls
@@ -0,0 +1,94 @@
+import calendar
+import time
+import zlib
+from datetime import datetime
+
+import pytest
+
+from rss.parser import ParsedEntry, ParserPool, ParseTimeout, parse_feed
+
+DOCUMENT = (
+    b'<rss version="2.0"><channel><title>t</title><ttl>30</ttl>'
+    b'<item><guid>guid-2</guid><title>Second</title><pubDate>Wed, 10 Jan 2024 12:00:00 GMT</pubDate></item>'
+    b'<item><guid>guid-1</guid><title>First</title></item>'
+    b'</channel></rss>'
+)
+
+
+@pytest.fixture
+def parser_pool():
+    pool = ParserPool(workers=2)
+    pool.start()
+
+    yield pool
+
+    pool.stop()
+
+
+class TestParser:
+
+    def test_parse_feed_returns_plain_entries(self):
+        parsed = parse_feed(DOCUMENT, {})
+
+        assert parsed.feed == {'ttl': '30'}
+        assert [entry.guid for entry in parsed.entries] == ['guid-2', 'guid-1']
+        assert parsed.entries[0].published == calendar.timegm(datetime(2024, 1, 10, 12).utctimetuple())
+        assert parsed.entries[1].published is None
+        assert type(parsed.entries[0].data) is dict
+        assert parsed.entries[0].data['title'] == 'Second'
+
+    def test_parse_feed_compacts_entries(self):
+        parsed = parse_feed(
+            b'<rss version="2.0" xmlns:content="http://purl.org/rss/1.0/modules/content/"><channel>'
+            b'<item><guid>guid-1</guid><title>First</title><link>https://feed.com/1</link>'
+            b'<pubDate>Wed, 10 Jan 2024 12:00:00 GMT</pubDate><category>news</category>'
+            b'<description>&lt;p&gt;Short &amp;amp; sweet&lt;/p&gt;</description>'
+            b'<content:encoded>&lt;p&gt;The whole article&lt;/p&gt;</content:encoded></item>'
+            b'</channel></rss>',
+            {},
+        )
+        entry = parsed.entries[0]
+
+        assert entry.title == 'First'
+        assert entry.link == 'https://feed.com/1'
+        assert entry.summary == 'Short & sweet'
+        assert zlib.decompress(entry.content).decode() == '<p>The whole article</p>'
+        assert entry.data['tags'] == ['news']
+        assert not [key for key in entry.data if key.endswith(('_detail', '_parsed'))]
+        assert 'content' not in entry.data
+
+    def test_pool_matches_inline_parsing(self, parser_pool):
+        assert parser_pool.parse(DOCUMENT, {}) == parse_feed(DOCUMENT, {})
+        assert isinstance(parser_pool.parse(DOCUMENT, {}).entries[0], ParsedEntry)
+
+    def test_parse_feed_falls_back_to_link_or_fingerprint_guids(self):
+        document = (
+            b'<rss version="2.0"><channel>'
+            b'<item><title>Linked</title><link>https://feed.com/1</link></item>'
+            b'<item><title>Bare</title></item>'
+            b'<item></item>'
+            b'</channel></rss>'
+        )
+        parsed = parse_feed(document, {})
+
+        assert [entry.title for entry in parsed.entries] == ['Linked', 'Bare']
+        assert parsed.entries[0].guid == 'https://feed.com/1'
+        assert parsed.entries[1].guid == parse_feed(document, {}).entries[1].guid
+
+    def test_pool_raises_worker_errors(self, parser_pool):
+        with pytest.raises(AttributeError):
+            parser_pool.parse(None, {})
+
+        assert parser_pool.parse(DOCUMENT, {}).entries[0].guid == 'guid-2'
+
+    def test_pool_replaces_stuck_workers(self):
+        pool = ParserPool(workers=1, timeout=0.2)
+        pool.start()
+
+        try:
+            with pytest.raises(ParseTimeout):
+                pool._call(time.sleep, 5)
+
+            assert pool.parse(DOCUMENT, {}).entries[0].guid == 'guid-2'
+        finally:
+            pool.stop()
@@ -0,0 +1,50 @@
+import logging
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from rss.profiler import QueryProfiler
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine('sqlite:///:memory:')
+
+    yield engine
+
+    engine.dispose()
+
+
+class TestQueryProfiler:
+
+    def test_profile_records_statements_of_the_current_thread(self, engine):
+        profiler = QueryProfiler(count_rows=True)
+        profiler.start()
+
+        try:
+            with engine.connect() as connection:
+                connection.execute(text('SELECT 1'))
+
+                with profiler.profile() as profile:
+                    connection.execute(text('SELECT 1 UNION ALL SELECT 2'))
+                    connection.execute(text('SELECT 3'))
+        finally:
+            profiler.stop()
+
+        assert profile.statement_count == 2
+        assert profile.rows == 3
+        assert 'SELECT 3' in profile.describe()
+
+    def test_slow_statements_are_logged_with_their_plan(self, engine, caplog):
+        profiler = QueryProfiler(slow_threshold=0, sample_rate=1)
+        profiler.start()
+
+        try:
+            with caplog.at_level(logging.WARNING, logger='rss.profiler'), engine.connect() as connection:
+                connection.execute(text('CREATE TABLE items (id INTEGER PRIMARY KEY)'))
+                connection.execute(text('SELECT * FROM items WHERE id = :id'), {'id': 1})
+        finally:
+            profiler.stop()
+
+        assert len(caplog.records) == 2
+        assert 'SEARCH items USING INTEGER PRIMARY KEY' in caplog.records[1].getMessage()
@@ -0,0 +1,156 @@
+import json
+import os
+import re
+import uuid
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import event, text
+
+from rss.dal import RssDAL
+from rss.models.bookmark import BookmarkEntity
+from rss.models.comment import CommentEntity
+from rss.models.feed import FeedEntity
+from rss.models.rss import RssEntity, RssUserEntity
+from rss.models.timeline import TimelineEntity
+
+TABLES = {'rsses', 'rss_user', 'feeds', 'timelines', 'bookmarks', 'comments', 'outbox'}
+SQLITE_SCAN = re.compile(r'^SCAN (\w+)')
+
+
+@pytest.fixture
+def plan_data(db_session) -> SimpleNamespace:
+    postgres = db_session.get_bind().dialect.name == 'postgresql'
+    scale = int(os.environ.get('RSS_QUERY_PLAN_SCALE', 2000 if postgres else 20))
+    now = datetime.utcnow()
+
+    rsses = [RssEntity(url='https://feed{}.com'.format(i)) for i in range(scale)]
+    db_session.add_all(rsses)
+    db_session.flush()
+
+    user_ids = [uuid.uuid4() for _ in range(scale)]
+    db_session.add_all(
+        RssUserEntity(user_id=user_id, rss_id=rsses[(i + offset) % scale].id)
+        for i, user_id in enumerate(user_ids)
+        for offset in range(5)
+    )
+
+    feeds = [
+        FeedEntity(
+            rss_id=rss.id,
+            data={'title': 'entry {}'.format(entry)},
+            guid='{}-{}'.format(rss.url, entry),
+            created_at=now - timedelta(minutes=entry),
+        )
+        for rss in rsses
+        for entry in range(20)
+    ]
+    db_session.add_all(feeds)
+    db_session.flush()
+
+    db_session.add_all(
+        TimelineEntity(user_id=user_ids[i % scale], feed_id=feed.id, created_at=feed.created_at)
+        for i, feed in enumerate(feeds)
+    )
+    bookmarks = [BookmarkEntity(user_id=user_ids[i % scale], feed_id=feed.id) for i, feed in enumerate(feeds[::10])]
+    comments = [
+        CommentEntity(user_id=user_ids[i % scale], feed_id=feed.id, message='message')
+        for i, feed in enumerate(feeds[::10])
+    ]
+    db_session.add_all(bookmarks + comments)
+    db_session.commit()
+
+    if postgres:
+        db_session.execute(text('ANALYZE'))
+
+    return SimpleNamespace(
+        rss=rsses[0],
+        user_id=user_ids[0],
+        feed=feeds[0],
+        bookmark=bookmarks[0],
+        comment=comments[0],
+        cursor={'created_at': feeds[5].created_at, 'id': feeds[5].id},
+        now=now,
+    )
+
+
+DAL_CALLS = {
+    'fetch_rss_by_url_or_none': lambda dal, d: dal.fetch_rss_by_url_or_none(d.rss.url),
+    'fetch_rss_by_id_or_none': lambda dal, d: dal.fetch_rss_by_id_or_none(d.rss.id),
+    'check_user_attached_to_rss': lambda dal, d: dal.check_user_attached_to_rss(d.user_id, d.rss.id),
+    'detach_rss_from_user': lambda dal, d: dal.detach_rss_from_user(d.user_id, d.rss.id),
+    'get_rsses': lambda dal, d: dal.get_rsses(d.user_id),
+    'get_feed_by_id_and_user_id': lambda dal, d: dal.get_feed_by_id_and_user_id(d.feed.id, d.user_id),
+    'get_feeds_by_user_id': lambda dal, d: dal.get_feeds_by_user_id(d.user_id, cursor=d.cursor),
+    'get_feeds_by_rss_id_and_user_id': lambda dal, d: dal.get_feeds_by_rss_id_and_user_id(d.rss.id, d.user_id, cursor=d.cursor),
+    'get_timeline_by_user_id': lambda dal, d: dal.get_timeline_by_user_id(d.user_id, cursor=d.cursor),
+    'get_timeline_by_user_id_with_stats': lambda dal, d: dal.get_timeline_by_user_id(
+        d.user_id, cursor=d.cursor, with_stats=True,
+    ),
+    'get_timeline_by_user_id_projected': lambda dal, d: dal.get_timeline_by_user_id(
+        d.user_id, cursor=d.cursor, data_fields=['title'],
+    ),
+    'fetch_bookmark_by_user_id_and_feed_id': lambda dal, d: dal.fetch_bookmark_by_user_id_and_feed_id(d.user_id, d.feed.id),
+    'fetch_bookmarks_by_user_id': lambda dal, d: dal.fetch_bookmarks_by_user_id(d.user_id),
+    'fetch_bookmark_by_id_and_user_id': lambda dal, d: dal.fetch_bookmark_by_id_and_user_id(d.bookmark.id, d.user_id),
+    'fetch_bookmarks_by_ids_and_user_id': lambda dal, d: dal.fetch_bookmarks_by_ids_and_user_id([d.bookmark.id], d.user_id),
+    'store_bookmarks': lambda dal, d: dal.store_bookmarks(d.user_id, [d.feed.id]),
+    'delete_bookmark_by_id_and_user_id': lambda dal, d: dal.delete_bookmark_by_id_and_user_id(d.bookmark.id, d.user_id),
+    'fetch_comments_on_subscribed_feed_by_feed_id': lambda dal, d: dal.fetch_comments_on_subscribed_feed_by_feed_id(d.feed.id, d.user_id),
+    'fetch_comment_on_subscribed_feed_by_feed_id': lambda dal, d: dal.fetch_comment_on_subscribed_feed_by_feed_id(d.comment.id, d.feed.id, d.user_id),
+    'count_comments_on_subscribed_feeds_by_feed_ids': lambda dal, d: dal.count_comments_on_subscribed_feeds_by_feed_ids([d.feed.id], d.user_id),
+    'delete_comment_by_id_and_user_id': lambda dal, d: dal.delete_comment_by_id_and_user_id(d.comment.id, d.user_id),
+    'get_subscriber_ids': lambda dal, d: dal.get_subscriber_ids([d.rss.id]),
+    'count_subscribers': lambda dal, d: dal.count_subscribers(d.rss.id),
+    'count_subscribers_by_rss_ids': lambda dal, d: dal.count_subscribers_by_rss_ids([d.rss.id]),
+    'backfill_timeline': lambda dal, d: dal.backfill_timeline(uuid.uuid4(), d.rss.id),
+    'remove_from_timeline': lambda dal, d: dal.remove_from_timeline(d.user_id, d.rss.id),
+    'fan_out_feeds': lambda dal, d: dal.fan_out_feeds([d.feed.id]),
+    'claim_due_rsses': lambda dal, d: dal.claim_due_rsses(d.now, d.now, 10, [d.rss.shard, 0, 1]),
+    'fetch_unpublished_events': lambda dal, d: dal.fetch_unpublished_events(10),
+    'purge_published_events': lambda dal, d: dal.purge_published_events(d.now),
+}
+
+
+def sequential_scans(connection, statement, parameters) -> [str]:
+    if connection.dialect.name == 'postgresql':
+        plan = connection.exec_driver_sql('EXPLAIN (FORMAT JSON) ' + statement, parameters).scalar()
+        plan = json.loads(plan) if isinstance(plan, str) else plan
+        nodes = [plan[0]['Plan']]
+        scans = []
+
+        while nodes:
+            node = nodes.pop()
+            if node['Node Type'] == 'Seq Scan' and node.get('Relation Name') in TABLES:
+                scans.append(node['Relation Name'])
+            nodes.extend(node.get('Plans', []))
+
+        return scans
+
+    return [
+        match.group(1)
+        for *_, detail in connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters)
+        for match in [SQLITE_SCAN.match(detail)]
+        if match and match.group(1) in TABLES
+    ]
+
+
+@pytest.mark.parametrize('method', DAL_CALLS)
+def test_dal_method_avoids_sequential_scans(method, plan_data, db_session):
+    connection = db_session.connection()
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and re.match(r'\s*(SELECT|UPDATE|DELETE|INSERT INTO \w+ .*SELECT)', statement, re.S | re.I):
+            statements.append((statement, parameters))
+
+    event.listen(connection, 'before_cursor_execute', record)
+    try:
+        DAL_CALLS[method](RssDAL(db_session=db_session), plan_data)
+    finally:
+        event.remove(connection, 'before_cursor_execute', record)
+
+    assert statements
+    for statement, parameters in statements:
+        assert sequential_scans(db_session.connection(), statement, parameters) == [], statement
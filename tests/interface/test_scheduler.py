@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta
+
+from rss.models.rss import RssEntity
+from rss.parser import parse_feed
+from rss.scheduler import PollScheduler
+
+NOW = datetime(2024, 1, 10, 12, 0, 0)
+
+
+def rss_document(pub_dates, channel_extra=''):
+    items = ''.join(
+        '<item><guid>{0}</guid><pubDate>{1}</pubDate></item>'.format(i, date.strftime('%a, %d %b %Y %H:%M:%S GMT'))
+        for i, date in enumerate(pub_dates)
+    )
+
+    return (
+        '<rss version="2.0" xmlns:sy="http://purl.org/rss/1.0/modules/syndication/">'
+        '<channel><title>t</title>{0}{1}</channel></rss>'
+    ).format(channel_extra, items)
+
+
+def scheduler():
+    return PollScheduler(
+        batch_size=10,
+        min_interval=5 * 60,
+        default_interval=60 * 60,
+        max_interval=24 * 60 * 60,
+        max_backoff=7 * 24 * 60 * 60,
+    )
+
+
+class TestPollScheduler:
+
+    def test_interval_follows_publish_frequency(self):
+        parsed = parse_feed(rss_document([NOW - timedelta(minutes=10 * i) for i in range(1, 6)]).encode(), {})
+
+        interval = scheduler().next_interval(10 * 60, NOW, parsed, new_entries=5)
+
+        assert interval == 10 * 60
+
+    def test_dormant_feed_is_polled_rarely(self):
+        parsed = parse_feed(rss_document([NOW - timedelta(days=300 + i) for i in range(3)]).encode(), {})
+
+        interval = scheduler().next_interval(24 * 60 * 60, NOW, parsed)
+
+        assert interval == 24 * 60 * 60
+
+    def test_publisher_hints_are_a_lower_bound(self):
+        ttl = parse_feed(rss_document([], '<ttl>180</ttl>').encode(), {})
+        sy = parse_feed(rss_document([], '<sy:updatePeriod>daily</sy:updatePeriod><sy:updateFrequency>2</sy:updateFrequency>').encode(), {})
+
+        assert scheduler().next_interval(600, NOW, ttl, new_entries=1) == 180 * 60
+        assert scheduler().next_interval(600, NOW, sy, new_entries=1) == 12 * 60 * 60
+
+    def test_backoff_grows_until_success(self):
+        rss = RssEntity(url='https://erfan.com', poll_interval=600)
+
+        scheduler().backoff(rss, NOW)
+        assert rss.failure_count == 1
+        assert rss.next_poll_at == NOW + timedelta(seconds=1200)
+
+        scheduler().backoff(rss, NOW)
+        assert rss.next_poll_at == NOW + timedelta(seconds=2400)
+
+        scheduler().reschedule(rss, NOW)
+        assert rss.failure_count == 0
+        assert rss.next_poll_at == NOW + timedelta(seconds=rss.poll_interval)
@@ -0,0 +1,18 @@
+from rss.search import InvertedIndex, tokenize
+
+
+class TestInvertedIndex:
+
+    def test_tokenize_lowercases_words(self):
+        assert tokenize('Hello, World! 2024') == ['hello', 'world', '2024']
+        assert tokenize(None) == []
+
+    def test_search_requires_every_term(self):
+        index = InvertedIndex()
+        index.add(1, {'title': 'python release', 'summary': None, 'author': None})
+        index.add(2, {'title': 'python tips', 'summary': 'a new release is out', 'author': None})
+        index.add(3, {'title': 'rust release', 'summary': None, 'author': None})
+
+        assert [document_id for document_id, _ in index.search('Python release')] == [1, 2]
+        assert index.search('golang') == []
+        assert index.search('   ') == []
@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta
+
+from rss.dal import RssDAL
+from rss.models.rss import RssEntity, SHARD_COUNT
+from rss.models.worker import WorkerEntity
+from rss.sharding import ShardCoordinator, shard_owner
+
+
+def coordinator(db_session, worker_id) -> ShardCoordinator:
+    return ShardCoordinator(RssDAL(db_session=db_session), worker_id, lease_ttl=180, claim_ttl=600)
+
+
+class TestShardCoordinator:
+
+    def test_shard_owner_moves_few_shards_when_a_worker_joins(self):
+        before = {shard: shard_owner(shard, ['a', 'b', 'c']) for shard in range(SHARD_COUNT)}
+        after = {shard: shard_owner(shard, ['a', 'b', 'c', 'd']) for shard in range(SHARD_COUNT)}
+
+        moved = [shard for shard in range(SHARD_COUNT) if before[shard] != after[shard]]
+
+        assert all(after[shard] == 'd' for shard in moved)
+        assert SHARD_COUNT / 8 < len(moved) < SHARD_COUNT / 2
+
+    def test_workers_own_disjoint_shards(self, db_session):
+        now = datetime.utcnow()
+        first = coordinator(db_session, 'worker-a')
+        second = coordinator(db_session, 'worker-b')
+
+        first.members(now)
+        second.members(now)
+        first_shards = set(first.owned_shards(now))
+        second_shards = set(second.owned_shards(now))
+
+        assert not first_shards & second_shards
+        assert first_shards | second_shards == set(range(SHARD_COUNT))
+
+    def test_single_worker_owns_every_shard(self, db_session):
+        assert coordinator(db_session, 'worker-a').owned_shards(datetime.utcnow()) is None
+
+    def test_expired_workers_are_dropped(self, db_session):
+        now = datetime.utcnow()
+        db_session.add(WorkerEntity(id='worker-0', heartbeat_at=now - timedelta(hours=1)))
+        db_session.commit()
+
+        assert coordinator(db_session, 'worker-a').members(now) == ['worker-a']
+        assert coordinator(db_session, 'worker-0').members(now) == ['worker-0', 'worker-a']
+        assert db_session.query(WorkerEntity).count() == 2
+
+    def test_oldest_worker_expires_leases(self, db_session):
+        now = datetime.utcnow()
+        oldest = coordinator(db_session, 'worker-z')
+        newest = coordinator(db_session, 'worker-a')
+
+        oldest.members(now - timedelta(minutes=1))
+        db_session.add(WorkerEntity(id='worker-0', heartbeat_at=now - timedelta(hours=1)))
+        db_session.commit()
+
+        assert newest.members(now) == ['worker-z', 'worker-a']
+        assert db_session.query(WorkerEntity).count() == 3
+
+        oldest.members(now)
+        assert db_session.query(WorkerEntity).count() == 2
+
+    def test_each_due_feed_is_claimed_once(self, db_session):
+        now = datetime.utcnow()
+        db_session.add_all(
+            RssEntity(url='https://feed{}.com'.format(i), next_poll_at=now - timedelta(minutes=1))
+            for i in range(50)
+        )
+        db_session.commit()
+
+        first = coordinator(db_session, 'worker-a')
+        second = coordinator(db_session, 'worker-b')
+        first.members(now)
+
+        claimed = [rss.id for rss in second.claim_due_rsses(now, 100).rsses]
+        claimed += [rss.id for rss in first.claim_due_rsses(now, 100).rsses]
+
+        assert len(claimed) == len(set(claimed)) == 50
+        assert first.claim_due_rsses(now, 100).rsses == []
+        assert all(rss.next_poll_at > now for rss in db_session.query(RssEntity).all())
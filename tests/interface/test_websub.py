@@ -0,0 +1,53 @@
+import hashlib
+import hmac
+from datetime import datetime, timedelta
+
+from rss.models.rss import RssEntity
+from rss.websub import WebSubSubscriber, discover_hub, verify_signature
+
+
+class TestWebSub:
+
+    def test_discover_hub_prefers_link_headers(self):
+        rss = RssEntity(url='https://erfan.com')
+        hints = {'hub': 'https://hub.erfan.com/', 'self': 'https://erfan.com/feed'}
+
+        assert discover_hub(rss, hints, {}) == ('https://hub.erfan.com/', 'https://erfan.com/feed')
+        assert discover_hub(rss, hints, {
+            'link': '<https://push.erfan.com/>; rel="hub", <https://erfan.com/rss>; rel="self"',
+        }) == ('https://push.erfan.com/', 'https://erfan.com/rss')
+        assert discover_hub(rss, {}, {}) == (None, 'https://erfan.com')
+
+    def test_verify_signature(self):
+        body = b'<rss/>'
+        digest = hmac.new(b'secret', body, hashlib.sha256).hexdigest()
+
+        assert verify_signature('secret', body, 'sha256=' + digest)
+        assert not verify_signature('other', body, 'sha256=' + digest)
+        assert not verify_signature('secret', body, 'md5=' + digest)
+        assert not verify_signature('secret', body, None)
+
+    def test_prepare_renews_expiring_leases_only(self):
+        websub = WebSubSubscriber('https://rss.erfan.com/websub', lease_seconds=864000, fallback_interval=3600, timeout=1)
+        now = datetime.utcnow()
+        rss = RssEntity(url='https://erfan.com')
+
+        assert websub.prepare(rss, 'https://hub.erfan.com/', 'https://erfan.com', now)
+        secret = rss.hub_secret
+
+        rss.hub_lease_expires_at = now + timedelta(days=1)
+        assert not websub.prepare(rss, 'https://hub.erfan.com/', 'https://erfan.com', now)
+        assert websub.active(rss, now)
+        assert rss.hub_secret == secret
+
+        rss.hub_lease_expires_at = now + timedelta(hours=1)
+        assert websub.prepare(rss, 'https://hub.erfan.com/', 'https://erfan.com', now)
+        assert rss.hub_secret == secret
+        assert rss.hub_requested_at == now
+
+        rss.hub_lease_expires_at = now - timedelta(hours=1)
+        assert websub.prepare(rss, 'https://hub.erfan.com/', 'https://erfan.com', now)
+        assert rss.hub_secret != secret
+
+        assert not websub.prepare(rss, None, 'https://erfan.com', now)
+        assert rss.hub_url is None and not websub.active(rss, now)